@@ -1,11 +1,23 @@
 import re
 import os
+import sys
+import time
 import logging
 import csv
+import enum
+import json
+import bisect
+import itertools
+import collections
 
+from array import array
+from collections.abc import Mapping, MutableMapping
 from inspect import getmembers
 from pprint import pprint
 
+# KVSet.load reports its progress (rows/s) every LOAD_PROGRESS_ROWS rows
+LOAD_PROGRESS_ROWS = 1000000
+
 def ddd(x):
     # pprint(getmembers(x))
     pprint(x,depth=1)
@@ -28,86 +40,357 @@ def var_dump(var, prefix=''):
                 print(prefix, '(', i.__class__.__name__, ') ', i, sep='')
 
 
+class ErrorCode(enum.IntEnum):
+    """Kinds of findings kept by Errors, see ERROR_MESSAGES."""
+    MESSAGE = 0
+    KEY_REGEX = 1
+    VALUE_REGEX = 2
+    DUPLICATED_KEY = 3
+    DUPLICATED_VALUE = 4
+    KEY_LEFT_ONLY = 5
+    KEY_RIGHT_ONLY = 6
+    VALUE_LEFT_ONLY = 7
+    # the same finding, reported once the right side is exhausted (historic wording)
+    VALUE_LEFT_ONLY_LAST = 8
+    VALUE_RIGHT_ONLY = 9
+
+# {name}: the set owning the errors, {other}: the set it was compared with
+ERROR_MESSAGES = {
+    ErrorCode.MESSAGE: "{text}",
+    ErrorCode.KEY_REGEX: "{name}: key '{key}' regex error at line '{line}'",
+    ErrorCode.VALUE_REGEX: "{name}: key '{key}' value '{value}' regex error at line '{line}'",
+    ErrorCode.DUPLICATED_KEY: "{name}: key {key} duplicated at line {line} ",
+    ErrorCode.DUPLICATED_VALUE: "{name}: key '{key}' has duplicated value '{value}'",
+    ErrorCode.KEY_LEFT_ONLY: "key {key} present in '{name}' , missed in '{other}'",
+    ErrorCode.KEY_RIGHT_ONLY: "key {key} missed  in '{name}' , present in '{other}'",
+    ErrorCode.VALUE_LEFT_ONLY: "key {key} : {value} present in '{name}' , missed in '{other}'",
+    ErrorCode.VALUE_LEFT_ONLY_LAST: "key {key} : {value} present in '{name}', missed in '{other}'",
+    ErrorCode.VALUE_RIGHT_ONLY: "key {key} : {value} missed in '{name}' , present in '{other}'",
+}
+
+# codes whose 'extra' column is the other set of a comparison (otherwise a line number,
+# or the text for MESSAGE)
+COMPARE_ERROR_CODES = frozenset((ErrorCode.KEY_LEFT_ONLY, ErrorCode.KEY_RIGHT_ONLY, ErrorCode.VALUE_LEFT_ONLY,
+                                 ErrorCode.VALUE_LEFT_ONLY_LAST, ErrorCode.VALUE_RIGHT_ONLY))
+
+def format_error(code,name,key=None,value=None,line=0,other=None):
+    return ERROR_MESSAGES[code].format(name=name,key=key,value=value,line=line,other=other,text=other)
+
+EXPORT_FIELDS = ('code', 'group', 'key', 'value', 'line', 'other', 'message')
+
+
+class ErrorsView(Mapping):
+    """
+    Read-only view of an Errors as the dict code -> messages it used to store:
+    only the group looked up is formatted, as a tuple (so it cannot be changed
+    either); findings are added with Errors.add() / trace().
+    """
+    def __init__(self,errors):
+        self.errors = errors
+
+    def __getitem__(self,code):
+        errors = self.errors
+        sid = errors.symbol_ids.get(code)
+        if sid is None or sid not in errors.by_group:
+            raise KeyError(code)
+        return tuple(errors.message(r) for r in errors.by_group[sid])
+
+    def __contains__(self,code):
+        return code in self.errors
+
+    def __iter__(self):
+        symbols = self.errors.symbols
+        return (symbols[gid] for gid in self.errors.by_group)
+
+    def __len__(self):
+        return len(self.errors.by_group)
+
+
 class Errors:
-    def __init__(self):
-        self.err = {}
-        pass
+    """
+    Findings grouped by a code (a key or a value, historically), stored as
+    parallel arrays of (error code, group, key, value, extra, owner) where strings are
+    IDs into a symbol table: messages are formatted only when they are logged,
+    read or exported.
+    """
+    NO_SYMBOL = -1
+
+    def __init__(self,name=''):
+        # name of the set, used in the messages
+        self.name = name
+        self.symbols = []
+        self.symbol_ids = {}
+        self.codes = array('B')
+        self.groups = array('i')
+        self.keys = array('i')
+        self.values = array('i')
+        # line number, other set of a comparison or text of a MESSAGE (see COMPARE_ERROR_CODES)
+        self.extras = array('i')
+        # set owning the finding, when it is not this one (see extend()): NO_SYMBOL for name
+        self.owners = array('i')
+        # group ID -> indexes of its records
+        self.by_group = {}
+        self._err = ErrorsView(self)
+
+    def symbol(self,s):
+        sid = self.symbol_ids.get(s)
+        if sid is None:
+            sid = self.symbol_ids[s] = len(self.symbols)
+            self.symbols.append(s)
+        return sid
 
-    def add(self,code,error):        
-        if code in self.err:
-            self.err[code].append(error)
+    def trace(self,code,group,key=None,value=None,line=0,other=None,owner=None):
+        """Record a finding of the set owner (default: name), return its index (see message())."""
+        symbol = self.symbol
+        gid = symbol(group)
+        r = len(self.codes)
+        self.codes.append(code)
+        self.groups.append(gid)
+        self.keys.append(self.NO_SYMBOL if key is None else symbol(key))
+        self.values.append(self.NO_SYMBOL if value is None else symbol(value))
+        self.extras.append(line if other is None else symbol(other))
+        self.owners.append(self.NO_SYMBOL if owner is None or owner == self.name else symbol(owner))
+        rows = self.by_group.get(gid)
+        if rows is None:
+            self.by_group[gid] = array('i', (r,))
         else:
-            self.err[code] = [error]
-        pass
+            rows.append(r)
+        return r
+
+    def add(self,code,error):
+        # a preformatted message
+        self.trace(ErrorCode.MESSAGE,code,other=error)
 
     def add_list(self,code,error_list):
         for e in error_list:
             self.add(code,e)
-        pass
-    
-    # error_obj is another Error() class 
+
+    # error_obj is another Error() class
     def extend(self,error_obj):
-        for code in error_obj.err.keys():
-            if code in self.err:
-                self.err[code].extend( error_obj.err[code] )
-            else:
-                self.err[code] = error_obj.err[code]
-        pass
+        # the findings keep their code and the set owning them (so their message)
+        for r in range(len(error_obj.codes)):
+            code, group, key, value, line, other = error_obj.record(r)
+            self.trace(code,group,key,value,line,other,error_obj.owner(r))
+
+    def owner(self,r):
+        """Name of the set owning record r."""
+        owner = self.owners[r]
+        return self.name if owner < 0 else self.symbols[owner]
+
+    def record(self,r):
+        """Return (code, group, key, value, line, other) of record r (other is the text for MESSAGE)."""
+        symbols = self.symbols
+        code = ErrorCode(self.codes[r])
+        key = self.keys[r]
+        value = self.values[r]
+        extra = self.extras[r]
+        line = 0
+        other = None
+        if code == ErrorCode.MESSAGE or code in COMPARE_ERROR_CODES:
+            other = symbols[extra]
+        else:
+            line = extra
+        return (code, symbols[self.groups[r]], None if key < 0 else symbols[key],
+                None if value < 0 else symbols[value], line, other)
+
+    def message(self,r):
+        code, group, key, value, line, other = self.record(r)
+        return format_error(code,self.owner(r),key,value,line,other)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __contains__(self,code):
+        sid = self.symbol_ids.get(code)
+        return sid is not None and sid in self.by_group
+
+    def messages(self,code):
+        """Messages of the findings grouped under code, in order."""
+        sid = self.symbol_ids.get(code)
+        if sid is None or sid not in self.by_group:
+            return []
+        return [self.message(r) for r in self.by_group[sid]]
+
+    @property
+    def err(self):
+        # read-only view code -> tuple of messages, as it was stored before (see ErrorsView)
+        return self._err
+
+    def counters(self):
+        """Number of findings by ErrorCode."""
+        return {ErrorCode(code): n for code, n in collections.Counter(self.codes).items()}
 
     def log(self,msg=None):
         if msg is not None:
             logging.info(msg)
-        for code in self.err.keys():
-            for e in self.err[code]:
-                logging.error('<{0}>: {1}'.format(code,e))
-        pass
-    
+        self.log_groups(self.by_group)
+
+    def log_groups(self,gids):
+        if not logging.getLogger().isEnabledFor(logging.ERROR):
+            return
+        for gid in gids:
+            code = self.symbols[gid]
+            for r in self.by_group[gid]:
+                logging.error('<{0}>: {1}'.format(code,self.message(r)))
+
     def log_by_group(self,regex,msg):
-        groups = {} # hash of Errors
-        for code in self.err.keys():
-            s_Obj = re.search( regex, code, re.M|re.I)
-            if s_Obj: 
-                partition = s_Obj.group()
-            else:
-                partition = ''
-            if partition not in groups:
-                e = Errors()
-                e.add_list(code,self.err[code])
-                groups[partition] = e
-            else:
-                groups[partition].add_list(code,self.err[code])
-                
+        # the regex is compiled once and searched once per code, not per finding
+        s_Obj = re.compile(regex, re.M|re.I).search
+        groups = {} # partition -> group IDs
+        for gid in self.by_group:
+            m = s_Obj(self.symbols[gid])
+            groups.setdefault(m.group() if m else '', []).append(gid)
         for g in groups.keys():
             logging.info("log_by_group "+msg+" PARTITION= '{0}' ".format(g))
-            groups[g].log()
-        pass
-                
+            self.log_groups(groups[g])
+
+    def records(self):
+        """Yield every finding as a dict with the EXPORT_FIELDS."""
+        for r in range(len(self.codes)):
+            code, group, key, value, line, other = self.record(r)
+            yield {'code': code.name, 'group': group, 'key': key, 'value': value,
+                   'line': line if line else None, 'other': other if code != ErrorCode.MESSAGE else None,
+                   'message': self.message(r)}
+
+    def export_json(self,filename):
+        with open(filename, "w") as f:
+            json.dump({'name': self.name,
+                       'counters': {code.name: n for code, n in self.counters().items()},
+                       'errors': list(self.records())}, f, indent=1)
+
+    def export_csv(self,filename):
+        with open(filename, "w", newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=EXPORT_FIELDS, delimiter=';')
+            writer.writeheader()
+            writer.writerows(self.records())
+
+class KVRelation(MutableMapping):
+    """
+    A key -> values relation in compressed sparse row form. Keys and values are
+    interned into integer IDs numbered in sorted string order; the value IDs of
+    key ID i are indices[indptr[i]:indptr[i+1]], sorted and without duplicates.
+    As a mapping it returns the (sorted, unique) value strings of a key.
+    """
+    INDEX_TYPECODE = 'I'
+    POINTER_TYPECODE = 'Q'
+
+    def __init__(self,key_symbols,value_symbols,indptr,indices):
+        self.key_symbols = key_symbols
+        self.value_symbols = value_symbols
+        self.indptr = indptr
+        self.indices = indices
+        self.key_ids = {k: i for i, k in enumerate(key_symbols)}
+        # keys dropped by KVSet.remove() stay in the arrays, flagged here
+        self.alive = bytearray(b'\x01') * len(key_symbols)
+        self.size = len(key_symbols)
+
+    @classmethod
+    def from_dict(cls,data):
+        """Build from a dict key -> list of values (duplicated values are dropped)."""
+        key_symbols = sorted(data)
+        value_symbols = sorted(set(itertools.chain.from_iterable(data.values())))
+        vid = {v: i for i, v in enumerate(value_symbols)}.__getitem__
+        return cls.from_rows(key_symbols,value_symbols,
+                             (sorted(set(map(vid, data[k]))) for k in key_symbols))
+
+    @classmethod
+    def from_rows(cls,key_symbols,value_symbols,rows):
+        """Build from the sorted, unique value IDs of every key ID."""
+        indices = array(cls.INDEX_TYPECODE)
+        indptr = array(cls.POINTER_TYPECODE, [0])
+        for row in rows:
+            indices.extend(row)
+            indptr.append(len(indices))
+        return cls(key_symbols,value_symbols,indptr,indices)
+
+    def row(self,kid):
+        return self.indices[self.indptr[kid]:self.indptr[kid+1]]
+
+    def edges(self):
+        return sum(self.indptr[kid+1] - self.indptr[kid] for kid in self.live_ids())
+
+    def live_ids(self):
+        return (kid for kid in range(len(self.key_symbols)) if self.alive[kid])
+
+    def transpose(self):
+        """
+        Return the inverse relation (value -> keys) in O(E): the keys are visited
+        in ID order, so every inverse row comes out already sorted and unique.
+        """
+        rows = [[] for _ in self.value_symbols]
+        for kid in self.live_ids():
+            for vid in self.row(kid):
+                rows[vid].append(kid)
+        # values left without keys (after remove()) are not part of the inverse,
+        # and removed keys are renumbered away
+        used = [vid for vid, r in enumerate(rows) if r]
+        if self.size == len(self.key_symbols):
+            live_keys = self.key_symbols
+            inverse_rows = (rows[vid] for vid in used)
+        else:
+            remap = {kid: i for i, kid in enumerate(self.live_ids())}
+            live_keys = [self.key_symbols[kid] for kid in remap]
+            inverse_rows = (map(remap.__getitem__, rows[vid]) for vid in used)
+        return KVRelation.from_rows([self.value_symbols[vid] for vid in used],live_keys,inverse_rows)
+
+    def __getitem__(self,k):
+        kid = self.key_ids[k]
+        if not self.alive[kid]:
+            raise KeyError(k)
+        return [self.value_symbols[vid] for vid in self.row(kid)]
+
+    def __setitem__(self,k,v):
+        raise TypeError("KVRelation is read-only, only keys can be removed")
+
+    def __delitem__(self,k):
+        kid = self.key_ids[k]
+        if not self.alive[kid]:
+            raise KeyError(k)
+        self.alive[kid] = 0
+        self.size -= 1
+
+    def __contains__(self,k):
+        kid = self.key_ids.get(k)
+        return kid is not None and bool(self.alive[kid])
+
+    def __iter__(self):
+        return (self.key_symbols[kid] for kid in self.live_ids())
+
+    def __len__(self):
+        return self.size
+
 class KVSet:
-    def __init__(self,name,filename,separator,regex_k,regex_v,duplicated_keys = True):
+    def __init__(self,name,filename,separator,regex_k,regex_v,duplicated_keys = True,csr = False):
         self.name = name
         self.regex_k = regex_k
         self.regex_v = regex_v
         self.regex_c_k = re.compile( regex_k )
         self.regex_c_v = re.compile( regex_v )
         self.separator = separator
+        # the separator is a regex too: compiled once, not for every row
+        self.regex_c_sep = re.compile( r'\s*' + separator + r'\s*' )
         self.data = {}
         self.data_uniq = {}
         self.duplicated_keys = duplicated_keys
         self.filename = filename
-        # dict of list of errors
-        self.keys_with_errors = Errors()
-        self.values_with_errors = Errors()
+        # with csr=True process() stores data_uniq as a KVRelation (see invert())
+        self.use_csr = csr
+        self.csr = None
+        # findings grouped by key and by value
+        self.keys_with_errors = Errors(name)
+        self.values_with_errors = Errors(name)
         # self.load(filename,duplicated_keys)
 
-    def trace_error(self,error,key,value=None):
-        logging.error(error)        
-        self.keys_with_errors.add(key,error)
+    def trace(self,code,key,value=None,line=0,other=None):
+        # record a finding by key (and by value); the message is formatted only if it is logged
+        r = self.keys_with_errors.trace(code,key,key,value,line,other)
         if value is not None:
-            self.values_with_errors.add(value,error)
-        pass
+            self.values_with_errors.trace(code,value,key,value,line,other)
+        if logging.getLogger().isEnabledFor(logging.ERROR):
+            logging.error(self.keys_with_errors.message(r))
 
     def return_all_errors(self):
-        all_err = Errors()
+        all_err = Errors(self.name)
         all_err.extend(self.keys_with_errors)
         all_err.extend(self.values_with_errors)
         return all_err
@@ -126,61 +409,93 @@ class KVSet:
             pass
         pass
 
-    
-    def show_error(self,error,key,value=None):
-        full_error = error
-        if key in self.keys_with_errors.err:
-            # add additional traced errors:
-            logging.warning(error+" (TRACED errors:" + "|".join(self.keys_with_errors.err[key]) + ")")
+
+    def show(self,code,key,value=None,other=None):
+        # trace a finding, or only warn if the key already has some (with the traced
+        # errors), formatting only what is logged
+        if key in self.keys_with_errors:
+            if logging.getLogger().isEnabledFor(logging.WARNING):
+                error = format_error(code,self.name,key,value,other=other)
+                logging.warning(error+" (TRACED errors:" + "|".join(self.keys_with_errors.messages(key)) + ")")
         else:
-            # logging.error(error)
-            self.trace_error(error,key,value)
-        pass
+            self.trace(code,key,value,other=other)
     
-    def load(self):
+    def load(self,validate=True):
+        """
+        Stream the CSV file row by row (positional csv.reader, no dict per row).
+        Keys and values are interned, so every distinct string is stored once and
+        memory grows with the unique keys/values plus the edges between them.
+
+        Args:
+            validate: check keys and values against regex_k / regex_v; each distinct
+                      symbol is matched once and the outcome reused for its later rows.
+        """
         logging.info("loading {0} from file {1} ...".format(self.name,self.filename))
+        split = self.regex_c_sep.split
+        intern = sys.intern
+        data = self.data
+        checked_k = {}
+        checked_v = {}
+        rows = 0
+        t_start = time.perf_counter()
         with open(self.filename, newline='') as csvfile:
-            reader = csv.DictReader(csvfile, delimiter=';' )
-            self.fieldnames = reader.fieldnames
-            #            print (self.fieldnames,vars(self.fieldnames))
-            i=1
+            reader = csv.reader(csvfile, delimiter=';' )
+            self.fieldnames = next(reader, [])
             logging.info("fields: " + ",".join(self.fieldnames))
+            has_values = len(self.fieldnames)>1
             for row in reader:
-                i+=1
-                k = row[self.fieldnames[0]]
-                k = k.strip()
-                if not bool(self.regex_c_k.fullmatch(k)) :
-                    self.trace_error('{2}: key \'{0}\' regex error at line \'{1}\''.format(k,i,self.name),k)
-                if len(self.fieldnames)>1:
-                    v = re.split('\s*'+self.separator+'\s*', row[self.fieldnames[1]].strip() )
+                if not row:
+                    continue
+                rows += 1
+                # record number (the header is 1), as in the historic messages
+                line = rows + 1
+                if rows % LOAD_PROGRESS_ROWS == 0:
+                    logging.info("{0}: {1} rows ({2:.0f} rows/s)".format(
+                        self.name,rows,rows/(time.perf_counter()-t_start)))
+                k = intern(row[0].strip())
+                if validate:
+                    ok = checked_k.get(k)
+                    if ok is None:
+                        ok = checked_k[k] = bool(self.regex_c_k.fullmatch(k))
+                    if not ok:
+                        self.trace(ErrorCode.KEY_REGEX,k,line=line)
+                if has_values:
+                    v = split( row[1].strip() if len(row)>1 else '' )
                 else:
                     v = []
-            
-                if len(v) > 1 and v[len(v)-1]=='':
+
+                if len(v) > 1 and v[-1]=='':
                     # a separator was present at the end, we can tolerate that
-                    logging.warning("{2}: key '{0}' there is a separator '{1}' at the end of values, ignored".format(k,self.separator,self.name))
+                    logging.warning("{2}: key '{0}' there is a separator '{1}' at the end of values, ignored".format(
+                        k,self.separator,self.name))
                     v.pop()
-                for item in v:
-                    if not bool(self.regex_c_v.fullmatch(item)):
-                        self.trace_error("{3}: key '{0}' value '{1}' regex error at line '{2}'".format(k,item,i,self.name),k,item)
+                v = [intern(item) for item in v]
+                if validate:
+                    for item in v:
+                        ok = checked_v.get(item)
+                        if ok is None:
+                            ok = checked_v[item] = bool(self.regex_c_v.fullmatch(item))
+                        if not ok:
+                            self.trace(ErrorCode.VALUE_REGEX,k,item,line)
                 # manage duplicates:
-                if k in self.data:
+                if k in data:
                     if not self.duplicated_keys:
-                        self.trace_error("{2}: key {0} duplicated at line {1} ".format(k,i,self.name),k)
-                    self.data[k].extend(v)
+                        self.trace(ErrorCode.DUPLICATED_KEY,k,line=line)
+                    data[k].extend(v)
                 else:
-                    self.data[k] = v
-                # print(row[self.fieldnames[0]], row[self.fieldnames[1] ])
-                # print(k)
-            pass
-        logging.info("loaded {0}".format(len(self.data)))
-        pass
-        
-
+                    data[k] = v
+        elapsed = time.perf_counter() - t_start
+        logging.info("loaded {0} ({1} rows in {2:.2f}s, {3:.0f} rows/s)".format(
+            len(data),rows,elapsed,rows/elapsed if elapsed > 0 else 0))
 
     def check_duplicates(self):                
+        if self.csr is not None and self.data is self.csr:
+            # built by invert(): already sorted and without duplicates
+            return
         for k in self.data.keys():
             v = self.data[k]
+            if self.use_csr and len(set(v)) == len(v):
+                continue
 #            logging.info("k={}".format(k))
 #            ddd(v)
 #            logging.info(v)
@@ -191,14 +506,23 @@ class KVSet:
                     uniq_v.append(x)
                     seen_v.add(x)
                 else:
-                    self.trace_error("{2}: key '{0}' has duplicated value '{1}'".format(k,x,self.name),k,x)
-            self.data_uniq[k] = sorted(uniq_v)
+                    self.trace(ErrorCode.DUPLICATED_VALUE,k,x)
+            if not self.use_csr:
+                self.data_uniq[k] = sorted(uniq_v)
+        if self.use_csr:
+            self.csr = self.data_uniq = KVRelation.from_dict(self.data)
 
     def process(self):
         self.check_duplicates()
 
     def dump(self):
         logging.info("==== DUMP OF {0} ==== file: {1}".format(self.name,self.filename))
+        if self.csr is not None:
+            csr = self.csr
+            values = csr.value_symbols.__getitem__
+            for kid in csr.live_ids():
+                logging.info("{0} --> {1}".format(csr.key_symbols[kid], ", ".join(map(values, csr.row(kid)))))
+            return
         for k in sorted(self.data_uniq.keys()):
             logging.info("{0} --> {1}".format(k, ", ".join(self.data_uniq[k])))
         pass
@@ -215,7 +539,11 @@ class KVSet:
     def invert(self):
         # return a KVSet object as inverse matrix:
         inv = KVSet("INVERSE("+self.name+")",self.filename,self.separator,
-                    self.regex_k , self.regex_v,self.duplicated_keys)
+                    self.regex_k , self.regex_v,self.duplicated_keys,self.use_csr)
+        if self.csr is not None:
+            # a transpose of the CSR arrays: the inverse needs no process()
+            inv.csr = inv.data = inv.data_uniq = self.csr.transpose()
+            return inv
         for k in self.data_uniq.keys():
             for vv in self.data_uniq[k]:
                 if vv in inv.data:
@@ -224,54 +552,297 @@ class KVSet:
                     inv.data[vv] = [k];
         return inv
 
+    def diff(self,other,keys_only=False,keep_both=False):
+        """
+        Compare with another KVSet without formatting anything: see KVDiff.
+
+        Keys and values are interned once into integer IDs numbered in string
+        order, so every shared key becomes a pair of sorted ID arrays and the
+        (common) identical ones are recognized by a single array comparison.
+
+        Args:
+            other: the KVSet on the right side
+            keys_only: compare only the keys, not their values
+            keep_both: keep also the shared keys with identical values (needed
+                       to report what is present in both, see KVDiff.render)
+        """
+        keys = sorted(self.data.keys() | other.data.keys())
+        key_side = bytearray(len(keys))
+        for kid, k in enumerate(keys):
+            key_side[kid] = (KVDiff.LEFT if k in self.data else 0) | (KVDiff.RIGHT if k in other.data else 0)
+        values = []
+        pairs = {}
+        if not keys_only:
+            values = sorted(set(itertools.chain.from_iterable(self.data.values())).union(
+                itertools.chain.from_iterable(other.data.values())))
+            vid = {v: i for i, v in enumerate(values)}.__getitem__
+            for kid, k in enumerate(keys):
+                if key_side[kid] != KVDiff.BOTH:
+                    continue
+                v1 = array(KVDiff.ID_TYPECODE, sorted(map(vid, self.data[k])))
+                v2 = array(KVDiff.ID_TYPECODE, sorted(map(vid, other.data[k])))
+                if keep_both or v1 != v2:
+                    pairs[kid] = (v1, v2)
+        return KVDiff(self,other,keys,values,key_side,pairs)
+
     def compare(self,other,msg="",keys_only=False,say_both = False):
-        allkeys = {}
-        logging.info("===== DIFF {2}: {0} vs {1} ====".format(self.name,other.name,msg))
-        for k in self.data.keys():
-            allkeys[k]='<'
-        for k in other.data.keys():
-            if k in allkeys:
-                allkeys[k]='-'
+        self.diff(other,keys_only,say_both).render(msg,say_both)
+
+
+class KVDiff:
+    """
+    Structured result of KVSet.diff(left, right). Keys and values are integer
+    IDs into the sorted symbol lists 'keys' and 'values'; messages are built
+    only by render() or when the differences are iterated.
+    """
+    LEFT = 1
+    RIGHT = 2
+    BOTH = LEFT | RIGHT
+    ID_TYPECODE = 'I'
+
+    def __init__(self,left,right,keys,values,key_side,pairs):
+        self.left = left
+        self.right = right
+        self.keys = keys
+        self.values = values
+        # per key ID: LEFT, RIGHT or BOTH
+        self.key_side = key_side
+        # key ID -> (sorted value IDs on the left, on the right), for the shared keys
+        # whose values differ (all the shared keys with keep_both)
+        self.pairs = pairs
+
+    def key_ids(self,side):
+        return [kid for kid, s in enumerate(self.key_side) if s == side]
+
+    def value_events(self,kid):
+        """
+        Merge the value IDs of a shared key, yielding (value ID, side, tail):
+        tail is True once the other side is exhausted (it changes the wording).
+        Duplicated values count as many times as they appear, like the old merge.
+        """
+        if kid not in self.pairs:
+            return
+        v1, v2 = self.pairs[kid]
+        i1 = i2 = 0
+        n1, n2 = len(v1), len(v2)
+        while i1 < n1 and i2 < n2:
+            if v1[i1] == v2[i2]:
+                yield v1[i1], self.BOTH, False
+                i1 += 1
+                i2 += 1
+            elif v1[i1] < v2[i2]:
+                yield v1[i1], self.LEFT, False
+                i1 += 1
+            else:
+                yield v2[i2], self.RIGHT, False
+                i2 += 1
+        for i in range(i1, n1):
+            yield v1[i], self.LEFT, True
+        for i in range(i2, n2):
+            yield v2[i], self.RIGHT, True
+
+    def differences(self):
+        """Yield (key, value, side) for every difference, value is None for a missing key."""
+        for kid, side in enumerate(self.key_side):
+            if side != self.BOTH:
+                yield self.keys[kid], None, side
+            elif kid in self.pairs:
+                for value, vside, tail in self.value_events(kid):
+                    if vside != self.BOTH:
+                        yield self.keys[kid], self.values[value], vside
+
+    def counts(self):
+        """Return the number of differences by side: {LEFT: n, RIGHT: n}."""
+        counts = {self.LEFT: 0, self.RIGHT: 0}
+        for k, v, side in self.differences():
+            counts[side] += 1
+        return counts
+
+    def __bool__(self):
+        return next(self.differences(), None) is not None
+
+    def render(self,msg="",say_both=False):
+        """Report the differences through left.show() (and say_both through logging)."""
+        left = self.left
+        l_name = left.name
+        r_name = self.right.name
+        logging.info("===== DIFF {2}: {0} vs {1} ====".format(l_name,r_name,msg))
+        for kid, side in enumerate(self.key_side):
+            k = self.keys[kid]
+            if side == self.LEFT:
+                left.show(ErrorCode.KEY_LEFT_ONLY,k,other=r_name)
+            elif side == self.RIGHT:
+                left.show(ErrorCode.KEY_RIGHT_ONLY,k,other=r_name)
             else:
-                allkeys[k]='>'
-
-        # pprint(allkeys)
-                
-        for k in sorted(allkeys):
-            if allkeys[k]=='<':
-                self.show_error("key {0} present in '{1}' , missed in '{2}'".format(k,self.name,other.name),k)
-            if allkeys[k]=='>':
-                self.show_error("key {0} missed  in '{1}' , present in '{2}'".format(k,self.name,other.name),k)
-            if allkeys[k]=='-':
                 if say_both:
                     logging.info("{0} --> present in both, ok".format(k))
-                if keys_only:
-                    continue
-                i1=0
-                i2=0
-                v1=sorted(self.data[k])
-                v2=sorted(other.data[k])
-                while i1<len(v1) and i2<len(v2):
-                    if(v1[i1] == v2[i2]):
+                for value, vside, tail in self.value_events(kid):
+                    v = self.values[value]
+                    if vside == self.BOTH:
                         if say_both:
-                            logging.info("key {0} : {1} present in both, ok".format(k,v1[i1]))
-                        i1+=1
-                        i2+=1
-                    elif (v1[i1] < v2[i2]):
-                        self.show_error("key {0} : {1} present in '{2}' , missed in '{3}'".format(k,v1[i1],self.name,other.name),k,v1[i1])
-                        i1+=1
-                    elif(v1[i1] > v2[i2]):
-                        self.show_error("key {0} : {1} missed in '{2}' , present in '{3}'".format(k,v2[i2],self.name,other.name),k,v2[i2])
-                        i2+=1                              
-                    pass
-                
-                if(i1<len(v1)):
-                    while i1<len(v1):
-                        self.show_error("key {0} : {1} present in '{2}', missed in '{3}'".format(k,v1[i1],self.name,other.name),k,v1[i1])
-                        i1+=1
-                if(i2<len(v2)):
-                    while i2<len(v2):
-                        self.show_error("key {0} : {1} missed in '{2}' , present in '{3}'".format(k,v2[i2],self.name,other.name),k,v2[i2])
-                        i2+=1
-                pass
-        
+                            logging.info("key {0} : {1} present in both, ok".format(k,v))
+                    elif vside == self.LEFT:
+                        left.show(ErrorCode.VALUE_LEFT_ONLY_LAST if tail else ErrorCode.VALUE_LEFT_ONLY,k,v,r_name)
+                    else:
+                        left.show(ErrorCode.VALUE_RIGHT_ONLY,k,v,r_name)
+
+
+class KVMatrix:
+    """
+    Many KVSets aligned once on a shared key/value space. Every (key, value)
+    edge gets a presence bitmap over the sets (bit i: present in sets[i]), so
+    pairwise comparisons and "missing from any" reports are bitmap queries
+    instead of new scans of the sets. The bitmap queries (presence, query,
+    missing_from_any, patterns, count) see an edge once, however many times the
+    value is repeated under its key; diff() keeps the repetitions, like
+    KVSet.diff.
+    """
+    def __init__(self,sets):
+        self.sets = list(sets)
+        n = len(self.sets)
+        self.full = (1 << n) - 1
+        self.keys = sorted(set().union(*(s.data.keys() for s in self.sets)))
+        self.values = sorted(set(itertools.chain.from_iterable(
+            itertools.chain.from_iterable(s.data.values() for s in self.sets))))
+        key_id = self.key_id = {k: i for i, k in enumerate(self.keys)}
+        value_id = self.value_id = {v: i for i, v in enumerate(self.values)}
+        nv = len(self.values)
+        # bitmaps as an array of 64 bit words up to 64 sets, as Python ints beyond
+        self.key_masks = array('Q', bytes(8 * len(self.keys))) if n <= 64 else [0] * len(self.keys)
+        edges = {}
+        for i, s in enumerate(self.sets):
+            bit = 1 << i
+            for k, vs in s.data.items():
+                kid = key_id[k]
+                self.key_masks[kid] |= bit
+                base = kid * nv
+                for v in vs:
+                    e = base + value_id[v]
+                    edges[e] = edges.get(e, 0) | bit
+        # edge code = key ID * len(values) + value ID: sorted codes group the
+        # edges by key, with the values of every key in order
+        self.edge_codes = array('Q', sorted(edges))
+        self.edge_masks = array('Q', map(edges.__getitem__, self.edge_codes)) if n <= 64 \
+            else [edges[e] for e in self.edge_codes]
+        # first edge of every key ID (key_start[kid+1] = end)
+        self.key_start = array('Q', bytes(8 * (len(self.keys) + 1)))
+        for e in self.edge_codes:
+            self.key_start[e // nv + 1] += 1
+        for kid in range(len(self.keys)):
+            self.key_start[kid + 1] += self.key_start[kid]
+        # built on demand: see patterns() and rows()
+        self.pattern_counts = None
+        self.set_rows = {}
+        logging.info("KVMatrix: {0} sets, {1} keys, {2} values, {3} edges".format(
+            n,len(self.keys),len(self.values),len(self.edge_codes)))
+
+    def index(self,s):
+        """Return the position of a set given as position, name or KVSet."""
+        if isinstance(s, int):
+            return s
+        for i, x in enumerate(self.sets):
+            if x is s or x.name == s:
+                return i
+        raise KeyError(s)
+
+    def bits(self,sets):
+        mask = 0
+        for s in sets:
+            mask |= 1 << self.index(s)
+        return mask
+
+    def names(self,mask):
+        return [s.name for i, s in enumerate(self.sets) if mask >> i & 1]
+
+    def edge(self,pos):
+        kid, vid = divmod(self.edge_codes[pos], len(self.values))
+        return self.keys[kid], self.values[vid]
+
+    def presence(self,key,value=None):
+        """Bitmap of the sets containing key (or the edge key -> value)."""
+        kid = bisect.bisect_left(self.keys, key)
+        if kid == len(self.keys) or self.keys[kid] != key:
+            return 0
+        if value is None:
+            return self.key_masks[kid]
+        vid = bisect.bisect_left(self.values, value)
+        if vid == len(self.values) or self.values[vid] != value:
+            return 0
+        code = kid * len(self.values) + vid
+        pos = bisect.bisect_left(self.edge_codes, code, self.key_start[kid], self.key_start[kid + 1])
+        if pos < self.key_start[kid + 1] and self.edge_codes[pos] == code:
+            return self.edge_masks[pos]
+        return 0
+
+    def query(self,present=(),absent=()):
+        """Yield the (key, value) edges found in all the 'present' sets and in none of the 'absent' ones."""
+        want = self.bits(present)
+        test = want | self.bits(absent)
+        for pos, mask in enumerate(self.edge_masks):
+            if mask & test == want:
+                yield self.edge(pos)
+
+    def key_query(self,present=(),absent=()):
+        """Yield the keys found in all the 'present' sets and in none of the 'absent' ones."""
+        want = self.bits(present)
+        test = want | self.bits(absent)
+        for kid, mask in enumerate(self.key_masks):
+            if mask & test == want:
+                yield self.keys[kid]
+
+    def missing_from_any(self,sets=None):
+        """Yield (key, value, bitmap) for the edges missing from at least one of the sets (default: all)."""
+        scope = self.full if sets is None else self.bits(sets)
+        for pos, mask in enumerate(self.edge_masks):
+            if mask & scope != scope:
+                yield self.edge(pos) + (mask,)
+
+    def patterns(self):
+        """Count the edges by presence bitmap."""
+        if self.pattern_counts is None:
+            self.pattern_counts = collections.Counter(self.edge_masks)
+        return self.pattern_counts
+
+    def count(self,present=(),absent=()):
+        """Number of edges query(present, absent) would yield, from the bitmap histogram."""
+        want = self.bits(present)
+        test = want | self.bits(absent)
+        return sum(n for mask, n in self.patterns().items() if mask & test == want)
+
+    def rows(self,s):
+        """Return {key ID: sorted value IDs, repetitions included} of one of the sets, computed once and cached."""
+        i = self.index(s)
+        if i not in self.set_rows:
+            vid = self.value_id.__getitem__
+            key_id = self.key_id
+            self.set_rows[i] = {key_id[k]: array(KVDiff.ID_TYPECODE, sorted(map(vid, vs)))
+                                for k, vs in self.sets[i].data.items()}
+        return self.set_rows[i]
+
+    def diff(self,left,right,keys_only=False,keep_both=False):
+        """
+        Return a KVDiff of two of the sets, with the same differences (repeated
+        values included) as KVSet.diff: key sides from the bitmaps, values from rows().
+        """
+        i = self.index(left)
+        j = self.index(right)
+        scope = (1 << i) | (1 << j)
+        kids = [kid for kid, mask in enumerate(self.key_masks) if mask & scope]
+        key_side = bytearray(len(kids))
+        pairs = {}
+        if not keys_only:
+            rows_i = self.rows(i)
+            rows_j = self.rows(j)
+        for n, kid in enumerate(kids):
+            mask = self.key_masks[kid]
+            key_side[n] = (KVDiff.LEFT if mask >> i & 1 else 0) | (KVDiff.RIGHT if mask >> j & 1 else 0)
+            if keys_only or key_side[n] != KVDiff.BOTH:
+                continue
+            v1 = rows_i[kid]
+            v2 = rows_j[kid]
+            if keep_both or v1 != v2:
+                pairs[n] = (v1, v2)
+        return KVDiff(self.sets[i],self.sets[j],[self.keys[kid] for kid in kids],self.values,key_side,pairs)
+
+    def compare(self,left,right,msg="",keys_only=False,say_both=False):
+        self.diff(left,right,keys_only,say_both).render(msg,say_both)
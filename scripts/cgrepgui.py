@@ -1,14 +1,33 @@
 import sys
 import os
-import subprocess
-import clang.cindex
-from PyQt5 import QtWidgets, QtCore, QtGui
 import logging
-import tempfile
 import argparse
+import multiprocessing
+import sqlite3
+import hashlib
+import json
+import zlib
+import csv
+import re
+import collections
+import ctypes
+import subprocess
+import tempfile
+import threading
+import heapq
+import array
+import itertools
+import time
+import contextlib
+# clang.cindex (e PyQt5, in cgrepgui_qt) vengono importati solo quando servono: --help e l'avvio restano rapidi
 
 # Configuration variables
 BROWSER_COMMAND = "nautilus"  # External file browser command (change as needed)
+INDEX_CACHE_NAME = ".cgrepgui-cache.sqlite"  # Default file name of the persistent index cache
+SOURCE_CACHE_MAX_BYTES = 64 * 1024 * 1024  # Memory bound of the source file cache used to extract declarations
+PREPROCESS_COMMAND = ["gcc", "-E", "-P"]  # Preprocessor used by the recursive definition dump
+PREPROCESS_PARSE_ARGS = ['-std=c99']  # clang arguments used to parse the preprocessed source
+PREPROCESS_CACHE_SIZE = 8  # Preprocessed files (and parsed translation units) kept in memory
 
 # Configure logging for debugging purposes.
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -40,8 +59,7 @@ def parse_command_line_arguments():
     
     Returns a tuple containing:
     - file_list: list of files to process
-    - filter_macros: boolean indicating whether to filter macros
-    - macro_prefixes: list of macro prefixes to filter
+    - args: the parsed argparse namespace (filter_macros, macro_prefixes, jobs, ...)
     """
     parser = argparse.ArgumentParser(description='C Identifier Explorer - Browse and search C code identifiers')
     
@@ -72,6 +90,81 @@ def parse_command_line_arguments():
                         default=['__'],
                         help='List of macro prefixes to filter out (default: "__")')
     
+    # Opzioni per il parsing parallelo
+    parser.add_argument('-j', '--jobs',
+                        type=int,
+                        default=1,
+                        metavar='N',
+                        help='Parse files with N worker processes (0 = one per CPU, default: 1 = serial)')
+    
+    parser.add_argument('--skip-seen-headers',
+                        action='store_true',
+                        help='Walk the declarations of each header only in the first translation unit that includes it')
+    
+    parser.add_argument('--merge-declarations',
+                        action='store_true',
+                        help='Fold the declarations of a symbol (prototypes, extern variables) into its definition '
+                             'even when it is found in a later file; the declarations never defined are '
+                             'written after the last file (in --batch, memory then grows with them)')
+    
+    # Opzioni del database di compilazione (compile_commands.json)
+    parser.add_argument('-p', '--build-path',
+                        metavar='BUILD_DIR',
+                        help='Parse each translation unit with its flags from BUILD_DIR/compile_commands.json; '
+                             'headers included by a translation unit are not parsed on their own')
+    
+    # Opzioni per la cache persistente dell'indice
+    parser.add_argument('--cache',
+                        nargs='?',
+                        const='',
+                        metavar='FILE',
+                        help='Reuse a persistent index cache and re-parse only changed files '
+                             f'(default FILE: {INDEX_CACHE_NAME} in the common directory of the inputs)')
+    
+    parser.add_argument('--references',
+                        action='store_true',
+                        help='Also index the references to symbols (uses of variables, functions, types, fields '
+                             'and macros), for "Find usages"; stored in the index cache')
+    
+    # Opzioni per la misura dell'indicizzazione
+    parser.add_argument('--profile',
+                        nargs='?',
+                        const='',
+                        metavar='FILE',
+                        help='Measure the parse and traversal time, cursors, records and clang diagnostics of each '
+                             'file and log a summary table; with FILE also write them to FILE (see --profile-format)')
+    
+    parser.add_argument('--profile-format',
+                        choices=['json', 'trace'],
+                        default='json',
+                        help='Format of the --profile FILE: json, or trace for chrome://tracing and Perfetto '
+                             '(default: json)')
+    
+    parser.add_argument('-w', '--watch',
+                        action='store_true',
+                        help='Watch the input files and directories and reload changed files automatically')
+    
+    # Opzioni per la modalità batch (senza interfaccia grafica)
+    parser.add_argument('--batch',
+                        action='store_true',
+                        help='Do not open the window: write the records and exit (PyQt5 is not needed)')
+    
+    parser.add_argument('--format',
+                        choices=sorted(RECORD_WRITERS),
+                        default='jsonl',
+                        help='Output format of --batch (default: jsonl)')
+    
+    parser.add_argument('-o', '--output',
+                        metavar='FILE',
+                        help='Output file of --batch or --stats (default: standard output; required for sqlite)')
+    
+    parser.add_argument('--stats',
+                        nargs='?',
+                        const='text',
+                        choices=['text', 'json'],
+                        help='Do not open the window: print statistics of the indexed records '
+                             '(counts by type, extension, directory and file, macro density, largest declarations) and exit')
+    
     # Argomenti posizionali per i file e le directory
     parser.add_argument('paths', 
                         nargs='*',
@@ -85,14 +178,23 @@ def parse_command_line_arguments():
         raise ValueError(f"Invalid log level: {args.loglevel}")
     logging.getLogger().setLevel(numeric_level)
     
+    file_list = collect_input_files(args.paths, args.recursive, args.recursive_dir)
+    return file_list, args
+
+def collect_input_files(paths, recursive_all=False, recursive_dirs=None):
+    """
+    Returns the list of files to process for the given command line paths:
+    files are taken as they are, directories are listed (recursively if
+    recursive_all is set or the directory is in recursive_dirs).
+    """
     # Elabora i file e le directory
     file_list = []
-    recursive_dirs = args.recursive_dir or []
+    recursive_dirs = recursive_dirs or []
     
-    for path in args.paths:
+    for path in paths:
         if os.path.isdir(path):
             # Determina se la directory deve essere caricata ricorsivamente
-            recursive = args.recursive or path in recursive_dirs
+            recursive = recursive_all or path in recursive_dirs
             logging.info(f"Loading directory: {path} (recursive={recursive})")
             files = load_directory(path, recursive)
             file_list.extend(files)
@@ -102,33 +204,99 @@ def parse_command_line_arguments():
         else:
             logging.warning(f"Argument {path} is neither a valid file nor directory. Skipped.")
     
-    return file_list, args.filter_macros, args.macro_prefixes
+    return file_list
+
+def watched_directories(paths, recursive_all=False, recursive_dirs=None):
+    """Returns the directories to watch for added or removed files for the given command line paths."""
+    dirs = []
+    recursive_dirs = recursive_dirs or []
+    for path in paths:
+        if not os.path.isdir(path):
+            continue
+        if recursive_all or path in recursive_dirs:
+            dirs.extend(root for root, _, _ in os.walk(path))
+        else:
+            dirs.append(path)
+    return dirs
+
+_normalized_paths = {}
+
+def normalized_path(file_name):
+    """Return the canonical form of a file name reported by clang (memoized)."""
+    path = _normalized_paths.get(file_name)
+    if path is None:
+        path = os.path.realpath(file_name)
+        _normalized_paths[file_name] = path
+    return path
+
+class InputScope:
+    """
+    The input files indexed by normalized path, used to decide whether a
+    cursor belongs to the files being processed.
+    
+    A file reported by clang under another spelling (e.g. src/../inc/foo.h)
+    is resolved to the spelling used in the input file list, so that the same
+    declaration reached through different include paths gets the same key.
+    """
+    def __init__(self, file_list):
+        self.files = {}
+        for f in file_list:
+            self.files.setdefault(normalized_path(f), f)
+        self._names = {}
+        self._handles = {}
+    
+    def resolve(self, file_name):
+        """Return the input file spelling of a file name, or None if the file is not an input file."""
+        try:
+            return self._names[file_name]
+        except KeyError:
+            result = self.files.get(normalized_path(file_name))
+            self._names[file_name] = result
+            return result
+    
+    def contains(self, file_name):
+        return self.resolve(file_name) is not None
+    
+    def new_translation_unit(self):
+        """Forget the clang.cindex.File handles of the previous translation unit."""
+        self._handles.clear()
+    
+    def resolve_file(self, file_obj):
+        """Like resolve() for a clang.cindex.File, memoized on its handle within the current translation unit."""
+        handle = ctypes.cast(file_obj._as_parameter_, ctypes.c_void_p).value
+        try:
+            return self._handles[handle]
+        except KeyError:
+            result = self.resolve(file_obj.name)
+            self._handles[handle] = result
+            return result
+
+# Tipi di cursore per cui viene creato un record
+RECORD_CURSOR_KINDS = None
 
-def traverse_ast(cursor, results, input_files, filter_macros=True, macro_prefixes=None):
+def traverse_ast(cursor, results, input_files, filter_macros=True, macro_prefixes=None, type_nodes=None,
+                 references=None):
     """
-    Recursively traverse the AST and collect information about C objects.
-    Only process nodes belonging to the input files.
+    Traverse the AST (iteratively, in pre-order) and collect information about C objects.
+    Only process nodes belonging to the input files: the subtrees of cursors
+    located in other files are not visited.
     
     Args:
         cursor: The current cursor in the AST
         results: List to store the collected results
-        input_files: List of input files to process
+        input_files: The InputScope (or list) of input files to process
         filter_macros: Whether to filter out macros with certain prefixes
         macro_prefixes: List of macro prefixes to filter out
+        type_nodes: Optional list receiving the TypeNode of the type declarations found
+        references: Optional ReferenceCollector receiving the references to symbols
+            (DECL_REF_EXPR, TYPE_REF, MEMBER_REF_EXPR, CALL_EXPR, macro expansions)
+    
+    Returns the number of cursors visited.
     """
-    if macro_prefixes is None:
-        macro_prefixes = ['__']
-        
-    try:
-        file_name = cursor.location.file.name if cursor.location.file else None
-    except Exception as e:
-        logging.error(f"Error getting file name for cursor '{cursor.spelling}': {e}")
-        file_name = None
-
-    if file_name and not any(file_name.endswith(f) for f in input_files):
-        pass
-    else:
-        if cursor.kind in [
+    import clang.cindex
+    global RECORD_CURSOR_KINDS, TYPE_NODE_KINDS, REFERENCE_CURSOR_KINDS
+    if RECORD_CURSOR_KINDS is None:
+        RECORD_CURSOR_KINDS = frozenset([
             clang.cindex.CursorKind.MACRO_DEFINITION,
             clang.cindex.CursorKind.FUNCTION_DECL,
             clang.cindex.CursorKind.TYPEDEF_DECL,
@@ -139,29 +307,79 @@ def traverse_ast(cursor, results, input_files, filter_macros=True, macro_prefixe
             clang.cindex.CursorKind.FIELD_DECL,
             clang.cindex.CursorKind.VAR_DECL,        # Global variables (and locals)
             clang.cindex.CursorKind.UNION_DECL       # Union declarations
-        ]:
+        ])
+        TYPE_NODE_KINDS = frozenset([
+            clang.cindex.CursorKind.TYPEDEF_DECL,
+            clang.cindex.CursorKind.STRUCT_DECL,
+            clang.cindex.CursorKind.UNION_DECL,
+            clang.cindex.CursorKind.ENUM_DECL
+        ])
+        REFERENCE_CURSOR_KINDS = frozenset([
+            clang.cindex.CursorKind.DECL_REF_EXPR,
+            clang.cindex.CursorKind.TYPE_REF,
+            clang.cindex.CursorKind.MEMBER_REF_EXPR,
+            clang.cindex.CursorKind.CALL_EXPR,
+            clang.cindex.CursorKind.MACRO_INSTANTIATION
+        ])
+    if macro_prefixes is None:
+        macro_prefixes = ['__']
+    macro_prefixes = tuple(macro_prefixes)
+    if isinstance(input_files, InputScope):
+        scope = input_files
+    else:
+        scope = InputScope(input_files)
+    
+    # I messaggi di debug, uno per record, sono costosi anche solo da preparare: deciso una volta per chiamata
+    debug = logging.getLogger().isEnabledFor(logging.DEBUG)
+    visited = 0
+    
+    # Pila esplicita al posto della ricorsione: AST molto profondi non raggiungono il limite di ricorsione
+    stack = [cursor]
+    while stack:
+        cursor = stack.pop()
+        visited += 1
+        try:
+            location_file = cursor.location.file
+            file_name = scope.resolve_file(location_file) if location_file else None
+            if location_file and file_name is None:
+                # Cursore fuori dai file di input: salta l'intero sottoalbero
+                continue
+        except Exception as e:
+            logging.error(f"Error getting file name for cursor '{cursor.spelling}': {e}")
+            file_name = None
+        
+        if cursor.kind in RECORD_CURSOR_KINDS:
             # Filtra le macro se richiesto
-            if filter_macros and cursor.kind == clang.cindex.CursorKind.MACRO_DEFINITION:
-                name = cursor.spelling
-                if any(name.startswith(prefix) for prefix in macro_prefixes):
-                    # Salta questa macro perché inizia con un prefisso da filtrare
-                    logging.debug(f"Filtered out macro: {name}")
-                    pass
-                else:
-                    # Aggiungi la macro perché non corrisponde ai prefissi da filtrare
-                    record = create_record(cursor, file_name)
-                    results.append(record)
-                    logging.debug(f"Record added: {record}")
+            if filter_macros and cursor.kind == clang.cindex.CursorKind.MACRO_DEFINITION \
+                    and cursor.spelling.startswith(macro_prefixes):
+                # Salta questa macro perché inizia con un prefisso da filtrare
+                if debug:
+                    logging.debug("Filtered out macro: %s", cursor.spelling)
             else:
-                # Per tutti gli altri tipi, aggiungi sempre il record
+                # Per tutti gli altri tipi (e le macro non filtrate), aggiungi il record
                 record = create_record(cursor, file_name)
                 results.append(record)
-                logging.debug(f"Record added: {record}")
-    
-    for child in cursor.get_children():
-        traverse_ast(child, results, input_files, filter_macros, macro_prefixes)
+                if debug:
+                    logging.debug("Record added: %s", record)
+                if type_nodes is not None and file_name and cursor.kind in TYPE_NODE_KINDS:
+                    node = create_type_node(cursor, file_name)
+                    if node is not None:
+                        type_nodes.append(node)
+        elif references is not None and file_name and cursor.kind in REFERENCE_CURSOR_KINDS:
+            # Le espansioni delle macro filtrate non vengono registrate
+            if not (filter_macros and cursor.kind == clang.cindex.CursorKind.MACRO_INSTANTIATION
+                    and cursor.spelling.startswith(macro_prefixes)):
+                references.add(cursor, file_name, scope)
+        
+        # I figli vanno in pila in ordine inverso per visitarli nell'ordine originale
+        children = list(cursor.get_children())
+        children.reverse()
+        stack.extend(children)
+    return visited
+
 def create_record(cursor, file_name):
     """Create a record for the given cursor."""
+    import clang.cindex
     record = {}
     record["Type"] = str(cursor.kind).split('.')[-1]
     record["Name"] = cursor.spelling
@@ -181,6 +399,13 @@ def create_record(cursor, file_name):
     else:
         record["IsAnonymous"] = is_anonymous
     
+    # clang recenti chiamano i tipi anonimi "struct (unnamed at <file>:<line>:<col>)" usando il
+    # percorso con cui il file è stato incluso: usa quello dei file di input per avere nomi stabili
+    if file_name and ("(unnamed at " in record["Name"] or "(anonymous at " in record["Name"]):
+        clang_file_name = cursor.location.file.name
+        if clang_file_name != file_name:
+            record["Name"] = record["Name"].replace(clang_file_name, file_name)
+    
     # Informazioni di base per il campo Details
     if cursor.kind == clang.cindex.CursorKind.FUNCTION_DECL:
         record["Details"] = cursor.type.spelling
@@ -206,14 +431,431 @@ def create_record(cursor, file_name):
     
     # Aggiungi la dichiarazione completa C
     record["Declaration"] = extract_full_declaration(cursor)
+    # Identità del simbolo (vedi symbol_id) e se questo è il punto in cui è definito
+    record["Usr"] = cursor.get_usr()
+    record["IsDefinition"] = cursor.kind == clang.cindex.CursorKind.MACRO_DEFINITION or cursor.is_definition()
     
     return record
 
+# Tipi di cursore registrati come riferimenti (inizializzato al primo uso, vedi traverse_ast)
+REFERENCE_CURSOR_KINDS = None
+
+# Tipo delle voci di ReferenceCollector che indicano dove è dichiarato o definito un simbolo
+REFERENCE_SITE = "DECLARATION"
+
+class ReferenceCollector:
+    """
+    The references found while walking one translation unit, as a list of
+    [usr, kind, file, line, column, symbol file] (kind is the cursor kind of the
+    reference, symbol file the file of the referenced declaration: with the USR
+    it gives the symbol_id). For each referenced symbol the sites of its
+    declaration and definition in the input files are also listed, with kind
+    REFERENCE_SITE: they link the rows of the table to the USR of their symbol.
+    """
+    def __init__(self):
+        self.entries = []
+        self._seen = set()
+        self._sited = set()
+    
+    def add(self, cursor, file_name, scope):
+        referenced = cursor.referenced
+        if referenced is None:
+            return
+        usr = referenced.get_usr()
+        if not usr:
+            return
+        location = cursor.location
+        # Il file della dichiarazione distingue i simboli interni (static) di file con lo stesso nome
+        symbol_file = referenced.location.file
+        symbol_file = symbol_file.name if symbol_file is not None else ""
+        # Lo stesso riferimento può essere raggiunto più volte (es. CALL_EXPR e il suo DECL_REF_EXPR)
+        key = (usr, symbol_file, file_name, location.line, location.column)
+        if key in self._seen:
+            return
+        self._seen.add(key)
+        self.entries.append([usr, cursor.kind.name, file_name, location.line, location.column, symbol_file])
+        if (usr, symbol_file) in self._sited:
+            return
+        self._sited.add((usr, symbol_file))
+        sites = set()
+        for site in (referenced, referenced.canonical, referenced.get_definition()):
+            site_file = site.location.file if site is not None else None
+            site_name = scope.resolve_file(site_file) if site_file else None
+            if site_name:
+                sites.add((site_name, site.location.line, site.location.column))
+        for site_name, line, column in sorted(sites):
+            self.entries.append([usr, REFERENCE_SITE, site_name, line, column, symbol_file])
+
+class ReferenceIndex:
+    """
+    Inverted index of the references to the symbols of the indexed files, by
+    symbol_id (the clang USR, qualified with the file for the internal symbols,
+    as in SymbolIndex): for each symbol the (file, line, column, kind) of its
+    references, packed as ids in an array('I'), and the declaration/definition
+    sites of the referenced symbols, mapping a record (File, Line, Column) to its USR.
+    Built by iter_file_results from the references of each ParsedFile (also
+    when they come from the IndexCache).
+    """
+    def __init__(self):
+        self.files = []       # id -> file
+        self.kinds = []       # id -> tipo di cursore del riferimento
+        self.usrs = []        # symbol id -> usr
+        self.usages = []      # symbol id -> array('I') di (file id, linea, colonna, tipo id) consecutivi
+        self.sites = {}       # (file, linea, colonna) -> symbol id
+        self._file_ids = {}
+        self._kind_ids = {}
+        self._usr_ids = {}    # symbol_id -> symbol id
+        self._seen = set()    # (symbol id, file id, linea, colonna) già registrati, come in iter_unique_records
+        self.count = 0
+    
+    @staticmethod
+    def _id(value, values, ids):
+        value_id = ids.get(value)
+        if value_id is None:
+            value_id = ids[value] = len(values)
+            values.append(value)
+        return value_id
+    
+    def add(self, references):
+        """Add the references of a translation unit (ReferenceCollector entries)."""
+        for usr, kind, file_name, line, column, symbol_file in references:
+            symbol = symbol_id(usr, symbol_file)
+            usr_id = self._usr_ids.get(symbol)
+            if usr_id is None:
+                usr_id = self._usr_ids[symbol] = len(self.usrs)
+                self.usrs.append(usr)
+                self.usages.append(array.array('I'))
+            if kind == REFERENCE_SITE:
+                self.sites.setdefault((file_name, line, column), usr_id)
+                continue
+            file_id = self._id(file_name, self.files, self._file_ids)
+            # I riferimenti negli header si ripetono in ogni translation unit che li include
+            key = (usr_id, file_id, line, column)
+            if key in self._seen:
+                continue
+            self._seen.add(key)
+            self.usages[usr_id].extend((file_id, line, column, self._id(kind, self.kinds, self._kind_ids)))
+            self.count += 1
+    
+    def __len__(self):
+        return self.count
+    
+    def usr_at(self, file_name, line, column):
+        """Return the USR of the symbol declared or defined at (file_name, line, column), or None."""
+        usr_id = self.sites.get((file_name, line, column))
+        return self.usrs[usr_id] if usr_id is not None else None
+    
+    def find_usages(self, usr, file_name):
+        """
+        Return the references to the symbol usr declared in file_name (see
+        symbol_id) as sorted (file, line, column, kind) tuples.
+        """
+        usr_id = self._usr_ids.get(symbol_id(usr, file_name))
+        if usr_id is None:
+            return []
+        packed = self.usages[usr_id]
+        return sorted((self.files[packed[i]], packed[i + 1], packed[i + 2], self.kinds[packed[i + 3]])
+                      for i in range(0, len(packed), 4))
+
+# Nodo del grafo delle dipendenze tra tipi: un typedef o la definizione di una struct/union/enum,
+# con la sua estensione (offset in byte nel file) e i tipi (kind, nome, file normalizzato) che usa
+TypeNode = collections.namedtuple("TypeNode", ["kind", "name", "file", "start", "end", "deps"])
+
+# Nome di un tipo anonimo secondo clang: "union (unnamed at <file>:<linea>:<colonna>)"
+ANONYMOUS_TYPE_PATTERN = re.compile(r"\((unnamed|anonymous) at (.+?):(\d+):(\d+)\)")
+
+def type_node_name(spelling):
+    """
+    Return the name of a type in the TypeGraph: the spelling, with the path of
+    an anonymous type normalized (clang uses the path the header was included by).
+    """
+    if "(" not in spelling:
+        return spelling
+    return ANONYMOUS_TYPE_PATTERN.sub(
+        lambda m: f"({m.group(1)} at {normalized_path(m.group(2))}:{m.group(3)}:{m.group(4)})", spelling)
+
+# Tipi di cursore che diventano nodi del grafo dei tipi (inizializzato al primo uso, vedi traverse_ast)
+TYPE_NODE_KINDS = None
+
+def _collect_type_dependencies(cursor, file_spelling, start, end, deps, seen):
+    """
+    Add to deps the (kind, name) of the types used by a typedef or a struct/union
+    (fields). Types declared inside [start, end) of the node (e.g. the struct
+    body of a typedef) are part of the node: their own dependencies are added.
+    """
+    import clang.cindex
+    kinds = clang.cindex.CursorKind
+    type_kinds = clang.cindex.TypeKind
+    if cursor.kind == kinds.TYPEDEF_DECL:
+        pending = [cursor.underlying_typedef_type]
+    elif cursor.kind in (kinds.STRUCT_DECL, kinds.UNION_DECL):
+        pending = [child.type for child in cursor.get_children() if child.kind == kinds.FIELD_DECL]
+    else:
+        return
+    while pending:
+        type_obj = pending.pop()
+        # Risali al tipo di base di puntatori, array e tipi elaborati ("struct x")
+        while True:
+            if type_obj.kind == type_kinds.POINTER:
+                type_obj = type_obj.get_pointee()
+            elif type_obj.kind in (type_kinds.CONSTANTARRAY, type_kinds.INCOMPLETEARRAY,
+                                   type_kinds.VARIABLEARRAY):
+                type_obj = type_obj.element_type
+            elif type_obj.kind == type_kinds.ELABORATED:
+                type_obj = type_obj.get_named_type()
+            else:
+                break
+        if type_obj.kind == type_kinds.FUNCTIONPROTO:
+            pending.append(type_obj.get_result())
+            pending.extend(type_obj.argument_types())
+            continue
+        if type_obj.kind == type_kinds.FUNCTIONNOPROTO:
+            pending.append(type_obj.get_result())
+            continue
+        decl = type_obj.get_declaration()
+        if decl.kind not in TYPE_NODE_KINDS:
+            continue
+        decl_extent = decl.extent
+        decl_file = decl_extent.start.file
+        if decl_file is not None and decl_file.name == file_spelling \
+                and start <= decl_extent.start.offset and decl_extent.end.offset <= end:
+            # Tipo definito dentro il nodo stesso (o il nodo stesso, per i puntatori ricorsivi)
+            inner = (decl_extent.start.offset, decl_extent.end.offset)
+            if inner != (start, end) and inner not in seen:
+                seen.add(inner)
+                _collect_type_dependencies(decl, file_spelling, start, end, deps, seen)
+            continue
+        key = (decl.kind.name, type_node_name(decl.spelling),
+               normalized_path(decl_file.name) if decl_file is not None else "")
+        if key not in deps:
+            deps.append(key)
+
+def create_type_node(cursor, file_name):
+    """
+    Return the TypeNode of a typedef or of a struct/union/enum definition found
+    in file_name, or None (forward declarations, extents spanning other files).
+    """
+    import clang.cindex
+    if cursor.kind != clang.cindex.CursorKind.TYPEDEF_DECL and not cursor.is_definition():
+        return None
+    extent = cursor.extent
+    start_file = extent.start.file
+    end_file = extent.end.file
+    location_file = cursor.location.file
+    if start_file is None or end_file is None or location_file is None \
+            or start_file.name != location_file.name or end_file.name != location_file.name:
+        return None
+    deps = []
+    _collect_type_dependencies(cursor, location_file.name, extent.start.offset, extent.end.offset, deps, set())
+    return TypeNode(cursor.kind.name, type_node_name(cursor.spelling), file_name, extent.start.offset,
+                    extent.end.offset, tuple(deps))
+
+class TypeGraph:
+    """
+    Type dependency graph (typedef -> struct/union/enum -> field types) of the
+    indexed files, built from the TypeNode collected while indexing. Nodes are
+    keyed by (kind, name, normalized file), so same-named types of different
+    files stay apart; key() and find_type() pick among them by file.
+    dump() writes a type with everything it depends on, dependencies first,
+    slicing each definition from its file by extent.
+    """
+    def __init__(self):
+        self.nodes = {}      # (kind, name, file normalizzato) -> TypeNode
+        self._by_name = collections.defaultdict(list)   # (kind, name) -> chiavi dei nodi, in ordine di arrivo
+        self._by_file = collections.defaultdict(list)
+        self._owners = {}    # file -> {(start, end): nodo più esterno che contiene quell'estensione}
+    
+    def add(self, nodes):
+        for node in nodes:
+            node = TypeNode(*node[:5], tuple(tuple(dep) for dep in node[5]))
+            key = (node.kind, node.name, normalized_path(node.file))
+            if key not in self.nodes:
+                self.nodes[key] = node
+                self._by_name[key[:2]].append(key)
+                self._by_file[node.file].append(node)
+                self._owners.pop(node.file, None)
+    
+    def key(self, kind, name, file_name=None):
+        """
+        Return the key of the node of type kind/name, or None: the one defined in
+        file_name if any, otherwise the first one indexed.
+        """
+        candidates = self._by_name.get((kind, type_node_name(name)))
+        if not candidates:
+            return None
+        if file_name and len(candidates) > 1:
+            path = normalized_path(file_name)
+            for key in candidates:
+                if key[2] == path:
+                    return key
+        return candidates[0]
+    
+    def __len__(self):
+        return len(self.nodes)
+    
+    def owner(self, node):
+        """
+        Return the outermost node containing node (node itself if none): a struct
+        defined inside a typedef is written as part of the typedef.
+        """
+        owners = self._owners.get(node.file)
+        if owners is None:
+            owners = {}
+            outer = None
+            for other in sorted(self._by_file[node.file], key=lambda n: (n.start, -n.end)):
+                if outer is None or other.start >= outer.end:
+                    outer = other
+                owners[(other.start, other.end)] = outer
+            self._owners[node.file] = owners
+        return owners.get((node.start, node.end), node)
+    
+    def find_type(self, type_spelling, file_name=None):
+        """
+        Return the key of the node of a type spelling like "const struct point *",
+        or None; file_name (where the type is used) picks among same-named types.
+        """
+        words = [word for word in type_spelling.split("[")[0].replace("*", " ").split()
+                 if word not in ("const", "volatile", "restrict")]
+        if len(words) == 2 and words[0] in ("struct", "union", "enum"):
+            return self.key(words[0].upper() + "_DECL", words[1], file_name)
+        return self.key("TYPEDEF_DECL", " ".join(words), file_name)
+    
+    def ordered(self, keys):
+        """
+        Return the nodes needed to define the types in keys, each dependency
+        before its users (depth-first; cycles, possible only through pointers,
+        are broken where they are found).
+        """
+        result = []
+        done = set()
+        for key in keys:
+            if key not in self.nodes:
+                continue
+            stack = [(self.owner(self.nodes[key]), None)]
+            visiting = set()
+            while stack:
+                node, deps = stack.pop()
+                node_id = (node.file, node.start, node.end)
+                if deps is None:
+                    if node_id in done or node_id in visiting:
+                        continue
+                    visiting.add(node_id)
+                    deps = iter(node.deps)
+                for dep in deps:
+                    dep_node = self.nodes.get(dep)
+                    if dep_node is None:
+                        # es. un tipo usato tramite una dichiarazione anticipata in un altro file
+                        dep_key = self.key(dep[0], dep[1], node.file)
+                        if dep_key is None:
+                            continue
+                        dep_node = self.nodes[dep_key]
+                    dep_node = self.owner(dep_node)
+                    dep_id = (dep_node.file, dep_node.start, dep_node.end)
+                    if dep_id not in done and dep_id not in visiting:
+                        stack.append((node, deps))
+                        stack.append((dep_node, None))
+                        break
+                else:
+                    visiting.discard(node_id)
+                    done.add(node_id)
+                    result.append(node)
+        return result
+    
+    @staticmethod
+    def definition_text(node):
+        """Return the source text of a node (its extent, from SOURCE_CACHE) followed by ';'."""
+        return SOURCE_CACHE.slice(node.file, node.start, node.end) + ";"
+    
+    def dump(self, keys):
+        """Return the definitions needed by the types in keys, in dependency order, or None."""
+        nodes = self.ordered(keys)
+        if not nodes:
+            return None
+        return "\n\n".join(self.definition_text(node) for node in nodes)
+
+class SourceCache:
+    """
+    Bounded LRU cache of source file contents, used to slice declarations by
+    byte offset instead of reading the whole file again for every cursor.
+    
+    A cached file is checked again (one stat) the first time it is used after
+    new_generation(), which is called before walking each translation unit.
+    Shared by the indexing thread and the definition dump and export of the
+    interface, so get() is locked.
+    """
+    def __init__(self, max_bytes=SOURCE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        self._buffers = collections.OrderedDict()  # path -> [content, (mtime_ns, size), generation]
+    
+    def new_generation(self):
+        self.generation += 1
+    
+    def _drop(self, path):
+        content = self._buffers.pop(path)[0]
+        self.size -= len(content)
+    
+    def get(self, path):
+        """Return the content (bytes) of a source file."""
+        with self.lock:
+            return self._get(path)
+    
+    def _get(self, path):
+        entry = self._buffers.get(path)
+        if entry is not None and entry[2] != self.generation:
+            st = os.stat(path)
+            if (st.st_mtime_ns, st.st_size) != entry[1]:
+                self._drop(path)
+                entry = None
+            else:
+                entry[2] = self.generation
+        if entry is not None:
+            self.hits += 1
+            self._buffers.move_to_end(path)
+            return entry[0]
+        
+        self.misses += 1
+        st = os.stat(path)
+        with open(path, 'rb') as f:
+            content = f.read()
+        self._buffers[path] = [content, (st.st_mtime_ns, st.st_size), self.generation]
+        self.size += len(content)
+        # Libera i file usati meno di recente (tenendo sempre almeno quello appena letto)
+        while self.size > self.max_bytes and len(self._buffers) > 1:
+            self._drop(next(iter(self._buffers)))
+            self.evictions += 1
+        return content
+    
+    def slice(self, path, start, end):
+        """Return the text between two byte offsets of a source file."""
+        return self.get(path)[start:end].decode('utf-8', errors='replace')
+    
+    def counters(self):
+        """Return the (hits, misses, evictions) counters, see SOURCE_CACHE_COUNTERS."""
+        return (self.hits, self.misses, self.evictions)
+    
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "files": len(self._buffers), "bytes": self.size}
+
+# Contatori di SourceCache.counters(), sommati tra i processi in ParsedFile.source_stats
+SOURCE_CACHE_COUNTERS = ("hits", "misses", "evictions")
+
+# Cache dei sorgenti del processo corrente (ogni worker ha la propria: i contatori
+# di ogni file analizzato tornano con il suo ParsedFile, vedi iter_unique_records)
+SOURCE_CACHE = SourceCache()
+
 def extract_full_declaration(cursor):
     """
     Estrae la dichiarazione completa C per un cursore.
     Questo è un tentativo di ricostruire la dichiarazione originale.
     """
+    import clang.cindex
     try:
         # Ottieni l'estensione del cursore (inizio e fine)
         start = cursor.extent.start
@@ -222,32 +864,15 @@ def extract_full_declaration(cursor):
         if not start.file or not end.file:
             return ""
             
-        # Leggi il file sorgente
-        with open(start.file.name, 'r') as f:
-            source_lines = f.readlines()
+        # Estrai il testo della dichiarazione tramite gli offset in byte, dal contenuto in cache del file
+        text = SOURCE_CACHE.slice(start.file.name, start.offset, end.offset)
         
-        # Estrai le linee rilevanti
         if start.line == end.line:
             # Dichiarazione su una singola linea
-            line = source_lines[start.line - 1]
-            declaration = line[start.column - 1:end.column - 1].strip()
+            declaration = text.strip()
         else:
-            # Dichiarazione su più linee
-            declaration_lines = []
-            
-            # Prima linea (dalla colonna di inizio fino alla fine)
-            first_line = source_lines[start.line - 1]
-            declaration_lines.append(first_line[start.column - 1:].rstrip())
-            
-            # Linee intermedie (complete)
-            for line_num in range(start.line, end.line - 1):
-                declaration_lines.append(source_lines[line_num].rstrip())
-            
-            # Ultima linea (dall'inizio fino alla colonna di fine)
-            last_line = source_lines[end.line - 1]
-            declaration_lines.append(last_line[:end.column - 1].rstrip())
-            
-            declaration = '\n'.join(declaration_lines)
+            # Dichiarazione su più linee: rimuovi gli spazi a fine riga
+            declaration = '\n'.join(line.rstrip() for line in text.split('\n'))
         
         # Per alcune dichiarazioni, potremmo voler aggiungere un punto e virgola se manca
         if cursor.kind in [clang.cindex.CursorKind.STRUCT_DECL, 
@@ -262,1504 +887,1174 @@ def extract_full_declaration(cursor):
         logging.error(f"Error extracting declaration for {cursor.spelling}: {e}")
         return ""
     
-def process_files(file_list, filter_macros=True, macro_prefixes=None):
+# Ordine dei campi di un record quando viene serializzato come tupla compatta
+# (usato per passare i risultati dai processi worker al processo principale)
+RECORD_FIELDS = ("Type", "Name", "File", "Line", "Column", "IsAnonymous", "Details", "Declaration",
+                 "Usr", "IsDefinition")
+
+# Argomenti passati a clang per ogni file
+CLANG_PARSE_ARGS = ['-std=c99', '-Xclang', '-detailed-preprocessing-record']
+
+# Opzioni di compilazione inutili per libclang (uscita, dipendenze per make), con il numero di argomenti che le seguono
+COMPILE_COMMAND_DROPPED_OPTIONS = {"-c": 0, "-o": 1, "-MF": 1, "-MT": 1, "-MQ": 1,
+                                   "-M": 0, "-MM": 0, "-MD": 0, "-MMD": 0, "-MP": 0, "-MG": 0}
+# Opzioni il cui percorso, relativo alla directory del comando, viene reso assoluto
+COMPILE_COMMAND_PATH_OPTIONS = ("-I", "-isystem", "-iquote", "-idirafter", "-include", "-imacros",
+                                "-isysroot", "--sysroot")
+
+class CompileCommands:
     """
-    Process a list of C/C++ files, parse them with clang, and collect all C objects.
-    
-    Args:
-        file_list: List of files to process
-        filter_macros: Whether to filter out macros with certain prefixes
-        macro_prefixes: List of macro prefixes to filter out
+    The clang arguments of each translation unit listed in the
+    compile_commands.json of a build directory (see -p), by normalized path.
+
+    The compiler, the source file and the output and make-dependency options
+    are dropped, and relative include paths are made absolute (the files are
+    parsed from the current directory, not from the one of the command): clang
+    then reports the headers with paths that resolve to the input files.
     """
-    if macro_prefixes is None:
-        macro_prefixes = ['__']
-        
-    index = clang.cindex.Index.create()
-    all_results = []
+    def __init__(self, build_path):
+        self.build_path = build_path
+        self.path = os.path.join(build_path, "compile_commands.json")
+        self.commands = {}  # percorso normalizzato -> argomenti di clang
+        self.mtime_ns = None
+        self.load()
+
+    def load(self):
+        """Read the compilation database (ValueError if the build directory does not have one)."""
+        import clang.cindex
+        try:
+            mtime_ns = os.stat(self.path).st_mtime_ns
+            database = clang.cindex.CompilationDatabase.fromDirectory(self.build_path)
+        except (OSError, clang.cindex.CompilationDatabaseError):
+            raise ValueError(f"cannot load the compilation database {self.path}")
+        commands = {}
+        for command in database.getAllCompileCommands():
+            source = os.path.join(command.directory, command.filename)
+            # Un file compilato più volte (es. con opzioni diverse per due target) usa il primo comando
+            commands.setdefault(normalized_path(source),
+                                self.clang_arguments(command.directory, list(command.arguments), source))
+        self.commands = commands
+        self.mtime_ns = mtime_ns
+        logging.info(f"Compilation database {self.path}: {len(commands)} translation units")
+
+    def refresh(self):
+        """Read the compilation database again if it changed; return True if it was read."""
+        try:
+            changed = os.stat(self.path).st_mtime_ns != self.mtime_ns
+        except OSError:
+            changed = True
+        if changed:
+            self.load()
+        return changed
+
+    @staticmethod
+    def clang_arguments(directory, arguments, source):
+        """Return the clang arguments of a compile command (see the class documentation)."""
+        result = []
+        source_path = normalized_path(source)
+        words = iter(arguments[1:])
+        for word in words:
+            if word in COMPILE_COMMAND_DROPPED_OPTIONS:
+                for _ in range(COMPILE_COMMAND_DROPPED_OPTIONS[word]):
+                    next(words, None)
+                continue
+            if not word.startswith("-") and normalized_path(os.path.join(directory, word)) == source_path:
+                continue
+            if word in COMPILE_COMMAND_PATH_OPTIONS:
+                result.append(word)
+                word = os.path.join(directory, next(words, ""))
+            elif word.startswith("-I") and len(word) > 2:
+                # Forma attaccata: -I../include
+                word = "-I" + os.path.join(directory, word[2:])
+            result.append(word)
+        return result + ['-Xclang', '-detailed-preprocessing-record']
+
+    def __len__(self):
+        return len(self.commands)
+
+    def arguments(self, f):
+        """Return the clang arguments of file f, or None if it is not a translation unit of the database."""
+        return self.commands.get(normalized_path(f))
+
+    def schedule(self, file_list):
+        """
+        Split file_list into its translation units, largest source first (so that
+        the longest parses start first when they are spread over the workers),
+        and the other files, in file_list order.
+        """
+        units = []
+        others = []
+        for f in file_list:
+            if self.arguments(f) is not None:
+                try:
+                    size = os.path.getsize(f)
+                except OSError:
+                    size = 0
+                units.append((-size, len(units), f))
+            else:
+                others.append(f)
+        return [f for _, _, f in sorted(units)], others
+
+def parse_arguments(f, compile_commands=None):
+    """Return the clang arguments used to parse f: its compile command, if any, else CLANG_PARSE_ARGS."""
+    if compile_commands is not None:
+        args = compile_commands.arguments(f)
+        if args is not None:
+            return args
+    return CLANG_PARSE_ARGS
+
+def record_to_tuple(record):
+    """Convert a record dict into a compact tuple ordered as RECORD_FIELDS."""
+    return tuple(record[field] for field in RECORD_FIELDS)
+
+def record_from_tuple(values):
+    """Rebuild a record dict from a tuple produced by record_to_tuple."""
+    return dict(zip(RECORD_FIELDS, values))
+
+def symbol_id(usr, file_name):
+    """
+    Return the identity of a symbol from its clang USR. USRs of symbols with
+    external linkage and of named types ("c:@...") are global; the others
+    (statics, macros, locals, typedefs) only contain the base name of their
+    file, so they are qualified with the (normalized) file to tell apart
+    same-named files.
+    """
+    if not usr or usr.startswith("c:@"):
+        return usr
+    return f"{usr}@{normalized_path(file_name)}"
+
+def record_key(record):
+    """
+    Return the key used to deduplicate records. A declaration with a USR is
+    keyed by (Type, symbol id), shared by all the declarations of the symbol;
+    a definition also by its normalized file, so that distinct definitions of
+    one external USR (a main per program, per-board variants of a function)
+    keep a record each. key[:2] of a definition is the key of its declarations
+    (see iter_unique_records). Records without a USR: (Type, Name, File, Line).
+    """
+    usr = record.get("Usr")
+    if usr:
+        key = (record.get("Type", ""), symbol_id(usr, record.get("File", "")))
+        if record.get("IsDefinition"):
+            return key + (normalized_path(record.get("File", "")),)
+        return key
+    return (
+        record.get("Type", ""),
+        record.get("Name", ""),
+        record.get("File", ""),
+        record.get("Line", 0)
+    )
+
+class SymbolIndex:
+    """
+    The declaration and definition sites of every symbol, by symbol id (see
+    symbol_id): the table keeps a single record per symbol (see record_key),
+    this index keeps all the places where the symbol is declared or defined.
+    """
+    def __init__(self):
+        self.sites = {}  # symbol id -> [(file, linea, colonna, è una definizione)]
     
-    # Dizionario per tenere traccia degli elementi già processati
-    # La chiave è una tupla (tipo, nome, file, linea)
-    processed_items = {}
+    def add(self, records):
+        for record in records:
+            usr = record.get("Usr")
+            if not usr:
+                continue
+            site = (record["File"], record["Line"], record["Column"], bool(record.get("IsDefinition")))
+            sites = self.sites.setdefault(symbol_id(usr, record["File"]), [])
+            if site not in sites:
+                sites.append(site)
     
-    for f in file_list:
-        logging.info(f"Processing file: {f}")
-        tu = index.parse(f, args=['-std=c99', '-Xclang', '-detailed-preprocessing-record'])
-        
-        # Risultati temporanei per questo file
-        file_results = []
-        traverse_ast(tu.cursor, file_results, file_list, filter_macros, macro_prefixes)
-        
-        # Filtra i duplicati prima di aggiungerli ai risultati finali
-        for record in file_results:
-            # Crea una chiave univoca per ogni record
-            key = (
-                record.get("Type", ""),
-                record.get("Name", ""),
-                record.get("File", ""),
-                record.get("Line", 0)
-            )
-            
-            # Se questo elemento non è già stato processato, aggiungilo ai risultati
-            if key not in processed_items:
-                processed_items[key] = record
-                all_results.append(record)
-            else:
-                logging.debug(f"Skipping duplicate: {key}")
+    def __len__(self):
+        return len(self.sites)
     
-    logging.info("Finished processing files.")
-    return all_results
+    def sites_of(self, usr, file_name):
+        """Return the sites of the symbol with this USR found in file_name, definitions first."""
+        return sorted(self.sites.get(symbol_id(usr, file_name), []), key=lambda site: not site[3])
+    
+    def definition(self, usr, file_name):
+        """Return the (file, line, column) of the definition of a symbol, or None if not found."""
+        for site_file, line, column, is_definition in self.sites.get(symbol_id(usr, file_name), []):
+            if is_definition:
+                return (site_file, line, column)
+        return None
 
+def file_digest(path):
+    """Return the SHA-1 hex digest of a file's content."""
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
 
-class ReadOnlyCheckBoxDelegate(QtWidgets.QStyledItemDelegate):
+def default_cache_path(file_list):
+    """Return the default index cache location: the common directory of the input files."""
+    try:
+        base = os.path.commonpath([os.path.dirname(os.path.abspath(f)) for f in file_list])
+    except ValueError:
+        base = os.getcwd()
+    return os.path.join(base, INDEX_CACHE_NAME)
+
+class IndexCache:
     """
-    Un delegato personalizzato che mostra una casella di controllo per i valori booleani,
-    ma non permette di modificarli (sola lettura).
+    Cache of the records produced by parsing each file, persisted in SQLite
+    (or kept in memory only when path is None).
+    
+    An entry is keyed by file path and by a fingerprint of the parse settings
+    (clang arguments, macro filtering); it is valid while the file is parsed
+    with the same clang arguments (see CompileCommands), has the same
+    mtime and size (or, failing that, the same content hash) and every header
+    included by its translation unit is unchanged and still in or out of the
+    input file set as it was when the entry was written.
     """
-    def __init__(self, parent=None):
-        super(ReadOnlyCheckBoxDelegate, self).__init__(parent)
-        
-    def createEditor(self, parent, option, index):
-        # Non creiamo un editor perché è di sola lettura
-        return None
-        
-    def paint(self, painter, option, index):
-        # Ottieni il valore booleano dalla cella
-        value = index.data(QtCore.Qt.DisplayRole)
-        checked = False
-        
-        if isinstance(value, bool):
-            checked = value
-        elif isinstance(value, str):
-            checked = value.lower() in ('true', 'yes', '1', 'on')
-        elif isinstance(value, int):
-            checked = bool(value)
-            
-        # Configura lo stile
-        opt = QtWidgets.QStyleOptionButton()
-        opt.rect = option.rect
-        opt.state = QtWidgets.QStyle.State_Enabled
-        
-        if checked:
-            opt.state |= QtWidgets.QStyle.State_On
+    FORMAT_VERSION = "9"
+    
+    def __init__(self, path=None, keep_records=True):
+        self.path = path
+        # Con keep_records=False (solo con path) i record letti o scritti non restano in memoria
+        self.keep_records = keep_records or path is None
+        self.settings = None
+        self.in_scope = None
+        self.hits = 0
+        self.misses = 0
+        # path -> [mtime_ns, size, hash, deps, records, walked, skipped, types, references, args]; records e
+        # references restano blob compressi finché la voce non viene letta la prima volta
+        self._entries = {}
+        self._stats = {}    # path -> (mtime_ns, size) or None, valido per una sessione di lookup
+        self._pending = {}  # path -> (mtime_ns, size, hash) osservati in lookup, usati da store
+        
+        self.db = None
+        if path is None:
+            return
+        # L'interfaccia grafica usa la cache dal thread di indicizzazione (un thread per volta)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'format'").fetchone()
+        if row is None or row[0] != self.FORMAT_VERSION:
+            self.db.execute("DROP TABLE IF EXISTS files")
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('format', ?)", (self.FORMAT_VERSION,))
+        self.db.execute("""CREATE TABLE IF NOT EXISTS files (
+                               path TEXT, settings TEXT, mtime_ns INTEGER, size INTEGER,
+                               hash TEXT, deps TEXT, records BLOB, walked TEXT, skipped TEXT,
+                               types TEXT, refs BLOB, args TEXT, PRIMARY KEY (path, settings))""")
+        self.db.commit()
+    
+    def begin(self, file_list, filter_macros=True, macro_prefixes=None, skip_seen_headers=False, references=False):
+        """Start a lookup session for parsing file_list with the given settings."""
+        settings = hashlib.sha1(json.dumps(
+            [CLANG_PARSE_ARGS, filter_macros, macro_prefixes, skip_seen_headers, references]).encode()).hexdigest()
+        self.in_scope = InputScope(file_list).contains
+        if settings != self.settings:
+            # Carica in memoria tutte le voci per queste impostazioni con una sola query
+            self.settings = settings
+            self._entries = {}
+            if self.db is not None:
+                for path, mtime_ns, size, digest, deps, records, walked, skipped, types, refs, args in \
+                        self.db.execute("SELECT path, mtime_ns, size, hash, deps, records, walked, skipped, "
+                                        "types, refs, args FROM files WHERE settings = ?", (settings,)):
+                    self._entries[path] = [mtime_ns, size, digest, json.loads(deps), records,
+                                           set(json.loads(walked)), set(json.loads(skipped)),
+                                           [TypeNode(*node) for node in json.loads(types)], refs, json.loads(args)]
+        logging.info(f"Index cache {self.path or '(memory)'}: {len(self._entries)} entries")
+    
+    def _stat(self, path):
+        if path not in self._stats:
+            try:
+                st = os.stat(path)
+                self._stats[path] = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                self._stats[path] = None
+        return self._stats[path]
+    
+    def lookup(self, f, args=CLANG_PARSE_ARGS):
+        """Return the cached ParsedFile of file f parsed with clang arguments args, or None to re-parse f."""
+        st = self._stat(f)
+        entry = self._entries.get(f)
+        if entry is not None and entry[9] != args:
+            entry = None
+        if st is None:
+            self.misses += 1
+            return None
+        mtime_ns, size = st
+        digest = None
+        if entry is not None and (entry[0], entry[1]) != st:
+            # mtime/size diversi: il contenuto potrebbe comunque essere identico
+            digest = file_digest(f)
+            if digest != entry[2]:
+                entry = None
+        if entry is not None:
+            for dep_path, dep_mtime_ns, dep_size, dep_in_scope in entry[3]:
+                if self._stat(dep_path) != (dep_mtime_ns, dep_size) or self.in_scope(dep_path) != dep_in_scope:
+                    entry = None
+                    break
+        if entry is None:
+            self._pending[f] = (mtime_ns, size, digest)
+            self.misses += 1
+            return None
+        if digest is not None:
+            # Stesso contenuto con mtime nuovo: aggiorna la chiave per evitare di ricalcolare l'hash
+            entry[0], entry[1] = mtime_ns, size
+            if self.db is not None:
+                self.db.execute("UPDATE files SET mtime_ns = ?, size = ? WHERE path = ? AND settings = ?",
+                                (mtime_ns, size, f, self.settings))
+        records = entry[4]
+        if isinstance(records, bytes):
+            records = [record_from_tuple(values) for values in json.loads(zlib.decompress(records))]
+            if self.keep_records:
+                entry[4] = records
+        references = entry[8]
+        if isinstance(references, bytes):
+            references = json.loads(zlib.decompress(references))
+            if self.keep_records:
+                entry[8] = references
+        self.hits += 1
+        return ParsedFile(records, [dep[0] for dep in entry[3]], entry[5], entry[6], entry[7], references)
+    
+    def store(self, f, parsed, args=CLANG_PARSE_ARGS):
+        """Store the ParsedFile obtained by parsing f with the clang arguments args."""
+        if f in self._pending:
+            mtime_ns, size, digest = self._pending.pop(f)
         else:
-            opt.state |= QtWidgets.QStyle.State_Off
-            
-        # Centra la checkbox
-        checkbox_size = option.widget.style().subElementRect(
-            QtWidgets.QStyle.SE_CheckBoxIndicator, opt, option.widget).size()
-        opt.rect.setLeft(option.rect.center().x() - checkbox_size.width() // 2)
-        
-        # Disegna la checkbox
-        option.widget.style().drawControl(QtWidgets.QStyle.CE_CheckBox, opt, painter, option.widget)
+            # File analizzato di nuovo dopo un lookup riuscito
+            mtime_ns, size, digest = self._entries[f][0], self._entries[f][1], self._entries[f][2]
+        if digest is None:
+            digest = file_digest(f)
+        deps = []
+        for dep_path in sorted(set(parsed.includes)):
+            st = self._stat(dep_path)
+            if st is not None:
+                deps.append([dep_path, st[0], st[1], self.in_scope(dep_path)])
+        entry = [mtime_ns, size, digest, deps, parsed.records, parsed.walked, parsed.skipped, parsed.types,
+                 parsed.references, list(args)]
+        self._entries[f] = entry
+        if self.db is not None:
+            blob = zlib.compress(json.dumps([record_to_tuple(r) for r in parsed.records]).encode())
+            refs_blob = zlib.compress(json.dumps(parsed.references).encode())
+            if not self.keep_records:
+                entry[4] = blob
+                entry[8] = refs_blob
+            self.db.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                            (f, self.settings, mtime_ns, size, digest, json.dumps(deps), blob,
+                             json.dumps(sorted(parsed.walked)), json.dumps(sorted(parsed.skipped)),
+                             json.dumps(parsed.types), refs_blob, json.dumps(args)))
+    
+    def commit(self):
+        """Write pending entries to disk and forget the stat results of this session."""
+        if self.db is not None:
+            self.db.commit()
+        self._stats.clear()
+        logging.info(f"Index cache: {self.hits} files reused, {self.misses} files parsed")
+        self.hits = 0
+        self.misses = 0
+    
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+
+PreprocessedFile = collections.namedtuple("PreprocessedFile", ["source", "tu"])
+
+# Opzioni di un comando di compilazione che cambiano il risultato del preprocessore
+PREPROCESS_FLAG_OPTIONS = ("-I", "-D", "-U") + COMPILE_COMMAND_PATH_OPTIONS
 
-class CustomFilterProxy(QtCore.QSortFilterProxyModel):
+def preprocess_flags(args):
+    """Return the include path and macro options (see PREPROCESS_FLAG_OPTIONS) of the clang arguments args."""
+    result = []
+    words = iter(args)
+    for word in words:
+        if word in PREPROCESS_FLAG_OPTIONS:
+            result += [word, next(words, "")]
+        elif word.startswith(("-I", "-D", "-U")):
+            result.append(word)
+    return result
+
+class PreprocessedFileCache:
     """
-    A custom filter proxy that filters rows based on:
-      1. The search type, directory, and filename (if not "*" then the row must match the selected value).
-      2. The search text applied across all columns.
+    LRU cache of the preprocessed source (PREPROCESS_COMMAND) of a file and of
+    the clang translation unit parsed from it, used by the recursive definition
+    dump. An entry is keyed by path and include-path fingerprint (command,
+    parse arguments and include environment variables) and stays valid while
+    the content of the file and the stat of every header it included do not
+    change. With compile_commands (a CompileCommands), a translation unit of the
+    database is preprocessed with its include paths and macros (see
+    preprocess_flags), which are part of the fingerprint.
+
+    Safe to use from a background thread. A libclang translation unit is not
+    thread safe: walk it only inside "with cache.use(file_path)", which holds
+    the lock of the cache.
     """
-    def __init__(self, parent=None):
-        super(CustomFilterProxy, self).__init__(parent)
-        self.search_type = "*"
-        self.search_directory = "*"
-        self.search_file = "*"
-        self.search_named = "*"  
-        self.search_mode = "*"
-
-    def setSearchMode(self, search_mode):
-        self.search_mode = search_mode
-        self.invalidateFilter()
-
-    def setSearchNamed(self, search_named):  # Nuovo metodo per impostare il filtro Named
-        self.search_named = search_named
-        self.invalidateFilter()
-
-    def setSearchType(self, search_type):
-        self.search_type = search_type
-        self.invalidateFilter()
-    
-    def setSearchDirectory(self, search_directory):
-        self.search_directory = search_directory
-        self.invalidateFilter()
-    
-    def setSearchFile(self, search_file):
-        self.search_file = search_file
-        self.invalidateFilter()
-        
-    def filterAcceptsRow(self, source_row, source_parent):
-        model = self.sourceModel()
-        if self.search_type != "*":
-            index = model.index(source_row, 0, source_parent)
-            if model.data(index) != self.search_type:
-                return False
-        if self.search_named != "*":
-            index = model.index(source_row, 2, source_parent)  # Named è in posizione 2
-            named_value = model.data(index)
-            if self.search_named == "Yes" and not named_value:
-                return False
-            if self.search_named == "No" and named_value:
-                return False
-        if self.search_directory != "*":
-            index = model.index(source_row, 3, source_parent)  # Directory è in posizione 3
-            if model.data(index) != self.search_directory:
-                return False
-        if self.search_file != "*":
-            index = model.index(source_row, 4, source_parent)  # Filename è in posizione 4
-            if model.data(index) != self.search_file:
-                return False
-        
-        pattern = self.filterRegExp()
-        if pattern.isEmpty():
-            return True
-        
-        # Only search in the Name column (index 1) instead of all columns
-        index = model.index(source_row, 1, source_parent)  # Name column
-        data = model.data(index)
-        if data is not None:
-            data_str = str(data)
-            search_text = pattern.pattern()
-            
-            # Usa direttamente self.search_mode invece di cercare di ottenere il valore dal widget
-            if self.search_mode == "*":
-                return pattern.indexIn(data_str) != -1
-            elif self.search_mode == "^":
-                return data_str.startswith(search_text)
-            elif self.search_mode == "$":
-                return data_str.endswith(search_text)
-        
-        return False
-
-class TableView(QtWidgets.QTableView):
-    """Custom QTableView to catch CTRL+C events for copying cell content."""
-    def __init__(self, parent=None):
-        super(TableView, self).__init__(parent)
-        self.setContextMenuPolicy(QtCore.Qt.CustomContextMenu)
-        self.customContextMenuRequested.connect(self.show_context_menu)
-    
-    def eventFilter(self, source, event):
-        if event.type() == QtCore.QEvent.KeyPress:
-            if event.key() == QtCore.Qt.Key_C and event.modifiers() & QtCore.Qt.ControlModifier:
-                indexes = self.selectionModel().selectedIndexes()
-                if indexes:
-                    text = indexes[0].data()
-                    QtWidgets.QApplication.clipboard().setText(text)
-                    logging.info(f"Copied to clipboard: {text}")
-                    return True
-        return super(TableView, self).eventFilter(source, event)
-        
-    def show_context_menu(self, position):
-        indexes = self.selectedIndexes()
-        if not indexes:
-            return
-            
-        menu = QtWidgets.QMenu()
-        dump_action = menu.addAction("Dump recursive definitions")
-        goto_action = menu.addAction("Go to definition")
-        copy_declaration_action = menu.addAction("Copy declaration")  # Nuova azione
-        
-        action = menu.exec_(self.viewport().mapToGlobal(position))
-        
-        # Get the parent window to access its methods
-        parent_window = self.parent()
-        while parent_window and not isinstance(parent_window, MainWindow):
-            parent_window = parent_window.parent()
-        
-        if not parent_window:
-            return
-            
-        if action == dump_action:
-            parent_window.dump_recursive_definitions(indexes[0])
-        elif action == goto_action:
-            # Use the same functionality as double-clicking on the file columns
-            parent_window.open_file(indexes[0])
-        elif action == copy_declaration_action:
-            # Nuova funzionalità per copiare la dichiarazione
-            parent_window.copy_declaration(indexes[0])
-
-class MainWindow(QtWidgets.QMainWindow):
-        
-    def __init__(self, records, file_list):
-        super(MainWindow, self).__init__()
-        self.file_list = file_list
-        self.setWindowTitle("C Identifier Explorer")
-        self.resize(1200, 600)
-        
-        central_widget = QtWidgets.QWidget()
-        self.setCentralWidget(central_widget)
-        main_layout = QtWidgets.QVBoxLayout(central_widget)
-        
-        # Shortcuts: CTRL+Q to quit, CTRL+R to reload the table.
-        exit_shortcut = QtWidgets.QShortcut(QtGui.QKeySequence("Ctrl+Q"), self)
-        exit_shortcut.activated.connect(QtWidgets.qApp.quit)
-        reload_shortcut = QtWidgets.QShortcut(QtGui.QKeySequence("Ctrl+R"), self)
-        reload_shortcut.activated.connect(self.reload_table)
-        
-        # Create a horizontal layout for search filters.
-        search_layout = QtWidgets.QHBoxLayout()
-        
-      
-        # Add a menu button for actions - using hamburger menu icon (≡) and fixed width
-        self.action_menu_button = QtWidgets.QPushButton("≡")  # Unicode character for "identical to" (hamburger menu)
-        # Set a fixed width to make it square and compact
-        self.action_menu_button.setMaximumWidth(30)
-        self.action_menu_button.setToolTip("Actions Menu")
-        # Optional: Set a stylesheet to make it look better
-        self.action_menu_button.setStyleSheet("""
-            QPushButton {
-                font-size: 16px;
-                padding: 2px;
-                text-align: center;
-            }
-        """)
-        self.action_menu = QtWidgets.QMenu()
-        self.export_all_action = self.action_menu.addAction("Export All")
-        self.export_all_action.triggered.connect(self.export_all_definitions)
-        self.show_stats_action = self.action_menu.addAction("Show Statistics")
-        self.show_stats_action.triggered.connect(self.show_statistics)
-
-        # Nel metodo __init__ della classe MainWindow, dopo la creazione del menu hamburger
-        self.export_csv_action = self.action_menu.addAction("Export to CSV")
-        self.export_csv_action.triggered.connect(self.export_to_csv)
-        
-        # Aggiungi un separatore e l'azione Chiudi
-        self.action_menu.addSeparator()
-        self.exit_action = self.action_menu.addAction("Quit")
-        self.exit_action.triggered.connect(QtWidgets.qApp.quit)
+    INCLUDE_ENVIRONMENT = ("CPATH", "C_INCLUDE_PATH", "CPLUS_INCLUDE_PATH")
+    
+    def __init__(self, max_entries=PREPROCESS_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.index = None
+        self.compile_commands = None
+        self.lock = threading.Lock()
+        self._entries = collections.OrderedDict()  # (path, fingerprint) -> (digest, deps, PreprocessedFile)
+    
+    def flags(self, file_path):
+        """Return the preprocessor options of file_path taken from compile_commands (empty without it)."""
+        if self.compile_commands is None:
+            return []
+        return preprocess_flags(self.compile_commands.arguments(file_path) or [])
+    
+    def fingerprint(self, flags=()):
+        h = hashlib.sha1()
+        h.update(json.dumps([PREPROCESS_COMMAND, PREPROCESS_PARSE_ARGS, list(flags),
+                             [os.environ.get(name, "") for name in self.INCLUDE_ENVIRONMENT]]).encode())
+        return h.hexdigest()
+    
+    @staticmethod
+    def _stat(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+    
+    @staticmethod
+    def _read_dependencies(dep_path):
+        """Return the prerequisites listed in a make rule written by gcc -MD."""
+        with open(dep_path) as f:
+            rule = f.read().replace("\\\n", " ")
+        _, _, prerequisites = rule.partition(": ")
+        return [p.replace("\0", " ") for p in prerequisites.replace("\\ ", "\0").split()]
+    
+    def get(self, file_path):
+        """
+        Return the PreprocessedFile of file_path (subprocess.CalledProcessError if
+        preprocessing fails). Its tu must not be walked outside use().
+        """
+        with self.lock:
+            return self._get(file_path)
+    
+    @contextlib.contextmanager
+    def use(self, file_path):
+        """Context manager giving the PreprocessedFile of file_path, with the lock held until the block ends."""
+        with self.lock:
+            yield self._get(file_path)
+    
+    def _get(self, file_path):
+        import clang.cindex
+        flags = self.flags(file_path)
+        key = (os.path.realpath(file_path), self.fingerprint(flags))
+        digest = file_digest(file_path)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == digest and \
+                all(self._stat(path) == stat for path, stat in entry[1]):
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[2]
+        
+        self.misses += 1
+        logging.info(f"Preprocessing {file_path}")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            dep_path = os.path.join(temp_dir, "deps.d")
+            result = subprocess.run(PREPROCESS_COMMAND + flags + ["-MD", "-MF", dep_path, file_path],
+                                    check=True, capture_output=True, text=True)
+            deps = [(path, self._stat(path)) for path in self._read_dependencies(dep_path)]
+        source = result.stdout
+        
+        # Il sorgente preprocessato viene passato a clang in memoria, senza file temporanei
+        if self.index is None:
+            self.index = clang.cindex.Index.create()
+        virtual_name = os.path.splitext(file_path)[0] + ".preprocessed.c"
+        tu = self.index.parse(virtual_name, args=PREPROCESS_PARSE_ARGS,
+                              unsaved_files=[(virtual_name, source)])
+        preprocessed = PreprocessedFile(source, tu)
+        self._entries[key] = (digest, deps, preprocessed)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return preprocessed
 
-        # Mostra il menu quando il pulsante viene cliccato
-        self.action_menu_button.clicked.connect(lambda: self.action_menu.exec_(self.action_menu_button.mapToGlobal(QtCore.QPoint(0, self.action_menu_button.height()))))        
+# Cache dei file preprocessati per il dump delle definizioni ricorsive
+PREPROCESS_CACHE = PreprocessedFileCache()
 
-        # Aggiungi il pulsante al layout
-        search_layout.addWidget(self.action_menu_button)
-        
-        self.search_type_combo = QtWidgets.QComboBox()
-        unique_types = sorted(set(rec["Type"] for rec in records))
-        self.search_type_combo.addItem("*")
-        for typ in unique_types:
-            self.search_type_combo.addItem(typ)
-
-        self.search_type_combo.setCurrentText("*")
-        search_layout.addWidget(self.search_type_combo)
-        
-        self.search_text = QtWidgets.QLineEdit()
-        self.search_text.setPlaceholderText("Search by name...")
-        # Aggiungi il menu a tendina per la modalità di ricerca
-        self.search_mode_combo = QtWidgets.QComboBox()
-        self.search_mode_combo.addItem("*")    # Contains
-        self.search_mode_combo.addItem("^")    # Starts with (solo il simbolo ^ senza *)
-        self.search_mode_combo.addItem("$")    # Ends with (solo il simbolo $ senza *)
-        self.search_mode_combo.setToolTip("Search mode: contains (*), starts with (^), ends with ($)")
-        self.search_mode_combo.setMaximumWidth(40)
-        self.search_mode_combo.setMinimumWidth(40)
-
-        # Aggiungi prima il campo di ricerca, poi la modalità
-        search_layout.addWidget(self.search_text)
-        search_layout.addWidget(self.search_mode_combo)
-        
-        self.search_named_combo = QtWidgets.QComboBox()
-        self.search_named_combo.addItem("*")
-        self.search_named_combo.addItem("Yes")  # Per elementi con nome esplicito
-        self.search_named_combo.addItem("No")   # Per elementi senza nome esplicito
-        self.search_named_combo.setCurrentText("*")
-        search_layout.addWidget(self.search_named_combo)
-        
-        self.search_directory_combo = QtWidgets.QComboBox()
-        unique_dirs = sorted(set(os.path.dirname(rec["File"]) for rec in records if rec.get("File")))
-        self.search_directory_combo.addItem("*")
-        for d in unique_dirs:
-            self.search_directory_combo.addItem(d)
-        self.search_directory_combo.setCurrentText("*")
-        search_layout.addWidget(self.search_directory_combo)
-        
-        self.search_file_combo = QtWidgets.QComboBox()
-        unique_files = sorted(set(os.path.basename(rec["File"]) for rec in records if rec.get("File")))
-        self.search_file_combo.addItem("*")
-        for f in unique_files:
-            self.search_file_combo.addItem(f)
-        self.search_file_combo.setCurrentText("*")
-        search_layout.addWidget(self.search_file_combo)
-        main_layout.addLayout(search_layout)
-        
-        # Crea la vista tabella
-        self.table_view = TableView(self)
-        self.table_view.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
-        self.table_view.setSelectionMode(QtWidgets.QAbstractItemView.SingleSelection)
-        self.table_view.installEventFilter(self.table_view)
-        main_layout.addWidget(self.table_view)
-        
-        # Popola la vista tabella con i dati    
-        self.model = QtGui.QStandardItemModel()
-        # Aggiunta della colonna "Declaration" dopo "Details"
-        headers = ["Type", "Name", "Named", "Directory", "Filename", "Line", "Column", "Details", "Declaration"]
-        self.model.setHorizontalHeaderLabels(headers)
-        
-        for rec in records:
-            row = []
-            # Colonna Type
-            type_item = QtGui.QStandardItem(str(rec.get("Type", "")))
-            type_item.setFlags(QtCore.Qt.ItemIsSelectable | QtCore.Qt.ItemIsEnabled)
-            row.append(type_item)
-
-            # Colonna Name
-            name_item = QtGui.QStandardItem(str(rec.get("Name", "")))
-            name_item.setFlags(QtCore.Qt.ItemIsSelectable | QtCore.Qt.ItemIsEnabled)
-            row.append(name_item)
-            
-            # Nuova colonna Named (booleana)
-            name = rec.get("Name", "")
-            is_anonymous = rec.get("IsAnonymous", False)
-
-            has_explicit_name = bool(name and 
-                                    not name.startswith("_") and 
-                                    not name.startswith("__") and 
-                                    not is_anonymous and
-                                    "unnamed at" not in name)
-
-            named_item = QtGui.QStandardItem()
-            named_item.setData(has_explicit_name, QtCore.Qt.DisplayRole)
-            named_item.setFlags(QtCore.Qt.ItemIsSelectable | QtCore.Qt.ItemIsEnabled)
-            row.append(named_item)
-            
-            # Colonne rimanenti
-            full_path = rec.get("File", "")
-            directory = os.path.dirname(full_path)
-            filename = os.path.basename(full_path)
-            dir_item = QtGui.QStandardItem(directory)
-            dir_item.setFlags(QtCore.Qt.ItemIsSelectable | QtCore.Qt.ItemIsEnabled)
-            row.append(dir_item)
-            file_item = QtGui.QStandardItem(filename)
-            file_item.setFlags(QtCore.Qt.ItemIsSelectable | QtCore.Qt.ItemIsEnabled)
-            row.append(file_item)
-            row.append(QtGui.QStandardItem(str(rec.get("Line", ""))))
-            row.append(QtGui.QStandardItem(str(rec.get("Column", ""))))
-            row.append(QtGui.QStandardItem(str(rec.get("Details", ""))))
-            
-            # Nuova colonna Declaration
-            declaration_item = QtGui.QStandardItem(str(rec.get("Declaration", "")))
-            declaration_item.setFlags(QtCore.Qt.ItemIsSelectable | QtCore.Qt.ItemIsEnabled)
-            row.append(declaration_item)
-            
-            self.model.appendRow(row)
-            logging.debug(f"Row added to model: {[item.text() for item in row]}")
-        
-        self.proxy_model = CustomFilterProxy()
-        self.proxy_model.setSourceModel(self.model)
-        self.proxy_model.setFilterCaseSensitivity(QtCore.Qt.CaseInsensitive)
-        self.table_view.setModel(self.proxy_model)
-        
-        # Applica il delegato per la colonna "Named" (indice 2)
-        checkbox_delegate = ReadOnlyCheckBoxDelegate(self.table_view)
-        self.table_view.setItemDelegateForColumn(2, checkbox_delegate)
-        
-        self.table_view.setSortingEnabled(True)
-        self.table_view.resizeColumnsToContents()
-        
-        # Imposta una larghezza fissa per la colonna Declaration (indice 8)
-        # Imposta una larghezza fissa per la colonna Declaration (indice 8)
-        declaration_column_width = 200  # Larghezza in pixel
-        self.table_view.setColumnWidth(8, declaration_column_width)
-
-        # Crea l'etichetta di stato per mostrare il numero di elementi visualizzati
-        self.status_label = QtWidgets.QLabel("0 items displayed")
-        main_layout.addWidget(self.status_label)
-
-        # Collega i filtri all'aggiornamento del conteggio
-        self.search_text.textChanged.connect(self.update_text_filter)
-        self.search_type_combo.currentTextChanged.connect(self.update_type_filter)
-        self.search_directory_combo.currentTextChanged.connect(self.update_directory_filter)
-        self.search_file_combo.currentTextChanged.connect(self.update_file_filter)
-        self.search_named_combo.currentTextChanged.connect(self.update_named_filter)
-        self.search_mode_combo.currentTextChanged.connect(self.update_search_mode)
-
-        # Aggiorna il conteggio iniziale
-        self.update_item_count()
-
-        self.table_view.clicked.connect(self.handle_table_click)
-        self.table_view.doubleClicked.connect(self.handle_table_double_click)
-
-    def update_text_filter(self, text):
-        """Aggiorna il filtro di testo quando l'utente digita nel campo di ricerca."""
-        self.proxy_model.setFilterRegExp(text)
-        self.update_item_count()
-        
-    def update_type_filter(self, type_text):
-        """Aggiorna il filtro per tipo."""
-        self.proxy_model.setSearchType(type_text)
-        self.update_item_count()
-        
-    def update_directory_filter(self, directory):
-        """Aggiorna il filtro per directory."""
-        self.proxy_model.setSearchDirectory(directory)
-        self.update_item_count()
-        
-    def update_file_filter(self, file_name):
-        """Aggiorna il filtro per file."""
-        self.proxy_model.setSearchFile(file_name)
-        self.update_item_count()
-        
-    def update_named_filter(self, named_value):
-        """Aggiorna il filtro per elementi con nome."""
-        self.proxy_model.setSearchNamed(named_value)
-        self.update_item_count()
-        
-    def update_search_mode(self, mode):
-        """Aggiorna la modalità di ricerca."""
-        self.proxy_model.setSearchMode(mode)
-        # Riapplica il filtro di testo con la nuova modalità
-        self.proxy_model.setFilterRegExp(self.search_text.text())
-        self.update_item_count()
-
-    def get_export_options(self, title="Export Options"):
-        """
-        Mostra una finestra di dialogo con le opzioni di esportazione e restituisce le scelte dell'utente.
-        """
-        options_dialog = QtWidgets.QDialog(self)
-        options_dialog.setWindowTitle(title)
-        options_dialog.setMinimumWidth(400)
-        
-        dialog_layout = QtWidgets.QVBoxLayout(options_dialog)
-        
-        # Checkbox per applicare il filtro di ricerca corrente
-        apply_search_filter_checkbox = QtWidgets.QCheckBox("Apply current search filter (export only items matching the current search)")
-        apply_search_filter_checkbox.setChecked(False)  # Default: esporta tutto
-        dialog_layout.addWidget(apply_search_filter_checkbox)
-        
-        # Checkbox per escludere oggetti che potrebbero causare duplicazioni
-        exclude_duplicating_objects_checkbox = QtWidgets.QCheckBox("Exclude prone-duplicating information objects (e.g., prefer typedefs over struct definitions)")
-        exclude_duplicating_objects_checkbox.setChecked(True)  # Default: esclude oggetti che potrebbero causare duplicazioni
-        dialog_layout.addWidget(exclude_duplicating_objects_checkbox)
-        
-        exclude_unnamed_checkbox = QtWidgets.QCheckBox("Exclude unnamed elements (only export elements with explicit names)")
-        exclude_unnamed_checkbox.setChecked(True)
-        dialog_layout.addWidget(exclude_unnamed_checkbox)
-        
-        button_box = QtWidgets.QDialogButtonBox(
-            QtWidgets.QDialogButtonBox.Ok | QtWidgets.QDialogButtonBox.Cancel
-        )
-        button_box.accepted.connect(options_dialog.accept)
-        button_box.rejected.connect(options_dialog.reject)
-        dialog_layout.addWidget(button_box)
-        
-        result = options_dialog.exec_()
-        
-        if result == QtWidgets.QDialog.Accepted:
-            return (True, 
-                    apply_search_filter_checkbox.isChecked(),
-                    exclude_duplicating_objects_checkbox.isChecked(),  # True significa escludere, False significa includere tutto
-                    exclude_unnamed_checkbox.isChecked())
-        else:
-            return (False, False, True, False)  # L'utente ha annullato, manteniamo i valori di default
-            
-    def export_to_csv(self):
-        """Esporta il contenuto della tabella in un file CSV."""
-        logging.info("Exporting table to CSV...")
-        
-        # Chiedi all'utente dove salvare il file CSV
-        file_name, _ = QtWidgets.QFileDialog.getSaveFileName(
-            self, 
-            "Save Table as CSV", 
-            "table_export.csv",
-            "CSV Files (*.csv);;Text Files (*.txt);;All Files (*)"
-        )
-        
-        if not file_name:
-            return  # L'utente ha annullato
-        
-        try:
-            with open(file_name, 'w', newline='') as csvfile:
-                # Crea un writer CSV
-                import csv
-                writer = csv.writer(csvfile)
-                
-                # Scrivi l'intestazione
-                headers = []
-                for col in range(self.model.columnCount()):
-                    headers.append(self.model.headerData(col, QtCore.Qt.Horizontal))
-                writer.writerow(headers)
-                
-                # Ottieni le opzioni di esportazione
-                accepted, export_filtered_only, exclude_unnamed = self.get_export_options("CSV Export Options")
-                
-                if not accepted:
-                    return  # L'utente ha annullato
-                
-                # Conta quante righe saranno esportate per la barra di progresso
-                if export_filtered_only:
-                    total_rows = self.proxy_model.rowCount()
-                    if exclude_unnamed:
-                        # Conta solo le righe con Named = True
-                        named_count = 0
-                        for row in range(total_rows):
-                            index = self.proxy_model.index(row, 2)  # Colonna "Named"
-                            if self.proxy_model.data(index):
-                                named_count += 1
-                        total_rows = named_count
-                else:
-                    total_rows = self.model.rowCount()
-                    if exclude_unnamed:
-                        # Conta solo le righe con Named = True
-                        named_count = 0
-                        for row in range(total_rows):
-                            index = self.model.index(row, 2)  # Colonna "Named"
-                            if self.model.data(index):
-                                named_count += 1
-                        total_rows = named_count
-                
-                # Mostra una finestra di progresso
-                progress = QtWidgets.QProgressDialog("Exporting to CSV...", "Cancel", 0, total_rows, self)
-                progress.setWindowModality(QtCore.Qt.WindowModal)
-                progress.setMinimumDuration(0)
-                progress.setValue(0)
-                
-                # Contatore per le righe effettivamente esportate
-                exported_rows = 0
-                
-                # Scrivi i dati
-                if export_filtered_only:
-                    # Esporta solo le righe filtrate/visibili
-                    for row in range(self.proxy_model.rowCount()):
-                        # Verifica se l'elemento ha un nome esplicito (se richiesto)
-                        if exclude_unnamed:
-                            named_index = self.proxy_model.index(row, 2)  # Colonna "Named"
-                            if not self.proxy_model.data(named_index):
-                                continue  # Salta questo elemento
-                        
-                        if progress.wasCanceled():
-                            break
-                        
-                        progress.setValue(exported_rows)
-                        QtWidgets.QApplication.processEvents()
-                        
-                        row_data = []
-                        for col in range(self.proxy_model.columnCount()):
-                            index = self.proxy_model.index(row, col)
-                            # Per la colonna "Named" (booleana), converti in "Yes"/"No"
-                            if col == 2:  # Colonna "Named"
-                                value = self.proxy_model.data(index)
-                                row_data.append("Yes" if value else "No")
-                            else:
-                                row_data.append(self.proxy_model.data(index))
-                        writer.writerow(row_data)
-                        exported_rows += 1
-                else:
-                    # Esporta tutte le righe
-                    for row in range(self.model.rowCount()):
-                        # Verifica se l'elemento ha un nome esplicito (se richiesto)
-                        if exclude_unnamed:
-                            named_index = self.model.index(row, 2)  # Colonna "Named"
-                            if not self.model.data(named_index):
-                                continue  # Salta questo elemento
-                        
-                        if progress.wasCanceled():
-                            break
-                        
-                        progress.setValue(exported_rows)
-                        QtWidgets.QApplication.processEvents()
-                        
-                        row_data = []
-                        for col in range(self.model.columnCount()):
-                            index = self.model.index(row, col)
-                            # Per la colonna "Named" (booleana), converti in "Yes"/"No"
-                            if col == 2:  # Colonna "Named"
-                                value = self.model.data(index)
-                                row_data.append("Yes" if value else "No")
-                            else:
-                                row_data.append(self.model.data(index))
-                        writer.writerow(row_data)
-                        exported_rows += 1
-                
-                progress.setValue(total_rows)
-                
-            logging.info(f"Table exported to CSV: {file_name} ({exported_rows} rows)")
-            QtWidgets.QMessageBox.information(
-                self, 
-                "Success", 
-                f"Table successfully exported to {file_name}\n{exported_rows} rows exported."
-            )
-        except Exception as e:
-            logging.error(f"Error exporting table to CSV: {e}")
-            QtWidgets.QMessageBox.critical(
-                self, 
-                "Error", 
-                f"Could not export table to CSV: {e}"
-            )
-
-    def handle_table_click(self, index):
-        logging.debug(f"Table clicked at row {index.row()}, column {index.column()}")
-        # For Type, update now only on double-click; here do nothing.
-        if index.column() == 1:
-            source_index = self.proxy_model.mapToSource(index)
-            name_value = self.model.item(source_index.row(), 1).text()
-            QtWidgets.QApplication.clipboard().setText(name_value)
-            logging.info(f"Copied Name to clipboard: {name_value}")
-        elif index.column() in [5, 6, 7]:  # Aggiornati gli indici per Line, Column, Details
-            self.open_file(index)
-        # For Directory (3) and Filename (4), single click does nothing.
-    
-    def handle_table_double_click(self, index):
-        logging.debug(f"Table double-clicked at row {index.row()}, column {index.column()}")
-        if index.column() == 0:
-            source_index = self.proxy_model.mapToSource(index)
-            type_value = self.model.item(source_index.row(), 0).text()
-            self.search_type_combo.setCurrentText(type_value)
-            self.proxy_model.setSearchType(type_value)
-            logging.info(f"Updated search type to {type_value}")
-        elif index.column() == 1:
-            source_index = self.proxy_model.mapToSource(index)
-            name_value = self.model.item(source_index.row(), 1).text()
-            QtWidgets.QApplication.clipboard().setText(name_value)
-            logging.info(f"Copied Name to clipboard: {name_value}")
-        elif index.column() == 3:  # Directory è ora in posizione 3
-            self.open_directory(index)
-        elif index.column() in [4, 5, 6, 7]:  # Aggiornati gli indici per Filename, Line, Column, Details
-            self.open_file(index)
-    
-    def open_file(self, index):
-        source_index = self.proxy_model.mapToSource(index)
-        row = source_index.row()
-        dir_item = self.model.item(row, 3)  # Directory è ora in posizione 3
-        file_item = self.model.item(row, 4)  # Filename è ora in posizione 4
-        line_item = self.model.item(row, 5)  # Line è ora in posizione 5
-        directory = dir_item.text()
-        filename = file_item.text()
-        file_path = os.path.join(directory, filename)
-        line_number = line_item.text()
-        logging.info(f"Attempting to open file: {file_path} at line: {line_number}")
-        if file_path and line_number:
-            try:
-                command = ["gedit", f"+{line_number}", file_path]
-                subprocess.Popen(command)
-                logging.info(f"Opened file with command: {' '.join(command)}")
-            except Exception as e:
-                logging.error(f"Error opening file: {e}")
-                QtWidgets.QMessageBox.warning(self, "Error", f"Unable to open file with gedit:\n{e}")
-    
-    def open_directory(self, index):
-        source_index = self.proxy_model.mapToSource(index)
-        row = source_index.row()
-        dir_item = self.model.item(row, 3)  # Directory è ora in posizione 3
-        directory = dir_item.text()
-        logging.info(f"Attempting to open directory: {directory}")
-        if directory:
-            try:
-                command = [BROWSER_COMMAND, directory]
-                subprocess.Popen(command)
-                logging.info(f"Opened directory with command: {' '.join(command)}")
-            except Exception as e:
-                logging.error(f"Error opening directory: {e}")
-                QtWidgets.QMessageBox.warning(self, "Error", f"Unable to open directory with {BROWSER_COMMAND}:\n{e}")
-    def copy_declaration(self, index):
-        """Copia la dichiarazione dell'elemento selezionato negli appunti."""
-        source_index = self.proxy_model.mapToSource(index)
-        row = source_index.row()
-        
-        # Ottieni la dichiarazione dalla colonna Declaration (indice 8)
-        declaration_item = self.model.item(row, 8)
-        
-        if declaration_item and declaration_item.text():
-            declaration = declaration_item.text()
-            QtWidgets.QApplication.clipboard().setText(declaration)
-            logging.info(f"Copied declaration to clipboard: {declaration}")
-            
-            # Mostra un messaggio di conferma temporaneo (tooltip)
-            QtWidgets.QToolTip.showText(
-                QtGui.QCursor.pos(),
-                "Declaration copied to clipboard",
-                self.table_view,
-                QtCore.QRect(),
-                2000  # Mostra per 2 secondi
-            )
-        else:
-            # Se la dichiarazione non è disponibile, mostra un messaggio
-            QtWidgets.QMessageBox.information(
-                self,
-                "Information",
-                "No declaration available for this item."
-            )
-
-    def reload_table(self):
-        logging.info("Reloading table from scratch...")
-        records = process_files(self.file_list)
-        self.model.clear()
-        # Aggiornati gli header per includere "Named" e "Declaration"
-        headers = ["Type", "Name", "Named", "Directory", "Filename", "Line", "Column", "Details", "Declaration"]
-        self.model.setHorizontalHeaderLabels(headers)
-        for rec in records:
-            row = []
-            # Colonna Type
-            type_item = QtGui.QStandardItem(str(rec.get("Type", "")))
-            type_item.setFlags(QtCore.Qt.ItemIsSelectable | QtCore.Qt.ItemIsEnabled)
-            row.append(type_item)
-            
-            # Colonna Name
-            name_item = QtGui.QStandardItem(str(rec.get("Name", "")))
-            name_item.setFlags(QtCore.Qt.ItemIsSelectable | QtCore.Qt.ItemIsEnabled)
-            row.append(name_item)
-            
-            # Nuova colonna Named (booleana)
-            name = rec.get("Name", "")
-            is_anonymous = rec.get("IsAnonymous", False)
-
-            # Un elemento ha un nome esplicito se:
-            # 1. Non è anonimo (ha un nome)
-            # 2. Il nome non inizia con underscore singolo o doppio
-            # 3. Il nome non contiene "unnamed at" (per le strutture anonime)
-            has_explicit_name = bool(name and 
-                                    not name.startswith("_") and 
-                                    not name.startswith("__") and 
-                                    not is_anonymous and
-                                    "unnamed at" not in name)
-
-            named_item = QtGui.QStandardItem()
-            named_item.setData(has_explicit_name, QtCore.Qt.DisplayRole)
-            named_item.setFlags(QtCore.Qt.ItemIsSelectable | QtCore.Qt.ItemIsEnabled)
-            row.append(named_item)
-            
-            # Colonne rimanenti
-            full_path = rec.get("File", "")
-            directory = os.path.dirname(full_path)
-            filename = os.path.basename(full_path)
-            dir_item = QtGui.QStandardItem(directory)
-            dir_item.setFlags(QtCore.Qt.ItemIsSelectable | QtCore.Qt.ItemIsEnabled)
-            row.append(dir_item)
-            file_item = QtGui.QStandardItem(filename)
-            file_item.setFlags(QtCore.Qt.ItemIsSelectable | QtCore.Qt.ItemIsEnabled)
-            row.append(file_item)
-            row.append(QtGui.QStandardItem(str(rec.get("Line", ""))))
-            row.append(QtGui.QStandardItem(str(rec.get("Column", ""))))
-            row.append(QtGui.QStandardItem(str(rec.get("Details", ""))))
-            
-            # Nuova colonna Declaration
-            declaration_item = QtGui.QStandardItem(str(rec.get("Declaration", "")))
-            declaration_item.setFlags(QtCore.Qt.ItemIsSelectable | QtCore.Qt.ItemIsEnabled)
-            row.append(declaration_item)
-            
-            self.model.appendRow(row)
-            logging.debug(f"Row reloaded: {[item.text() for item in row]}")
+# Risultato dell'analisi di un file:
+# - records: i record estratti
+# - includes: i file inclusi (direttamente o indirettamente) dalla translation unit
+# - walked: i file (percorsi normalizzati) le cui dichiarazioni di primo livello sono state visitate
+# - skipped: i file (percorsi normalizzati) saltati perché già visitati in una translation unit precedente
+# - types: i TypeNode delle dichiarazioni di tipo trovate (vedi TypeGraph)
+# - references: i riferimenti ai simboli (voci di ReferenceCollector, vuota se non richiesti)
+# - profile: il FileProfile dell'analisi (None se non richiesto o se il file viene dalla cache)
+# - source_stats: i contatori di SOURCE_CACHE (SOURCE_CACHE_COUNTERS) dell'analisi, nel processo
+#   che l'ha eseguita (None se il file viene dalla cache)
+ParsedFile = collections.namedtuple("ParsedFile", ["records", "includes", "walked", "skipped", "types", "references",
+                                                   "profile", "source_stats"], defaults=(None, None))
 
-        
-        # Riapplica il delegato per la colonna "Named"
-        checkbox_delegate = ReadOnlyCheckBoxDelegate(self.table_view)
-        self.table_view.setItemDelegateForColumn(2, checkbox_delegate)
-        
-        self.table_view.resizeColumnsToContents()
+# Tempi e diagnostiche dell'analisi di un file (vedi IndexProfile); start è un istante di time.perf_counter(),
+# confrontabile tra i processi worker
+FileProfile = collections.namedtuple("FileProfile", ["file", "worker", "start", "parse_seconds", "traverse_seconds",
+                                                     "cursors", "records", "warnings", "errors"])
 
-        # Imposta una larghezza fissa per la colonna Declaration (indice 8)
-        declaration_column_width = 200  # Larghezza in pixel
-        self.table_view.setColumnWidth(8, declaration_column_width)
-        
-        # Rebuild search filter combo boxes.
-        self.search_type_combo.blockSignals(True)
-        self.search_directory_combo.blockSignals(True)
-        self.search_file_combo.blockSignals(True)
-        self.search_named_combo.blockSignals(True) 
-        self.search_type_combo.clear()
-        self.search_directory_combo.clear()
-        self.search_file_combo.clear()
-        self.search_type_combo.addItem("*")
-        self.search_directory_combo.addItem("*")
-        self.search_file_combo.addItem("*")
-        unique_types = sorted(set(rec["Type"] for rec in records))
-        for typ in unique_types:
-            self.search_type_combo.addItem(typ)
-        unique_dirs = sorted(set(os.path.dirname(rec["File"]) for rec in records if rec.get("File")))
-        for d in unique_dirs:
-            self.search_directory_combo.addItem(d)
-        unique_files = sorted(set(os.path.basename(rec["File"]) for rec in records if rec.get("File")))
-        for f in unique_files:
-            self.search_file_combo.addItem(f)
-        self.search_type_combo.blockSignals(False)
-        self.search_directory_combo.blockSignals(False)
-        self.search_file_combo.blockSignals(False)
-        self.search_named_combo.blockSignals(False)
-        
-        # Riapplica i filtri correnti
-        # Importante: prima riapplica i filtri, poi invalida il modello proxy
-        search_text = self.search_text.text()
-        search_type = self.search_type_combo.currentText()
-        search_directory = self.search_directory_combo.currentText()
-        search_file = self.search_file_combo.currentText()
-        search_named = self.search_named_combo.currentText()
-        search_mode = self.search_mode_combo.currentText()
-        
-        # Imposta i filtri nel proxy model
-        self.proxy_model.setSearchType(search_type)
-        self.proxy_model.setSearchDirectory(search_directory)
-        self.proxy_model.setSearchFile(search_file)
-        self.proxy_model.setSearchNamed(search_named)
-        self.proxy_model.setSearchMode(search_mode)
-        
-        # Imposta il filtro di testo
-        self.proxy_model.setFilterRegExp(search_text)
-        
-        # Ora invalida il modello proxy per applicare tutti i filtri
-        self.proxy_model.invalidate()
-        
-        # Aggiorna il conteggio degli elementi visualizzati
-        self.update_item_count()
-        
-        logging.info("Reload complete.")
-
-    def update_item_count(self):
-        """Aggiorna l'etichetta di stato con il numero di elementi visualizzati."""
-        count = self.proxy_model.rowCount()
-        total = self.model.rowCount()
-        self.status_label.setText(f"{count} of {total} items displayed")    
-
-    def dump_recursive_definitions(self, index):
-        """Extract and display the complete C definition of the selected item and all its dependencies."""
-        source_index = self.proxy_model.mapToSource(index)
-        row = source_index.row()
-        
-        # Get information about the selected item
-        type_item = self.model.item(row, 0)
-        name_item = self.model.item(row, 1)
-        dir_item = self.model.item(row, 3)  # Directory è ora in posizione 3
-        file_item = self.model.item(row, 4)  # Filename è ora in posizione 4
-        details_item = self.model.item(row, 7)  # Details è ora in posizione 7
-        
-        item_type = type_item.text()
-        item_name = name_item.text()
-        directory = dir_item.text()
-        filename = file_item.text()
-        details = details_item.text() if details_item else ""
-        file_path = os.path.join(directory, filename)
-        
-        logging.info(f"Dumping recursive definitions for {item_type} {item_name} in {file_path}")
-        
-        # For VAR_DECL, extract the type from the details
-        if item_type == "VAR_DECL":
-            # The details column contains the type information
-            var_type = details.split(" (const)")[0] if " (const)" in details else details
-            logging.info(f"Variable type: {var_type}")
-            
-            # Extract the definitions for the variable's type
-            definitions = self.extract_recursive_definitions(file_path, "TYPE", var_type)
-            
-            if not definitions:
-                # Try to get just the variable declaration
-                definitions = self.extract_variable_declaration(file_path, item_name)
-                
-            if not definitions:
-                QtWidgets.QMessageBox.warning(
-                    self, 
-                    "Warning", 
-                    f"Could not extract type definition for variable {item_name} of type {var_type}."
-                )
-                return
-            
-            # Display the definitions in a popup window
-            self.show_definitions_popup(definitions, f"Variable {item_name} of type {var_type}")
-            return
-        
-        # For other types that can have recursive definitions
-        elif item_type not in ["STRUCT_DECL", "TYPEDEF_DECL", "ENUM_DECL", "UNION_DECL"]:
-            QtWidgets.QMessageBox.information(
-                self, 
-                "Information", 
-                f"Recursive definition dump is only available for struct, typedef, enum, union declarations, and variables."
-            )
-            return
-        
-        # Extract the definitions
-        definitions = self.extract_recursive_definitions(file_path, item_type, item_name)
-        
-        if not definitions:
-            QtWidgets.QMessageBox.warning(
-                self, 
-                "Warning", 
-                f"Could not extract definitions for {item_type} {item_name}."
-            )
-            return
-        
-        # Display the definitions in a popup window
-        self.show_definitions_popup(definitions, f"{item_type} {item_name}")
+# File mostrati nella tabella riassuntiva di --profile
+PROFILE_TOP_N = 20
 
-    def extract_variable_declaration(self, file_path, var_name):
-        """Extract the declaration of a variable from the file."""
-        try:
-            # Create a temporary file to store the preprocessed source
-            with tempfile.NamedTemporaryFile(suffix='.c', delete=False) as temp_file:
-                temp_path = temp_file.name
-            
-            # Preprocess the file to expand all includes and macros
-            preprocess_cmd = ["gcc", "-E", "-P", file_path, "-o", temp_path]
-            subprocess.run(preprocess_cmd, check=True)
-            
-            # Read the preprocessed file
-            with open(temp_path, 'r') as f:
-                preprocessed_source = f.read()
-            
-            # Look for the variable declaration
-            import re
-            # Pattern to match variable declarations like "int var_name;" or "const char* var_name = ..."
-            var_pattern = f"(const\\s+)?[a-zA-Z0-9_]+\\s+[\\*\\s]*{var_name}\\s*[=;][^;]*;"
-            match = re.search(var_pattern, preprocessed_source)
-            
-            if match:
-                return match.group(0)
-            return None
-        
-        except Exception as e:
-            logging.error(f"Error extracting variable declaration: {e}")
-            return None
-        finally:
-            # Clean up the temporary file
-            if os.path.exists(temp_path):
-                os.unlink(temp_path)
-    def extract_recursive_definitions(self, file_path, item_type, item_name):
-            """
-            Extract the complete C definition of the item and all its dependencies.
-            Returns a string containing all the definitions in the correct order.
-            """
-            # Create a temporary file to store the preprocessed source
-            with tempfile.NamedTemporaryFile(suffix='.c', delete=False) as temp_file:
-                temp_path = temp_file.name
-            
-            try:
-                # Preprocess the file to expand all includes and macros
-                preprocess_cmd = ["gcc", "-E", "-P", file_path, "-o", temp_path]
-                subprocess.run(preprocess_cmd, check=True)
-                
-                # Parse the preprocessed file with clang
-                index = clang.cindex.Index.create()
-                tu = index.parse(temp_path, args=['-std=c99'])
-                
-                # Find the target declaration
-                target_cursor = None
-                dependency_cursors = []
-                
-                def find_declaration(cursor, parent=None):
-                    nonlocal target_cursor
-                    
-                    if (cursor.kind.name == item_type and 
-                        cursor.spelling == item_name and 
-                        cursor.location.file and 
-                        os.path.normpath(cursor.location.file.name) == os.path.normpath(file_path)):
-                        target_cursor = cursor
-                        return True
-                    
-                    for child in cursor.get_children():
-                        if find_declaration(child, cursor):
-                            return True
-                    return False
-                
-                find_declaration(tu.cursor)
-                
-                if not target_cursor:
-                    logging.error(f"Could not find declaration for {item_type} {item_name} in {file_path}")
-                    return None
-                
-                # Collect all dependencies
-                collected_types = set()
-                dependency_definitions = []
-                
-                def collect_dependencies(cursor, collected):
-                    if not cursor:
-                        return
-                        
-                    # For typedefs, get the underlying type
-                    if cursor.kind == clang.cindex.CursorKind.TYPEDEF_DECL:
-                        underlying_type = cursor.underlying_typedef_type
-                        if underlying_type.kind == clang.cindex.TypeKind.ELABORATED:
-                            # Get the declaration for this type
-                            type_decl = underlying_type.get_declaration()
-                            if type_decl and type_decl.spelling not in collected:
-                                collected.add(type_decl.spelling)
-                                collect_dependencies(type_decl, collected)
-                    
-                    # For structs and unions, collect field types
-                    elif cursor.kind in [clang.cindex.CursorKind.STRUCT_DECL, clang.cindex.CursorKind.UNION_DECL]:
-                        for field in cursor.get_children():
-                            if field.kind == clang.cindex.CursorKind.FIELD_DECL:
-                                field_type = field.type
-                                if field_type.kind == clang.cindex.TypeKind.ELABORATED:
-                                    type_decl = field_type.get_declaration()
-                                    if type_decl and type_decl.spelling not in collected:
-                                        collected.add(type_decl.spelling)
-                                        collect_dependencies(type_decl, collected)
-                
-                # Start collecting dependencies from the target cursor
-                collect_dependencies(target_cursor, collected_types)
-                
-                # Extract the source code for the target and its dependencies
-                with open(temp_path, 'r') as f:
-                    preprocessed_source = f.read()
-                
-                # Extract the definitions in the correct order
-                definitions = []
-                
-                # First, extract all dependency definitions
-                for type_name in collected_types:
-                    # Find the definition in the preprocessed source
-                    # This is a simplified approach and might need refinement
-                    type_pattern = f"(typedef|struct|union|enum)\\s+{type_name}\\s*\\{{[^}}]*\\}}\\s*;"
-                    import re
-                    match = re.search(type_pattern, preprocessed_source)
-                    if match:
-                        definitions.append(match.group(0))
-                
-                # Then, extract the target definition
-                target_pattern = None
-                if item_type == "STRUCT_DECL":
-                    target_pattern = f"struct\\s+{item_name}\\s*\\{{[^}}]*\\}}\\s*;"
-                elif item_type == "TYPEDEF_DECL":
-                    target_pattern = f"typedef\\s+.*\\s+{item_name}\\s*;"
-                elif item_type == "ENUM_DECL":
-                    target_pattern = f"enum\\s+{item_name}\\s*\\{{[^}}]*\\}}\\s*;"
-                elif item_type == "UNION_DECL":
-                    target_pattern = f"union\\s+{item_name}\\s*\\{{[^}}]*\\}}\\s*;"
-                
-                if target_pattern:
-                    match = re.search(target_pattern, preprocessed_source)
-                    if match:
-                        definitions.append(match.group(0))
-                
-                return "\n\n".join(definitions)
-            
-            except Exception as e:
-                logging.error(f"Error extracting definitions: {e}")
-                return None
-            finally:
-                # Clean up the temporary file
-                if os.path.exists(temp_path):
-                    os.unlink(temp_path)
-
-    def show_definitions_popup(self, definitions, title):
-        """Display the extracted definitions in a popup window."""
-        dialog = QtWidgets.QDialog(self)
-        dialog.setWindowTitle(f"Recursive Definitions: {title}")
-        dialog.resize(800, 600)
-        
-        layout = QtWidgets.QVBoxLayout(dialog)
-        
-        # Text area for displaying the definitions
-        text_edit = QtWidgets.QTextEdit()
-        text_edit.setReadOnly(True)
-        text_edit.setFont(QtGui.QFont("Courier New", 10))
-        text_edit.setText(definitions)
-        layout.addWidget(text_edit)
-        
-        # Buttons for copying and saving
-        button_layout = QtWidgets.QHBoxLayout()
-        
-        copy_button = QtWidgets.QPushButton("Copy to Clipboard")
-        copy_button.clicked.connect(lambda: QtWidgets.QApplication.clipboard().setText(definitions))
-        button_layout.addWidget(copy_button)
-        
-        save_button = QtWidgets.QPushButton("Save to File")
-        save_button.clicked.connect(lambda: self.save_definitions_to_file(definitions, title))
-        button_layout.addWidget(save_button)
-        
-        close_button = QtWidgets.QPushButton("Close")
-        close_button.clicked.connect(dialog.accept)
-        button_layout.addWidget(close_button)
-        
-        layout.addLayout(button_layout)
-        
-        dialog.exec_()
-
-    def save_definitions_to_file(self, definitions, title):
-        """Save the definitions to a file."""
-        file_name, _ = QtWidgets.QFileDialog.getSaveFileName(
-            self, 
-            "Save Definitions", 
-            f"{title.replace(' ', '_')}_definitions.h", 
-            "Header Files (*.h);;Text Files (*.txt);;All Files (*)"
-        )
-        
-        if file_name:
-            try:
-                with open(file_name, 'w') as f:
-                    f.write(definitions)
-                logging.info(f"Definitions saved to {file_name}")
-                QtWidgets.QMessageBox.information(
-                    self, 
-                    "Success", 
-                    f"Definitions successfully saved to {file_name}"
-                )
-            except Exception as e:
-                logging.error(f"Error saving definitions: {e}")
-                QtWidgets.QMessageBox.critical(
-                    self, 
-                    "Error", 
-                    f"Could not save definitions: {e}"
-                )
-    def export_all_definitions(self):
-        """Export all struct, typedef, enum, union, macro, variable and function definitions to a single file."""
-        logging.info("Exporting all definitions...")
-        
-        file_name, _ = QtWidgets.QFileDialog.getSaveFileName(
-            self, 
-            "Save All Definitions", 
-            "all_definitions.defs",
-            "Header Files (*.defs);;Definition Files (*.defs);;Text Files (*.txt);;All Files (*)"
-        )
-        
-        if not file_name:
-            return  # User cancelled
-        
-        accepted, apply_search_filter, exclude_duplicating_objects, exclude_unnamed = self.get_export_options("Definitions Export Options")
-        
-        if not accepted:
-            return  # L'utente ha annullato
-        
-        # Add FUNCTION_DECL to the list of target types
-        target_types = ["STRUCT_DECL", "TYPEDEF_DECL", "ENUM_DECL", "UNION_DECL", "MACRO_DEFINITION", "VAR_DECL", "FUNCTION_DECL"]
-        all_definitions = []
-        processed_items = set()  # To avoid duplicates
-        typedef_names = set()  # Per tenere traccia dei nomi definiti tramite typedef
-        
-        # Determina quali righe processare in base alle opzioni
-        if apply_search_filter:
-            rows_to_process = [self.proxy_model.mapToSource(self.proxy_model.index(row, 0)).row() 
-                            for row in range(self.proxy_model.rowCount())]
+class IndexProfile:
+    """
+    Per-file timing and clang diagnostics of an indexing run (see --profile):
+    a FileProfile for each parsed file, and the number of files taken from
+    the index cache. Nothing is measured or formatted when no IndexProfile
+    is passed to the indexer.
+    """
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.elapsed = None
+        self.files = []
+        self.cached = 0
+    
+    def add(self, parsed):
+        """Add the FileProfile of a ParsedFile (a cached file if it has none)."""
+        if parsed.profile is None:
+            self.cached += 1
         else:
-            rows_to_process = list(range(self.model.rowCount()))
-        
-        # Show a progress dialog
-        progress = QtWidgets.QProgressDialog("Exporting definitions...", "Cancel", 0, len(rows_to_process), self)
-        progress.setWindowModality(QtCore.Qt.WindowModal)
-        progress.setMinimumDuration(0)
-        progress.setValue(0)
-        
-        # Primo passaggio: raccogli tutti i nomi definiti tramite typedef
-        for row in rows_to_process:
-            type_item = self.model.item(row, 0)
-            name_item = self.model.item(row, 1)
-            item_type = type_item.text()
-            item_name = name_item.text()
-
-            if item_type == "TYPEDEF_DECL":
-                typedef_names.add(item_name)
-        
-        # Process selected rows
-        for i, row in enumerate(rows_to_process):
-            if progress.wasCanceled():
-                break
-                
-            progress.setValue(i)
-            QtWidgets.QApplication.processEvents()
-            
-            type_item = self.model.item(row, 0)
-            name_item = self.model.item(row, 1)
-            named_value = self.model.item(row, 2).data(QtCore.Qt.DisplayRole)  # Valore booleano Named
-            dir_item = self.model.item(row, 3)  # Directory column
-            file_item = self.model.item(row, 4)  # Filename column
-            line_item = self.model.item(row, 5)  # Line column
-            declaration_item = self.model.item(row, 8)  # Declaration column
-            
-            if not all([type_item, name_item, dir_item, file_item]):
-                logging.warning(f"Skipping row {row}: missing item data")
-                continue
-                
-            item_type = type_item.text()
-            item_name = name_item.text()
-            line_number = line_item.text()
-        
-            # Skip if not a target type or already processed or has no name
-            if item_type not in target_types or (item_type, item_name) in processed_items or not item_name:
-                continue
-            
-            # Skip unnamed elements if requested
-            if exclude_unnamed and not named_value:
+            self.files.append(parsed.profile)
+    
+    def totals(self):
+        return {
+            "files": len(self.files),
+            "cached": self.cached,
+            "elapsed_seconds": self.elapsed if self.elapsed is not None else time.perf_counter() - self.origin,
+            "parse_seconds": sum(p.parse_seconds for p in self.files),
+            "traverse_seconds": sum(p.traverse_seconds for p in self.files),
+            "cursors": sum(p.cursors for p in self.files),
+            "records": sum(p.records for p in self.files),
+            "warnings": sum(p.warnings for p in self.files),
+            "errors": sum(p.errors for p in self.files),
+        }
+    
+    def slowest(self, top=PROFILE_TOP_N):
+        """Return the FileProfile of the top files by parse plus traversal time."""
+        return heapq.nlargest(top, self.files, key=lambda p: p.parse_seconds + p.traverse_seconds)
+    
+    def report(self, top=PROFILE_TOP_N):
+        """Return the summary table as text."""
+        totals = self.totals()
+        lines = [
+            "Index profile: {files} files parsed, {cached} from the cache, in {elapsed_seconds:.2f} s".format(**totals),
+            "  parse {parse_seconds:.2f} s, traversal {traverse_seconds:.2f} s, {cursors} cursors, {records} records, "
+            "{warnings} warnings, {errors} errors".format(**totals),
+        ]
+        slowest = self.slowest(top)
+        if slowest:
+            lines.append(f"  Slowest {len(slowest)} files:")
+            lines.append(f"  {'parse s':>8} {'walk s':>8} {'cursors':>9} {'records':>8} {'warn':>5} {'err':>5}  file")
+            lines.extend(f"  {p.parse_seconds:8.3f} {p.traverse_seconds:8.3f} {p.cursors:9d} {p.records:8d} "
+                         f"{p.warnings:5d} {p.errors:5d}  {p.file}" for p in slowest)
+        return "\n".join(lines)
+    
+    def as_dict(self):
+        return {"totals": self.totals(),
+                "files": [dict(p._asdict(), start=p.start - self.origin) for p in self.files]}
+    
+    def chrome_trace(self):
+        """Return the profile in the Chrome trace event format (chrome://tracing, Perfetto): one lane per worker."""
+        events = []
+        for p in self.files:
+            start = (p.start - self.origin) * 1e6
+            args = {"cursors": p.cursors, "records": p.records, "warnings": p.warnings, "errors": p.errors}
+            events.append({"name": p.file, "cat": "parse", "ph": "X", "pid": 0, "tid": p.worker,
+                           "ts": start, "dur": p.parse_seconds * 1e6, "args": args})
+            events.append({"name": p.file, "cat": "traverse", "ph": "X", "pid": 0, "tid": p.worker,
+                           "ts": start + p.parse_seconds * 1e6, "dur": p.traverse_seconds * 1e6})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+    
+    def finish(self, path=None, profile_format="json"):
+        """End the run: log the summary table and write the profile to path (JSON or Chrome trace), if given."""
+        self.elapsed = time.perf_counter() - self.origin
+        logging.info(self.report())
+        if path:
+            data = self.chrome_trace() if profile_format == "trace" else self.as_dict()
+            try:
+                with open(path, 'w') as f:
+                    json.dump(data, f, indent=1)
+            except OSError as e:
+                logging.error(f"Cannot write the profile to {path}: {e}")
+            else:
+                logging.info(f"Profile written to {path}")
+
+def parse_file(index, f, scope, filter_macros=True, macro_prefixes=None, harvested=None, references=False,
+               args=CLANG_PARSE_ARGS, profile=False):
+    """
+    Parse a single file with the given clang index and return a ParsedFile.
+    
+    Args:
+        index: The clang.cindex.Index used to parse the file
+        f: The file to parse
+        scope: InputScope of all input files (records outside these files are ignored)
+        filter_macros: Whether to filter out macros with certain prefixes
+        macro_prefixes: List of macro prefixes to filter out
+        harvested: Optional set of normalized paths whose declarations were already
+            collected from a previous translation unit: the top-level cursors of
+            these files (headers shared by many translation units) are not walked again
+        references: Whether to collect the references to symbols (see ReferenceCollector)
+        args: The clang arguments (see parse_arguments)
+        profile: Whether to measure the file (see FileProfile)
+    """
+    import clang.cindex
+    logging.info(f"Processing file: {f}")
+    if profile:
+        start = time.perf_counter()
+    tu = index.parse(f, args=args)
+    if profile:
+        parsed_at = time.perf_counter()
+    scope.new_translation_unit()
+    SOURCE_CACHE.new_generation()
+    source_counters = SOURCE_CACHE.counters()
+    
+    main_file = normalized_path(f)
+    file_results = []
+    type_nodes = []
+    collector = ReferenceCollector() if references else None
+    walked = set()
+    skipped = set()
+    cursors = 0
+    # Equivalente a traverse_ast(tu.cursor, ...): il cursore della translation unit
+    # non produce record, quindi si visitano direttamente i suoi figli
+    for child in tu.cursor.get_children():
+        location_file = child.location.file
+        if location_file is not None:
+            path = normalized_path(location_file.name)
+            if harvested is not None and path != main_file and path in harvested:
+                skipped.add(path)
                 continue
-            
-            directory = dir_item.text()
-            filename = file_item.text()
-            file_path = os.path.join(directory, filename)
-            
-            logging.info(f"Processing {item_type} {item_name} from {file_path}")
-            
-            # Usa la dichiarazione completa dal campo Declaration se disponibile
-            declaration = declaration_item.text() if declaration_item and declaration_item.text() else None
-            info = f"/* From file: {file_path}:{line_number} Type:{item_type} */"
-            
-            if item_type == "TYPEDEF_DECL":
-                # Includi sempre i typedef
-                all_definitions.append(info)
-                all_definitions.append(declaration)
-                processed_items.add((item_type, item_name))
-            elif item_type in ["STRUCT_DECL", "ENUM_DECL", "UNION_DECL"]:
-                # Se exclude_duplicating_objects è True, includi solo se non c'è un typedef corrispondente
-                if not exclude_duplicating_objects or item_name not in typedef_names:
-                    all_definitions.append(info)
-                    all_definitions.append(declaration)
-                    processed_items.add((item_type, item_name))
-            elif item_type in ["MACRO_DEFINITION", "VAR_DECL"]:
-                # Includi sempre macro e variabili
-                all_definitions.append(info)
-                all_definitions.append(declaration)
-                processed_items.add((item_type, item_name))
-            elif item_type == "FUNCTION_DECL":
-                # Includi le dichiarazioni di funzione
-                all_definitions.append(info)
-                # Per le funzioni, aggiungi un punto e virgola se non è già presente
-                if declaration and not declaration.strip().endswith(';'):
-                    declaration = declaration.strip() + ';'
-                all_definitions.append(declaration)
-                processed_items.add((item_type, item_name))
-            
-            if not declaration:
-                # Fallback: genera una dichiarazione di base se il campo Declaration è vuoto
-                fallback_declaration = None
-                
-                if item_type == "STRUCT_DECL":
-                    fallback_declaration = f"struct {item_name} {{ /* Definition not available */ }};"
-                elif item_type == "TYPEDEF_DECL":
-                    fallback_declaration = f"typedef void {item_name}; /* Actual type not available */"
-                elif item_type == "ENUM_DECL":
-                    fallback_declaration = f"enum {item_name} {{ /* Enum values not available */ }};"
-                elif item_type == "UNION_DECL":
-                    fallback_declaration = f"union {item_name} {{ /* Union fields not available */ }};"
-                elif item_type == "MACRO_DEFINITION":
-                    fallback_declaration = f"#define {item_name} /* Macro value not available */"
-                elif item_type == "VAR_DECL":
-                    fallback_declaration = f"extern int {item_name}; /* Actual type not available */"
-                elif item_type == "FUNCTION_DECL":
-                    fallback_declaration = f"extern void {item_name}(void); /* Function signature not available */"
-                
-                if fallback_declaration:
-                    all_definitions.append(info)
-                    all_definitions.append(fallback_declaration)
-                    processed_items.add((item_type, item_name))
-                    logging.info(f"Added fallback definition for {item_type} {item_name}")
-        
-        progress.setValue(len(rows_to_process))
-        
-        if not all_definitions:
-            QtWidgets.QMessageBox.warning(
-                self, 
-                "Warning", 
-                "No definitions were found to export."
-            )
-            return
-        
-        # Filtra gli elementi None dalla lista all_definitions
-        all_definitions = [d for d in all_definitions if d is not None]
+            walked.add(path)
+        cursors += traverse_ast(child, file_results, scope, filter_macros, macro_prefixes, type_nodes, collector)
+    includes = [inc.include.name for inc in tu.get_includes()]
+    file_profile = None
+    if profile:
+        traversed_at = time.perf_counter()
+        severities = collections.Counter(diagnostic.severity for diagnostic in tu.diagnostics)
+        errors = severities[clang.cindex.Diagnostic.Error] + severities[clang.cindex.Diagnostic.Fatal]
+        file_profile = FileProfile(f, os.getpid(), start, parsed_at - start, traversed_at - parsed_at, cursors,
+                                   len(file_results), severities[clang.cindex.Diagnostic.Warning], errors)
+    source_stats = tuple(after - before for after, before in zip(SOURCE_CACHE.counters(), source_counters))
+    return ParsedFile(file_results, includes, walked, skipped, type_nodes,
+                      collector.entries if collector is not None else [], file_profile, source_stats)
 
-        # Create a header guard based on the file name
-        base_name = os.path.basename(file_name)
-        header_guard = base_name.replace(".", "_").upper()
-        
-        # Combine all definitions with header guards
-        combined_content = [
-            f"#ifndef {header_guard}",
-            f"#define {header_guard}",
-            "",
-            "/* Automatically generated by C Identifier Explorer */",
-            "/* Contains all struct, typedef, enum, union, macro, variable and function definitions */",
-            "",
-            "\n\n".join(all_definitions),
-            "",
-            f"#endif /* {header_guard} */",
-            ""
-        ]
-        
-        # Write to file
-        try:
-            with open(file_name, 'w') as f:
-                f.write("\n".join(combined_content))
-            
-            logging.info(f"All definitions saved to {file_name}")
-            QtWidgets.QMessageBox.information(
-                self, 
-                "Success", 
-                f"Successfully exported {len(processed_items)} definitions to {file_name}"
-            )
-        except Exception as e:
-            logging.error(f"Error saving all definitions: {e}")
-            QtWidgets.QMessageBox.critical(
-                self, 
-                "Error", 
-                f"Could not save all definitions: {e}"
-            )
-
-    def show_statistics(self):
-        """Show statistics about the loaded items in the table."""
-        logging.info("Generating statistics...")
-        
-        # Collect statistics
-        total_items = self.model.rowCount()
-        
-        # Count by type
-        type_counts = {}
-        for row in range(total_items):
-            item_type = self.model.item(row, 0).text()
-            type_counts[item_type] = type_counts.get(item_type, 0) + 1
-        
-        # Count by file extension
-        file_ext_counts = {}
-        for row in range(total_items):
-            # Filename è ora in posizione 4
-            filename = self.model.item(row, 4).text()
-            ext = os.path.splitext(filename)[1] if filename else "unknown"
-            file_ext_counts[ext] = file_ext_counts.get(ext, 0) + 1
-        
-        # Count by directory
-        dir_counts = {}
-        for row in range(total_items):
-            # Directory è ora in posizione 3
-            directory = self.model.item(row, 3).text()
-            if directory:
-                # Get the last part of the directory path for cleaner display
-                dir_counts[directory] = dir_counts.get(directory, 0) + 1
-        
-        # Create a dialog to display the statistics
-        dialog = QtWidgets.QDialog(self)
-        dialog.setWindowTitle("Statistics")
-        dialog.resize(600, 500)
-        
-        layout = QtWidgets.QVBoxLayout(dialog)
-        
-        # Add a tab widget to organize different statistics
-        tab_widget = QtWidgets.QTabWidget()
-        layout.addWidget(tab_widget)
-        
-        # Summary tab
-        summary_widget = QtWidgets.QWidget()
-        summary_layout = QtWidgets.QVBoxLayout(summary_widget)
-        
-        summary_text = QtWidgets.QTextEdit()
-        summary_text.setReadOnly(True)
-        summary_text.setFont(QtGui.QFont("Arial", 10))
-        
-        summary_content = [
-            "<h2>Summary Statistics</h2>",
-            f"<p><b>Total items:</b> {total_items}</p>",
-            f"<p><b>Unique types:</b> {len(type_counts)}</p>",
-            f"<p><b>File extensions:</b> {len(file_ext_counts)}</p>",
-            f"<p><b>Directories:</b> {len(dir_counts)}</p>",
-            "<h3>Top Types</h3>",
-            "<ul>"
-        ]
-        
-        # Sort types by count (descending)
-        sorted_types = sorted(type_counts.items(), key=lambda x: x[1], reverse=True)
-        for type_name, count in sorted_types[:5]:  # Show top 5
-            summary_content.append(f"<li><b>{type_name}:</b> {count} ({count/total_items*100:.1f}%)</li>")
-        
-        summary_content.append("</ul>")
-        summary_text.setHtml("".join(summary_content))
-        summary_layout.addWidget(summary_text)
-        
-        tab_widget.addTab(summary_widget, "Summary")
-        
-        # Types tab
-        types_widget = QtWidgets.QWidget()
-        types_layout = QtWidgets.QVBoxLayout(types_widget)
-        
-        types_table = QtWidgets.QTableWidget()
-        types_table.setColumnCount(3)
-        types_table.setHorizontalHeaderLabels(["Type", "Count", "Percentage"])
-        types_table.setRowCount(len(type_counts))
-        
-        for i, (type_name, count) in enumerate(sorted_types):
-            types_table.setItem(i, 0, QtWidgets.QTableWidgetItem(type_name))
-            types_table.setItem(i, 1, QtWidgets.QTableWidgetItem(str(count)))
-            types_table.setItem(i, 2, QtWidgets.QTableWidgetItem(f"{count/total_items*100:.1f}%"))
-        
-        types_table.setSortingEnabled(True)
-        types_table.resizeColumnsToContents()
-        types_layout.addWidget(types_table)
-        
-        tab_widget.addTab(types_widget, "By Type")
-        
-        # Files tab
-        files_widget = QtWidgets.QWidget()
-        files_layout = QtWidgets.QVBoxLayout(files_widget)
-        
-        files_table = QtWidgets.QTableWidget()
-        files_table.setColumnCount(3)
-        files_table.setHorizontalHeaderLabels(["Extension", "Count", "Percentage"])
-        files_table.setRowCount(len(file_ext_counts))
-        
-        sorted_exts = sorted(file_ext_counts.items(), key=lambda x: x[1], reverse=True)
-        for i, (ext, count) in enumerate(sorted_exts):
-            files_table.setItem(i, 0, QtWidgets.QTableWidgetItem(ext))
-            files_table.setItem(i, 1, QtWidgets.QTableWidgetItem(str(count)))
-            files_table.setItem(i, 2, QtWidgets.QTableWidgetItem(f"{count/total_items*100:.1f}%"))
-        
-        files_table.setSortingEnabled(True)
-        files_table.resizeColumnsToContents()
-        files_layout.addWidget(files_table)
-        
-        tab_widget.addTab(files_widget, "By File Extension")
-        
-        # Directories tab
-        dirs_widget = QtWidgets.QWidget()
-        dirs_layout = QtWidgets.QVBoxLayout(dirs_widget)
-        
-        dirs_table = QtWidgets.QTableWidget()
-        dirs_table.setColumnCount(3)
-        dirs_table.setHorizontalHeaderLabels(["Directory", "Count", "Percentage"])
-        dirs_table.setRowCount(len(dir_counts))
-        
-        sorted_dirs = sorted(dir_counts.items(), key=lambda x: x[1], reverse=True)
-        for i, (dir_name, count) in enumerate(sorted_dirs):
-            dirs_table.setItem(i, 0, QtWidgets.QTableWidgetItem(dir_name))
-            dirs_table.setItem(i, 1, QtWidgets.QTableWidgetItem(str(count)))
-            dirs_table.setItem(i, 2, QtWidgets.QTableWidgetItem(f"{count/total_items*100:.1f}%"))
-        
-        dirs_table.setSortingEnabled(True)
-        dirs_table.resizeColumnsToContents()
-        dirs_layout.addWidget(dirs_table)
-        
-        tab_widget.addTab(dirs_widget, "By Directory")
-        
-        # Type distribution by file extension
-        cross_widget = QtWidgets.QWidget()
-        cross_layout = QtWidgets.QVBoxLayout(cross_widget)
-        
-        cross_table = QtWidgets.QTableWidget()
-        
-        # Get top 5 types and extensions for the cross table
-        top_types = [t[0] for t in sorted_types[:5]]
-        top_exts = [e[0] for e in sorted_exts[:5]]
-        
-        cross_table.setColumnCount(len(top_exts) + 1)
-        cross_table.setRowCount(len(top_types))
-        
-        # Set headers
-        headers = ["Type"] + top_exts
-        cross_table.setHorizontalHeaderLabels(headers)
-        
-        # Calculate cross-tabulation
-        cross_data = {}
-        for row in range(total_items):
-            item_type = self.model.item(row, 0).text()
-            # Filename è ora in posizione 4
-            filename = self.model.item(row, 4).text()
-            ext = os.path.splitext(filename)[1] if filename else "unknown"
+# Stato di ciascun processo worker, inizializzato da _init_parse_worker
+_worker_state = {}
+
+def _init_parse_worker(file_list, filter_macros, macro_prefixes, skip_seen_headers, log_level, references=False,
+                       profile=False):
+    """Pool initializer: every worker owns its own clang index (and set of harvested headers)."""
+    import clang.cindex
+    logging.getLogger().setLevel(log_level)
+    _worker_state["index"] = clang.cindex.Index.create()
+    _worker_state["scope"] = InputScope(file_list)
+    _worker_state["filter_macros"] = filter_macros
+    _worker_state["macro_prefixes"] = macro_prefixes
+    _worker_state["references"] = references
+    _worker_state["profile"] = profile
+    # Ogni worker riceve i file in ordine crescente, quindi un header saltato
+    # è sempre stato visitato da una translation unit precedente in file_list
+    _worker_state["harvested"] = set() if skip_seen_headers else None
+
+def _parse_file_worker(task):
+    """Parse one (file, clang arguments) inside a worker process and return compact record tuples."""
+    f, args = task
+    harvested = _worker_state["harvested"]
+    parsed = parse_file(_worker_state["index"], f,
+                        _worker_state["scope"],
+                        _worker_state["filter_macros"],
+                        _worker_state["macro_prefixes"],
+                        harvested,
+                        _worker_state["references"],
+                        args,
+                        _worker_state["profile"])
+    if harvested is not None:
+        harvested.update(parsed.walked)
+    return parsed._replace(records=[record_to_tuple(record) for record in parsed.records])
+
+def _iter_parsed_files(to_parse, file_list, filter_macros, macro_prefixes, jobs, harvested=None, references=False,
+                       compile_commands=None, profile=False):
+    """
+    Parse the files in to_parse and yield a ParsedFile for each of them, in order.
+    
+    With jobs > 1 the files are parsed by a pool of worker processes, each one
+    with its own clang index; jobs == 0 means one worker per CPU.
+    Each file is parsed with its arguments in compile_commands (see parse_arguments).
+    In the serial case `harvested` is read while parsing each file (the caller
+    keeps it up to date between files); workers keep their own set.
+    """
+    import clang.cindex
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    jobs = min(jobs, len(to_parse))
+    
+    if jobs <= 1:
+        if to_parse:
+            index = clang.cindex.Index.create()
+            scope = InputScope(file_list)
+        for f in to_parse:
+            yield parse_file(index, f, scope, filter_macros, macro_prefixes, harvested, references,
+                             parse_arguments(f, compile_commands), profile)
+        return
+    
+    logging.info(f"Parsing {len(to_parse)} files with {jobs} worker processes")
+    # Ogni worker riceve blocchi di file contigui; imap mantiene l'ordine di to_parse.
+    # Le translation unit di un database di compilazione arrivano dalla più grande:
+    # vengono distribuite una per volta, così le più lunghe partono per prime
+    if compile_commands is not None:
+        chunksize = 1
+    else:
+        chunksize = max(1, len(to_parse) // (jobs * 4))
+    tasks = ((f, parse_arguments(f, compile_commands)) for f in to_parse)
+    initargs = (file_list, filter_macros, macro_prefixes, harvested is not None,
+                logging.getLogger().getEffectiveLevel(), references, profile)
+    with multiprocessing.Pool(jobs, initializer=_init_parse_worker, initargs=initargs) as pool:
+        for parsed in pool.imap(_parse_file_worker, tasks, chunksize):
+            yield parsed._replace(records=[record_from_tuple(values) for values in parsed.records])
+
+def iter_file_results(file_list, filter_macros=True, macro_prefixes=None, jobs=1, cache=None,
+                      skip_seen_headers=False, type_graph=None, reference_index=None, compile_commands=None,
+                      profile=None, source_stats=None):
+    """
+    Yield the records of each file in file_list, in file_list order (but see
+    compile_commands below).
+    
+    Files with an up-to-date entry in the IndexCache `cache` are not parsed
+    again; the others are parsed (see _iter_parsed_files) and stored in it.
+    
+    With skip_seen_headers, the declarations of a file already walked in a previous
+    translation unit (typically a header included by many .c files) are not walked
+    again. Records of a header whose content depends on the including file (e.g.
+    different #defines before the #include) are then taken from the first one only.
+    
+    With compile_commands (a CompileCommands), the files of file_list that are
+    translation units of the compilation database come first, largest first, each
+    one parsed with its own arguments; the other files (headers) follow, in
+    file_list order, and are parsed on their own only if no translation unit
+    included them: the records of the included ones were already collected from
+    the translation units, so for them an empty list is yielded.
+    
+    The TypeNode of each file are added to type_graph (a TypeGraph), if given.
+    If reference_index (a ReferenceIndex) is given, the references to symbols
+    are collected too, and added to it. If profile (an IndexProfile) is given,
+    each parsed file is measured and added to it. The SOURCE_CACHE counters of
+    the parsed files, in whichever process parsed them, are added to
+    source_stats (a collections.Counter), if given.
+    """
+    import clang.cindex
+    harvested = set() if skip_seen_headers else None
+    references = reference_index is not None
+    if cache is not None:
+        cache.begin(file_list, filter_macros, macro_prefixes, skip_seen_headers, references)
+    fallback = {}  # indice clang e InputScope per ri-analizzare le voci della cache non utilizzabili
+    
+    def iter_group(files):
+        """Yield (file, ParsedFile) for each of files, taken from the cache or parsed."""
+        cached = {}
+        if cache is not None:
+            for f in files:
+                entry = cache.lookup(f, parse_arguments(f, compile_commands))
+                if entry is not None:
+                    cached[f] = entry
+        to_parse = [f for f in files if f not in cached]
+        parsed_files = _iter_parsed_files(to_parse, file_list, filter_macros, macro_prefixes, jobs, harvested,
+                                          references, compile_commands, profile is not None)
+        for f in files:
+            args = parse_arguments(f, compile_commands)
+            if f in cached:
+                parsed = cached[f]
+                if harvested is not None and not parsed.skipped <= harvested:
+                    # La voce in cache ha saltato header che in questa esecuzione non sono
+                    # stati visitati prima: il file va analizzato di nuovo
+                    if not fallback:
+                        fallback["index"] = clang.cindex.Index.create()
+                        fallback["scope"] = InputScope(file_list)
+                    parsed = parse_file(fallback["index"], f, fallback["scope"], filter_macros, macro_prefixes,
+                                        harvested, references, args, profile is not None)
+                    cache.store(f, parsed, args)
+            else:
+                parsed = next(parsed_files)
+                if cache is not None:
+                    cache.store(f, parsed, args)
+            yield f, parsed
+    
+    if compile_commands is None:
+        parsed_files = iter_group(file_list)
+    else:
+        units, others = compile_commands.schedule(file_list)
+        covered = set()  # file inclusi dalle translation unit
+        
+        def iter_uncovered():
+            headers = [f for f in others if normalized_path(f) not in covered]
+            logging.info(f"{len(units)} translation units of the compilation database, "
+                         f"{len(others) - len(headers)} files included by them, {len(headers)} other files")
+            headers_set = set(headers)
+            parsed_headers = iter_group(headers)
+            for f in others:
+                yield (f, next(parsed_headers)[1]) if f in headers_set else (f, None)
+        
+        parsed_files = itertools.chain(iter_group(units), iter_uncovered())
+    
+    for f, parsed in parsed_files:
+        if parsed is None:
+            yield []
+            continue
+        if compile_commands is not None:
+            covered.update(normalized_path(include) for include in parsed.includes)
+        if profile is not None:
+            profile.add(parsed)
+        if source_stats is not None and parsed.source_stats is not None:
+            source_stats.update(dict(zip(SOURCE_CACHE_COUNTERS, parsed.source_stats)))
+        records = parsed.records
+        file_references = parsed.references
+        if harvested is not None:
+            # I worker paralleli non conoscono gli header visitati dagli altri worker:
+            # applica la stessa regola ai record, così il risultato è quello seriale
+            main_file = normalized_path(f)
+            records = [record for record in records
+                       if not record["File"]
+                       or normalized_path(record["File"]) == main_file
+                       or normalized_path(record["File"]) not in harvested]
+            if file_references:
+                file_references = [entry for entry in file_references
+                                   if entry[1] == REFERENCE_SITE
+                                   or normalized_path(entry[2]) == main_file
+                                   or normalized_path(entry[2]) not in harvested]
+            harvested.update(parsed.walked)
+        if type_graph is not None:
+            type_graph.add(parsed.types)
+        if reference_index is not None:
+            reference_index.add(file_references)
+        yield records
+    
+    if cache is not None:
+        cache.commit()
+
+def iter_unique_records(file_list, filter_macros=True, macro_prefixes=None, jobs=1, cache=None,
+                        skip_seen_headers=False, type_graph=None, reference_index=None, symbol_index=None,
+                        compile_commands=None, profile=None, merge_declarations=False):
+    """
+    Yield, for each file in file_list (in the order of iter_file_results), the list of its records not
+    already produced by a previous file (see record_key): every definition, and
+    the declarations (prototypes, extern variables, forward declarations) of
+    the symbols not defined so far. A declaration folds into a definition found
+    earlier or later in the same file; the ones still without definition are
+    produced with their file, so memory stays bounded by one translation unit
+    plus the keys. With merge_declarations they are instead held back until a
+    definition turns up in any later file, and the ones never defined are
+    produced in one more list after the last file. All the sites of each
+    symbol are added to symbol_index (a SymbolIndex), if given. See
+    process_files for the other arguments.
+    """
+    if macro_prefixes is None:
+        macro_prefixes = ['__']
+    
+    # Insieme delle chiavi degli elementi già processati
+    processed_keys = set()
+    debug = logging.getLogger().isEnabledFor(logging.DEBUG)
+    # Simboli di cui è già uscita una definizione: le loro dichiarazioni vi confluiscono
+    defined = set()
+    # merge_declarations: dichiarazioni in attesa della definizione, chiave -> primo record trovato
+    pending = {}
+    # Contatori della cache dei sorgenti, sommati su tutti i processi che hanno analizzato i file
+    source_stats = collections.Counter()
+    
+    for file_results in iter_file_results(file_list, filter_macros, macro_prefixes, jobs, cache,
+                                          skip_seen_headers, type_graph, reference_index, compile_commands,
+                                          profile, source_stats):
+        if symbol_index is not None:
+            symbol_index.add(file_results)
+        # Filtra i duplicati prima di restituire i risultati del file
+        unique_results = []
+        # Dichiarazioni di questo file ancora senza definizione: chiave -> posizione in unique_results
+        declared = {}
+        folded = 0
+        for record in file_results:
+            key = record_key(record)
             
-            if item_type in top_types and ext in top_exts:
-                key = (item_type, ext)
-                cross_data[key] = cross_data.get(key, 0) + 1
-        
-        # Fill the table
-        for i, type_name in enumerate(top_types):
-            cross_table.setItem(i, 0, QtWidgets.QTableWidgetItem(type_name))
-            for j, ext in enumerate(top_exts):
-                count = cross_data.get((type_name, ext), 0)
-                cross_table.setItem(i, j + 1, QtWidgets.QTableWidgetItem(str(count)))
-        
-        cross_table.resizeColumnsToContents()
-        cross_layout.addWidget(cross_table)
-        
-        tab_widget.addTab(cross_widget, "Type by Extension")
-        
-        # Add a close button
-        button_layout = QtWidgets.QHBoxLayout()
-        close_button = QtWidgets.QPushButton("Close")
-        close_button.clicked.connect(dialog.accept)
-        button_layout.addStretch()
-        button_layout.addWidget(close_button)
-        layout.addLayout(button_layout)
-        
-        dialog.exec_()
+            if key in processed_keys:
+                if debug:
+                    logging.debug("Skipping duplicate: %s", key)
+            elif record.get("Usr") and not record.get("IsDefinition"):
+                if key in defined or key in declared or key in pending:
+                    continue
+                if merge_declarations:
+                    pending[key] = record
+                else:
+                    declared[key] = len(unique_results)
+                    unique_results.append(record)
+            else:
+                # Se questo elemento non è già stato processato, aggiungilo ai risultati
+                processed_keys.add(key)
+                if record.get("Usr"):
+                    symbol = key[:2]
+                    defined.add(symbol)
+                    pending.pop(symbol, None)
+                    position = declared.pop(symbol, None)
+                    if position is not None:
+                        unique_results[position] = None
+                        folded += 1
+                unique_results.append(record)
+        processed_keys.update(declared)
+        if folded:
+            unique_results = [record for record in unique_results if record is not None]
+        yield unique_results
+    if pending:
+        yield list(pending.values())
+    
+    logging.info("Finished processing files.")
+    if source_stats["hits"] or source_stats["misses"]:
+        logging.info(f"Source cache: {source_stats['hits']} hits, {source_stats['misses']} misses, "
+                     f"{source_stats['evictions']} evictions")
+
+def process_files(file_list, filter_macros=True, macro_prefixes=None, jobs=1, cache=None,
+                  skip_seen_headers=False, type_graph=None, reference_index=None, symbol_index=None,
+                  compile_commands=None, profile=None, merge_declarations=False):
+    """
+    Process a list of C/C++ files, parse them with clang, and collect all C objects.
+    
+    Args:
+        file_list: List of files to process
+        filter_macros: Whether to filter out macros with certain prefixes
+        macro_prefixes: List of macro prefixes to filter out
+        jobs: Number of worker processes (1 = serial, 0 = one per CPU)
+        cache: Optional IndexCache used to skip files that did not change
+        skip_seen_headers: Do not walk again files already walked in a previous
+            translation unit (see iter_file_results)
+        type_graph: Optional TypeGraph receiving the type dependency graph of the files
+        reference_index: Optional ReferenceIndex receiving the references to symbols
+        symbol_index: Optional SymbolIndex receiving the declaration and definition sites of the symbols
+        compile_commands: Optional CompileCommands giving the clang arguments of each
+            translation unit (see iter_file_results)
+        profile: Optional IndexProfile receiving the timing and diagnostics of each parsed file
+        merge_declarations: Fold the declarations into a definition found in any later file
+            (see iter_unique_records)
+    """
+    all_results = []
+    for file_results in iter_unique_records(file_list, filter_macros, macro_prefixes, jobs, cache,
+                                            skip_seen_headers, type_graph, reference_index, symbol_index,
+                                            compile_commands, profile, merge_declarations):
+        all_results.extend(file_results)
+    return all_results
+
+class JsonlRecordWriter:
+    """Writes records as JSON lines."""
+    def __init__(self, output):
+        self.file = open(output, 'w') if output else sys.stdout
+    
+    def write(self, records):
+        self.file.writelines(json.dumps(record) + "\n" for record in records)
+        self.file.flush()
+    
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+
+class CsvRecordWriter(JsonlRecordWriter):
+    """Writes records as CSV rows (columns in RECORD_FIELDS order)."""
+    def __init__(self, output):
+        self.file = open(output, 'w', newline='') if output else sys.stdout
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(RECORD_FIELDS)
+    
+    def write(self, records):
+        self.writer.writerows(record_to_tuple(record) for record in records)
+        self.file.flush()
+
+class SqliteRecordWriter:
+    """Writes records into the `records` table of a SQLite database (replaced if it exists)."""
+    def __init__(self, output):
+        if not output:
+            raise ValueError("--format sqlite requires --output")
+        self.db = sqlite3.connect(output)
+        self.db.execute("DROP TABLE IF EXISTS records")
+        self.db.execute(f"CREATE TABLE records ({', '.join(RECORD_FIELDS)})")
+        self.insert = f"INSERT INTO records VALUES ({', '.join('?' * len(RECORD_FIELDS))})"
+    
+    def write(self, records):
+        self.db.executemany(self.insert, (record_to_tuple(record) for record in records))
+        self.db.commit()
+    
+    def close(self):
+        self.db.close()
+
+RECORD_WRITERS = {
+    "jsonl": JsonlRecordWriter,
+    "csv": CsvRecordWriter,
+    "sqlite": SqliteRecordWriter,
+}
+
+# Numero di dichiarazioni più grandi riportate dalle statistiche
+STATS_TOP_N = 20
+
+class RecordStatistics:
+    """
+    Aggregates of a set of records, computed in a single pass: the number of
+    records for each (type, directory, filename), from which all the counts
+    (by type, extension, directory, file, macro density) are derived, and a
+    bounded heap of the largest declarations.
+    Filled with add() from records (--stats), or with add_counts() and
+    add_declaration() from the columns of the window's table.
+    """
+    def __init__(self, top=STATS_TOP_N):
+        self.counts = collections.Counter()  # (type, directory, filename) -> numero di record
+        self.total = 0
+        self.top = top
+        self.largest = []  # heap di (dimensione in byte, tipo, nome, file, linea)
+    
+    def add(self, records):
+        counts = self.counts
+        for record in records:
+            item_type = record.get("Type", "")
+            full_path = record.get("File", "")
+            counts[(item_type, os.path.dirname(full_path), os.path.basename(full_path))] += 1
+            size = len(record.get("Declaration", "").encode('utf-8', 'surrogateescape'))
+            if len(self.largest) < self.top or size > self.largest[0][0]:
+                self.add_declaration(size, item_type, record.get("Name", ""), full_path, record.get("Line") or 0)
+        self.total += len(records)
+    
+    def add_counts(self, counts):
+        """Add a mapping (type, directory, filename) -> number of records."""
+        self.counts.update(counts)
+        self.total += sum(counts.values())
+    
+    def add_declaration(self, size, item_type, name, file_path, line):
+        """Offer a declaration of size bytes to the largest ones."""
+        entry = (size, item_type, name, file_path, line)
+        if len(self.largest) < self.top:
+            heapq.heappush(self.largest, entry)
+        elif size > self.largest[0][0]:
+            heapq.heapreplace(self.largest, entry)
+    
+    def _count_by(self, key):
+        result = collections.Counter()
+        for (item_type, directory, filename), count in self.counts.items():
+            result[key(item_type, directory, filename)] += count
+        return result
+    
+    @staticmethod
+    def file_extension(filename):
+        return os.path.splitext(filename)[1] if filename else "unknown"
+    
+    def type_counts(self):
+        return self._count_by(lambda item_type, directory, filename: item_type)
+    
+    def extension_counts(self):
+        return self._count_by(lambda item_type, directory, filename: self.file_extension(filename))
+    
+    def directory_counts(self):
+        counts = self._count_by(lambda item_type, directory, filename: directory)
+        counts.pop("", None)
+        return counts
+    
+    def type_by_extension(self):
+        """Return {(type, extension): count}."""
+        return self._count_by(lambda item_type, directory, filename: (item_type, self.file_extension(filename)))
+    
+    def symbols_per_file(self):
+        counts = self._count_by(lambda item_type, directory, filename: os.path.join(directory, filename))
+        counts.pop("", None)  # Macro predefinite, senza file
+        return counts
+    
+    def macro_density(self):
+        """Return {directory: (macros, records, macros / records)}, densest first."""
+        macros = collections.Counter()
+        for (item_type, directory, filename), count in self.counts.items():
+            if item_type == "MACRO_DEFINITION":
+                macros[directory] += count
+        density = {}
+        for directory, count in self.directory_counts().items():
+            density[directory] = (macros[directory], count, macros[directory] / count)
+        return dict(sorted(density.items(), key=lambda item: item[1][2], reverse=True))
+    
+    def largest_declarations(self):
+        """Return the largest declarations as (size, type, name, file, line), largest first."""
+        return sorted(self.largest, reverse=True)
+    
+    def as_dict(self):
+        """All the statistics as a JSON-serialisable dict."""
+        files = self.symbols_per_file()
+        return {
+            "total": self.total,
+            "types": dict(self.type_counts().most_common()),
+            "extensions": dict(self.extension_counts().most_common()),
+            "directories": dict(self.directory_counts().most_common()),
+            "files": len(files),
+            "symbols_per_file": dict(files.most_common()),
+            "macro_density": {directory: {"macros": macros, "records": records, "density": round(density, 4)}
+                              for directory, (macros, records, density) in self.macro_density().items()},
+            "largest_declarations": [{"size": size, "type": item_type, "name": name, "file": file_path, "line": line}
+                                     for size, item_type, name, file_path, line in self.largest_declarations()],
+        }
+    
+    def report(self):
+        """Return the statistics as plain text."""
+        total = self.total or 1
+        files = self.symbols_per_file()
+        lines = [f"Total items: {self.total}",
+                 f"Files: {len(files)} ({sum(files.values()) / max(len(files), 1):.1f} symbols per file on average)",
+                 "", "By type:"]
+        lines.extend(f"  {count:8d} {count / total * 100:5.1f}%  {item_type}"
+                     for item_type, count in self.type_counts().most_common())
+        lines.extend(["", "By file extension:"])
+        lines.extend(f"  {count:8d} {count / total * 100:5.1f}%  {ext}"
+                     for ext, count in self.extension_counts().most_common())
+        lines.extend(["", "By directory:"])
+        lines.extend(f"  {count:8d} {count / total * 100:5.1f}%  {directory}"
+                     for directory, count in self.directory_counts().most_common())
+        lines.extend(["", f"Symbols per file (top {self.top}):"])
+        lines.extend(f"  {count:8d}  {file_path}" for file_path, count in files.most_common(self.top))
+        lines.extend(["", "Macro density per directory:"])
+        lines.extend(f"  {density * 100:5.1f}%  {macros:8d} of {records:8d}  {directory}"
+                     for directory, (macros, records, density) in self.macro_density().items())
+        lines.extend(["", "Largest declarations:"])
+        lines.extend(f"  {size:8d}  {item_type} {name}  {file_path}:{line}"
+                     for size, item_type, name, file_path, line in self.largest_declarations())
+        return "\n".join(lines) + "\n"
+
+def run_statistics(file_list, args, cache=None, compile_commands=None, profile=None):
+    """
+    Headless --stats: index the files and write the statistics (RecordStatistics)
+    to args.output (stdout if not given), as text or JSON. Returns the statistics.
+    """
+    stats = RecordStatistics()
+    for file_results in iter_unique_records(file_list, args.filter_macros, args.macro_prefixes,
+                                            args.jobs, cache, args.skip_seen_headers,
+                                            compile_commands=compile_commands, profile=profile,
+                                            merge_declarations=args.merge_declarations):
+        stats.add(file_results)
+    if args.stats == "json":
+        text = json.dumps(stats.as_dict(), indent=2) + "\n"
+    else:
+        text = stats.report()
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text)
+    return stats
+
+def run_batch(file_list, args, cache=None, compile_commands=None, profile=None):
+    """
+    Headless mode: write the records to args.output (stdout if not given) in
+    args.format, as soon as each translation unit has been processed.
+    Returns the number of records written.
+    """
+    writer = RECORD_WRITERS[args.format](args.output)
+    count = 0
+    try:
+        for file_results in iter_unique_records(file_list, args.filter_macros, args.macro_prefixes,
+                                                args.jobs, cache, args.skip_seen_headers,
+                                                compile_commands=compile_commands, profile=profile,
+                                                merge_declarations=args.merge_declarations):
+            writer.write(file_results)
+            count += len(file_results)
+    finally:
+        writer.close()
+    logging.info(f"Batch mode: {count} records written")
+    return count
+
 
 def main():
-    file_list, filter_macros, macro_prefixes = parse_command_line_arguments()
+    file_list, args = parse_command_line_arguments()
+    filter_macros = args.filter_macros
+    macro_prefixes = args.macro_prefixes
     if not file_list:
         logging.error("No input files provided.")
         print("Usage: python cgrepgui.py [options] file_or_directory ...")
@@ -1767,12 +2062,45 @@ def main():
         sys.exit(1)
     
     logging.info(f"Starting file processing with macro filtering: {filter_macros}, prefixes: {macro_prefixes}")
-    records = process_files(file_list, filter_macros, macro_prefixes)
-    logging.info(f"Total records found: {len(records)}")
+    compile_commands = None
+    if args.build_path:
+        try:
+            compile_commands = CompileCommands(args.build_path)
+        except ValueError as e:
+            logging.error(f"Error: {e}")
+            sys.exit(1)
+    if args.batch or args.stats:
+        # In modalità batch i record non restano in memoria: la cache, se richiesta, tiene solo i blob compressi
+        cache = None
+        if args.cache is not None:
+            cache = IndexCache(args.cache or default_cache_path(file_list), keep_records=False)
+        profile = IndexProfile() if args.profile is not None else None
+        try:
+            if args.stats:
+                run_statistics(file_list, args, cache, compile_commands, profile)
+            else:
+                run_batch(file_list, args, cache, compile_commands, profile)
+        except (OSError, ValueError, sqlite3.Error) as e:
+            logging.error(f"Batch mode failed: {e}")
+            sys.exit(1)
+        if profile is not None:
+            profile.finish(args.profile, args.profile_format)
+        sys.exit(0)
+    
+    if args.cache is not None:
+        cache = IndexCache(args.cache or default_cache_path(file_list))
+    else:
+        cache = IndexCache()
+    
+    # L'interfaccia Qt è in un modulo separato, importato solo qui
+    sys.modules.setdefault("cgrepgui", sys.modules[__name__])
+    from cgrepgui_qt import QtWidgets, MainWindow
     
+    # La finestra compare subito: i file vengono indicizzati in background
     app = QtWidgets.QApplication(sys.argv)
-    window = MainWindow(records, file_list)
+    window = MainWindow(file_list, args, cache, compile_commands)
     window.show()
+    window.start_indexing()
     logging.info("Application started.")
     sys.exit(app.exec_())
 
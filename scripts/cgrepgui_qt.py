@@ -0,0 +1,2688 @@
+"""
+Qt user interface of cgrepgui (C Identifier Explorer).
+
+Kept apart from cgrepgui.py so that the indexer and the batch mode can run
+without importing PyQt5; cgrepgui.main() imports this module only when the
+window has to be shown.
+"""
+import os
+import subprocess
+from PyQt5 import QtWidgets, QtCore, QtGui
+import logging
+import tempfile
+import bisect
+import time
+import array
+import sys
+import collections
+import re
+import csv
+import itertools
+import importlib.util
+import heapq
+import threading
+# Parser interno di re, usato solo per il pre-filtro della ricerca (vedi required_words): se manca, scansione completa
+try:
+    from re import _parser as sre_parse  # Python >= 3.11
+except ImportError:
+    try:
+        import sre_parse
+    except ImportError:
+        sre_parse = None
+
+from cgrepgui import (BROWSER_COMMAND, IndexCache, IndexProfile, PREPROCESS_CACHE, RecordStatistics, ReferenceIndex,
+                      SymbolIndex, TypeGraph, iter_unique_records, record_to_tuple, collect_input_files,
+                      watched_directories)
+
+# Durante l'indicizzazione i record arrivano alla finestra a blocchi: al più ogni
+# STREAM_CHUNK_ROWS record o STREAM_CHUNK_SECONDS secondi
+STREAM_CHUNK_ROWS = 2000
+STREAM_CHUNK_SECONDS = 0.2
+
+class IndexWorker(QtCore.QObject):
+    """
+    Runs the indexer (iter_unique_records) in a background QThread and sends
+    the records to the window in chunks, so that the GUI stays responsive.
+    """
+    records_ready = QtCore.pyqtSignal(object)  # lista di record
+    progress = QtCore.pyqtSignal(int, int)     # file analizzati, file totali
+    finished = QtCore.pyqtSignal(bool)         # False se interrotto o fallito
+    
+    def __init__(self, file_list, args, cache, type_graph=None, reference_index=None, symbol_index=None,
+                 compile_commands=None, profile=None):
+        super(IndexWorker, self).__init__()
+        self.file_list = file_list
+        self.args = args
+        self.cache = cache
+        self.type_graph = type_graph
+        self.reference_index = reference_index
+        self.symbol_index = symbol_index
+        self.compile_commands = compile_commands
+        self.profile = profile
+    
+    def run(self):
+        args = self.args
+        thread = QtCore.QThread.currentThread()
+        total = len(self.file_list)
+        chunk = []
+        last_emit = time.monotonic()
+        completed = False
+        try:
+            results = iter_unique_records(self.file_list, args.filter_macros, args.macro_prefixes, args.jobs,
+                                          self.cache, args.skip_seen_headers, self.type_graph,
+                                          self.reference_index, self.symbol_index, self.compile_commands,
+                                          self.profile, args.merge_declarations)
+            for done, file_results in enumerate(results, 1):
+                chunk.extend(file_results)
+                if len(chunk) >= STREAM_CHUNK_ROWS or time.monotonic() - last_emit >= STREAM_CHUNK_SECONDS:
+                    self.records_ready.emit(chunk)
+                    chunk = []
+                    last_emit = time.monotonic()
+                # (con merge_declarations l'ultimo blocco non corrisponde a un file)
+                self.progress.emit(min(done, total), total)
+                if thread.isInterruptionRequested():
+                    logging.info("Indexing interrupted.")
+                    results.close()
+                    break
+            else:
+                completed = True
+        except Exception as e:
+            logging.error(f"Error while indexing files: {e}")
+        if chunk:
+            self.records_ready.emit(chunk)
+        self.finished.emit(completed)
+
+class TaskWorker(QtCore.QObject):
+    """Runs a function in a background QThread (see MainWindow.run_in_background) and emits its result."""
+    done = QtCore.pyqtSignal(object)
+    
+    def __init__(self, function):
+        super(TaskWorker, self).__init__()
+        self.function = function
+    
+    def run(self):
+        try:
+            result = self.function()
+        except Exception as e:
+            logging.error(f"Error in background task: {e}")
+            result = None
+        self.done.emit(result)
+
+# L'export delle definizioni scrive su disco a blocchi di EXPORT_CHUNK_ROWS
+# definizioni e aggiorna la barra di avanzamento al più ogni STREAM_CHUNK_SECONDS
+EXPORT_CHUNK_ROWS = 5000
+EXPORT_BUFFER_BYTES = 1 << 20
+EXPORT_TYPE_KINDS = ("STRUCT_DECL", "TYPEDEF_DECL", "ENUM_DECL", "UNION_DECL")
+EXPORT_TARGET_TYPES = EXPORT_TYPE_KINDS + ("MACRO_DEFINITION", "VAR_DECL", "FUNCTION_DECL")
+# Header di sistema inclusi nell'export ordinato per dipendenze (tipi non indicizzati come uint32_t)
+EXPORT_HEADER_INCLUDES = ["stddef.h", "stdint.h", "stdbool.h"]
+
+# Dichiarazione generata quando il campo Declaration è vuoto
+EXPORT_FALLBACK_DECLARATIONS = {
+    "STRUCT_DECL": "struct {0} {{ /* Definition not available */ }};",
+    "TYPEDEF_DECL": "typedef void {0}; /* Actual type not available */",
+    "ENUM_DECL": "enum {0} {{ /* Enum values not available */ }};",
+    "UNION_DECL": "union {0} {{ /* Union fields not available */ }};",
+    "MACRO_DEFINITION": "#define {0} /* Macro value not available */",
+    "VAR_DECL": "extern int {0}; /* Actual type not available */",
+    "FUNCTION_DECL": "extern void {0}(void); /* Function signature not available */",
+}
+
+class DefinitionExporter(QtCore.QObject):
+    """
+    Writes the definitions of the rows of a RecordSnapshot to a file, in a
+    background QThread (see MainWindow.export_all_definitions). The text is
+    written in chunks through a buffered file, never joined in memory; the
+    file is written as file_name + ".part" and renamed at the end, so an
+    interrupted export leaves nothing behind.
+    With dependency_order the types come from the type graph, each after the
+    types it uses, and macros, variables and functions are written so that the
+    header compiles: "#define" macros, extern variables, function prototypes.
+    """
+    progress = QtCore.pyqtSignal(int, int)  # righe elaborate, righe totali
+    finished = QtCore.pyqtSignal(int, str)  # definizioni scritte (-1 se interrotto), errore
+    
+    def __init__(self, snapshot, rows, file_name, exclude_duplicating_objects, exclude_unnamed,
+                 type_graph=None, dependency_order=False):
+        super(DefinitionExporter, self).__init__()
+        self.snapshot = snapshot
+        self.rows = rows
+        self.file_name = file_name
+        self.exclude_duplicating_objects = exclude_duplicating_objects
+        self.exclude_unnamed = exclude_unnamed
+        self.type_graph = type_graph
+        self.dependency_order = dependency_order and type_graph is not None
+    
+    def select_rows(self, thread):
+        """
+        Return the rows to export, one per (type, name), in the order of
+        self.rows and grouped as {type: [row, ...]}, or None if interrupted.
+        """
+        snapshot = self.snapshot
+        type_names = snapshot.types.values
+        type_ids = snapshot.type_ids
+        names = snapshot.names
+        typedef_id = snapshot.types.ids.get("TYPEDEF_DECL")
+        # Nomi definiti tramite typedef (preferiti alle struct/enum/union omonime)
+        typedef_names = set()
+        if self.exclude_duplicating_objects and typedef_id is not None:
+            typedef_names = {names[row] for row in self.rows if type_ids[row] == typedef_id}
+        
+        order = []
+        selected = {item_type: [] for item_type in EXPORT_TARGET_TYPES}
+        processed_items = set()
+        total = len(self.rows)
+        last_emit = time.monotonic()
+        for i, row in enumerate(self.rows):
+            if i % EXPORT_CHUNK_ROWS == 0:
+                if thread.isInterruptionRequested():
+                    return None
+                if time.monotonic() - last_emit >= STREAM_CHUNK_SECONDS:
+                    self.progress.emit(i, total)
+                    last_emit = time.monotonic()
+            item_type = type_names[type_ids[row]]
+            item_name = names[row]
+            # Skip if not a target type, without a name or already processed
+            if item_type not in selected or not item_name or (item_type, item_name) in processed_items:
+                continue
+            # Skip unnamed elements if requested
+            if self.exclude_unnamed and not snapshot.named[row]:
+                continue
+            # Struct/enum/union con un typedef omonimo (se richiesto)
+            if item_type in EXPORT_TYPE_KINDS and item_type != "TYPEDEF_DECL" and item_name in typedef_names:
+                continue
+            processed_items.add((item_type, item_name))
+            order.append(row)
+            selected[item_type].append(row)
+        return order, selected
+    
+    def definition(self, row):
+        """Return the (info comment, declaration) of a row."""
+        snapshot = self.snapshot
+        item_type = snapshot.value(row, COL_TYPE)
+        item_name = snapshot.names[row]
+        info = f"/* From file: {snapshot.file_path(row)}:{snapshot.lines[row]} Type:{item_type} */"
+        declaration = snapshot.value(row, COL_DECLARATION).strip()
+        if not declaration:
+            return info, EXPORT_FALLBACK_DECLARATIONS[item_type].format(item_name)
+        if item_type == "FUNCTION_DECL":
+            if self.dependency_order and "{" in declaration:
+                # Solo il prototipo: il corpo della funzione non va nell'header
+                declaration = declaration.split("{", 1)[0].strip()
+            if not declaration.endswith(';'):
+                declaration += ';'
+        elif self.dependency_order:
+            if item_type == "MACRO_DEFINITION":
+                declaration = "#define " + declaration
+            elif item_type == "VAR_DECL" and not declaration.startswith(("extern ", "static ")):
+                declaration = "extern " + declaration.split("=", 1)[0].strip().rstrip(';').strip() + ";"
+        return info, declaration
+    
+    def iter_definitions(self, order, selected):
+        """Yield (info, declaration) for the selected rows, in output order."""
+        if not self.dependency_order:
+            for row in order:
+                yield self.definition(row)
+            return
+        
+        for row in selected["MACRO_DEFINITION"]:
+            yield self.definition(row)
+        # Tipi del grafo in ordine di dipendenza, poi quelli che non vi compaiono
+        type_graph = self.type_graph
+        type_keys = {row: type_graph.key(item_type, self.snapshot.names[row], self.snapshot.file_path(row))
+                     for item_type in EXPORT_TYPE_KINDS for row in selected[item_type]}
+        for node in type_graph.ordered([key for key in type_keys.values() if key is not None]):
+            yield f"/* From file: {node.file} Type:{node.kind} */", type_graph.definition_text(node)
+        for item_type in EXPORT_TYPE_KINDS:
+            for row in selected[item_type]:
+                if type_keys[row] is None:
+                    yield self.definition(row)
+        for item_type in ("VAR_DECL", "FUNCTION_DECL"):
+            for row in selected[item_type]:
+                yield self.definition(row)
+    
+    def run(self):
+        thread = QtCore.QThread.currentThread()
+        part_name = self.file_name + ".part"
+        written = -1
+        error = ""
+        try:
+            selection = self.select_rows(thread)
+            if selection is not None:
+                written = self.write(part_name, *selection, thread)
+            if written > 0:
+                os.replace(part_name, self.file_name)
+            else:
+                if written < 0:
+                    logging.info("Export of the definitions interrupted.")
+                if os.path.exists(part_name):
+                    os.remove(part_name)
+        except Exception as e:
+            error = str(e)
+            if os.path.exists(part_name):
+                os.remove(part_name)
+        self.finished.emit(written, error)
+    
+    def write(self, part_name, order, selected, thread):
+        """Write the header to part_name; return the number of definitions, or -1 if interrupted."""
+        total = len(order)
+        written = 0
+        # Create a header guard based on the file name
+        header_guard = os.path.basename(self.file_name).replace(".", "_").upper()
+        with open(part_name, 'w', buffering=EXPORT_BUFFER_BYTES) as f:
+            f.write(f"#ifndef {header_guard}\n"
+                    f"#define {header_guard}\n\n"
+                    "/* Automatically generated by C Identifier Explorer */\n"
+                    "/* Contains all struct, typedef, enum, union, macro, variable and function definitions */\n\n")
+            if self.dependency_order:
+                f.write("".join(f"#include <{header}>\n" for header in EXPORT_HEADER_INCLUDES) + "\n")
+            chunk = []
+            last_emit = time.monotonic()
+            for info, declaration in self.iter_definitions(order, selected):
+                chunk.append(f"{info}\n\n{declaration}\n\n")
+                written += 1
+                if len(chunk) >= EXPORT_CHUNK_ROWS:
+                    f.write("".join(chunk))
+                    chunk = []
+                    if thread.isInterruptionRequested():
+                        return -1
+                    if time.monotonic() - last_emit >= STREAM_CHUNK_SECONDS:
+                        # Con dependency_order i tipi aggiunti come dipendenze superano total
+                        self.progress.emit(min(written, total), total)
+                        last_emit = time.monotonic()
+            f.write("".join(chunk))
+            f.write(f"#endif /* {header_guard} */\n")
+        return written
+
+# L'export della tabella scrive (e aggiorna la barra di avanzamento) a blocchi di TABLE_EXPORT_BATCH_ROWS righe
+TABLE_EXPORT_BATCH_ROWS = 20000
+# Formati dell'export della tabella: filtro del dialogo di salvataggio -> formato
+TABLE_EXPORT_FORMATS = {
+    "CSV Files (*.csv)": "csv",
+    "Text Files (*.txt)": "csv",
+    "Parquet Files (*.parquet)": "parquet",
+    "All Files (*)": "csv",
+}
+
+class TableExporter(QtCore.QObject):
+    """
+    Writes rows of a RecordSnapshot as CSV, or as Parquet with the optional
+    pyarrow module, in a background QThread (see MainWindow.export_to_csv).
+    Each batch of TABLE_EXPORT_BATCH_ROWS rows is built column by column and
+    written at once (csv.writer.writerows or a Parquet row group); like
+    DefinitionExporter it writes file_name + ".part" and renames it at the end.
+    """
+    progress = QtCore.pyqtSignal(int, int)  # righe scritte, righe totali
+    finished = QtCore.pyqtSignal(int, str)  # righe scritte (-1 se interrotto), errore
+    
+    def __init__(self, snapshot, rows, file_name, export_format="csv"):
+        super(TableExporter, self).__init__()
+        self.snapshot = snapshot
+        self.rows = rows
+        self.file_name = file_name
+        self.export_format = export_format
+    
+    def batch_columns(self, batch):
+        """Return the values of the rows in batch as one list per column (TABLE_COLUMNS)."""
+        snapshot = self.snapshot
+        types = snapshot.types.values
+        type_ids = snapshot.type_ids
+        directories = snapshot.directories.values
+        directory_ids = snapshot.directory_ids
+        filenames = snapshot.filenames.values
+        filename_ids = snapshot.filename_ids
+        names = snapshot.names
+        named = snapshot.named
+        lines = snapshot.lines
+        columns = snapshot.columns
+        details = snapshot.details
+        offsets = snapshot.declaration_offsets
+        lengths = snapshot.declaration_lengths
+        return [
+            [types[type_ids[row]] for row in batch],
+            [names[row] for row in batch],
+            [bool(named[row]) for row in batch],
+            [directories[directory_ids[row]] for row in batch],
+            [filenames[filename_ids[row]] for row in batch],
+            [lines[row] for row in batch],
+            [columns[row] for row in batch],
+            [details[row] for row in batch],
+            snapshot.declarations.get_many([offsets[row] for row in batch], [lengths[row] for row in batch]),
+        ]
+    
+    def iter_batches(self, thread):
+        """Yield the column lists of each batch, emitting the progress; stop if interrupted."""
+        total = len(self.rows)
+        for start in range(0, total, TABLE_EXPORT_BATCH_ROWS):
+            if thread.isInterruptionRequested():
+                return
+            yield self.batch_columns(self.rows[start:start + TABLE_EXPORT_BATCH_ROWS])
+            self.progress.emit(min(start + TABLE_EXPORT_BATCH_ROWS, total), total)
+    
+    def write_csv(self, part_name, thread):
+        written = 0
+        with open(part_name, 'w', newline='', buffering=EXPORT_BUFFER_BYTES) as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(TABLE_COLUMNS)
+            for columns in self.iter_batches(thread):
+                # Per la colonna "Named" (booleana), converti in "Yes"/"No"
+                columns[COL_NAMED] = ["Yes" if value else "No" for value in columns[COL_NAMED]]
+                writer.writerows(zip(*columns))
+                written += len(columns[0])
+        return written
+    
+    def write_parquet(self, part_name, thread):
+        import pyarrow
+        import pyarrow.parquet
+        schema = pyarrow.schema([(name, pyarrow.bool_() if column == COL_NAMED else
+                                  pyarrow.uint32() if column in (COL_LINE, COL_COLUMN) else pyarrow.string())
+                                 for column, name in enumerate(TABLE_COLUMNS)])
+        written = 0
+        with pyarrow.parquet.ParquetWriter(part_name, schema) as writer:
+            for columns in self.iter_batches(thread):
+                writer.write_table(pyarrow.Table.from_arrays(
+                    [pyarrow.array(values, type=field.type) for values, field in zip(columns, schema)],
+                    schema=schema))
+                written += len(columns[0])
+        return written
+    
+    def run(self):
+        thread = QtCore.QThread.currentThread()
+        part_name = self.file_name + ".part"
+        written = -1
+        error = ""
+        try:
+            if self.export_format == "parquet":
+                written = self.write_parquet(part_name, thread)
+            else:
+                written = self.write_csv(part_name, thread)
+            if thread.isInterruptionRequested():
+                logging.info("Export of the table interrupted.")
+                written = -1
+                os.remove(part_name)
+            else:
+                os.replace(part_name, self.file_name)
+        except Exception as e:
+            error = str(e)
+            if os.path.exists(part_name):
+                os.remove(part_name)
+        self.finished.emit(written, error)
+
+# Colonne della tabella (RecordTableModel)
+TABLE_COLUMNS = ["Type", "Name", "Named", "Directory", "Filename", "Line", "Column", "Details", "Declaration"]
+COL_TYPE, COL_NAME, COL_NAMED, COL_DIRECTORY, COL_FILENAME, COL_LINE, COL_COLUMN, COL_DETAILS, COL_DECLARATION = \
+    range(len(TABLE_COLUMNS))
+
+class StringPool:
+    """Interned strings of a column: each distinct value is stored once and referenced by its id."""
+    def __init__(self):
+        self.values = []
+        self.ids = {}
+    
+    def id(self, value):
+        value_id = self.ids.get(value)
+        if value_id is None:
+            value_id = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return value_id
+
+# Caratteri iniziali delle dichiarazioni tenuti in memoria per ordinare la colonna Declaration
+DECLARATION_SORT_PREFIX_CHARS = 32
+
+class DeclarationStore:
+    """
+    Declaration texts kept in an anonymous temporary file instead of memory:
+    the table only needs the declarations of the visible rows, read on demand.
+    The GUI thread appends while exporters and searches read from background
+    threads: writes and the flush of the write buffer hold a lock, so a text
+    is on disk before anyone can read its offset.
+    """
+    def __init__(self):
+        self.file = tempfile.TemporaryFile()
+        self.size = 0
+        self.dirty = False
+        self.lock = threading.Lock()
+    
+    def append(self, text):
+        """Store text and return its (offset, length) in the file."""
+        if not text:
+            return 0, 0
+        data = text.encode('utf-8', 'surrogateescape')
+        with self.lock:
+            offset = self.size
+            # Si scrive sempre in coda (pread non sposta la posizione del file)
+            self.file.write(data)
+            self.size += len(data)
+            self.dirty = True
+        return offset, len(data)
+    
+    def flush(self):
+        with self.lock:
+            if self.dirty:
+                self.file.flush()
+                self.dirty = False
+    
+    def get(self, offset, length):
+        if not length:
+            return ""
+        self.flush()
+        return os.pread(self.file.fileno(), length, offset).decode('utf-8', 'surrogateescape')
+    
+    def get_many(self, offsets, lengths):
+        """
+        Return the texts of many (offset, length) pairs. Consecutive rows are
+        usually stored next to each other, so the whole span is read with a
+        single pread when it is not much larger than the texts themselves.
+        """
+        spans = [(offset, length) for offset, length in zip(offsets, lengths) if length]
+        if not spans:
+            return [""] * len(offsets)
+        self.flush()
+        first = min(offset for offset, length in spans)
+        last = max(offset + length for offset, length in spans)
+        if last - first > 2 * sum(length for offset, length in spans) + (1 << 20):
+            return [self.get(offset, length) for offset, length in zip(offsets, lengths)]
+        data = os.pread(self.file.fileno(), last - first, first)
+        return [data[offset - first:offset - first + length].decode('utf-8', 'surrogateescape') if length else ""
+                for offset, length in zip(offsets, lengths)]
+
+class RecordTableModel(QtCore.QAbstractTableModel):
+    """
+    Read-only table model of the records, stored by column: ids of interned
+    strings for Type, Directory and Filename, integer arrays for Line and Column
+    and offsets into a DeclarationStore for Declaration. The other parts of the
+    window read the values with value(row, column), without QModelIndex.
+    """
+    def __init__(self, parent=None):
+        super(RecordTableModel, self).__init__(parent)
+        self.types = StringPool()
+        self.directories = StringPool()
+        self.filenames = StringPool()
+        self.type_ids = array.array('I')
+        self.directory_ids = array.array('I')
+        self.filename_ids = array.array('I')
+        self.names = []
+        self.named = bytearray()
+        self.lines = array.array('I')
+        self.columns = array.array('I')
+        self.details = []
+        self.usrs = []
+        self.declarations = DeclarationStore()
+        self.declaration_offsets = array.array('Q')
+        self.declaration_lengths = array.array('I')
+        # Hash del record di ogni riga, usato da MainWindow.apply_reload per trovare le righe cambiate
+        self.digests = array.array('q')
+        # Numero di rimozioni fatte (gli indici di FilterIndex vanno ricostruiti)
+        self.removals = 0
+    
+    @staticmethod
+    def is_named(name, is_anonymous):
+        """
+        Un elemento ha un nome esplicito se:
+        1. Non è anonimo (ha un nome)
+        2. Il nome non inizia con underscore singolo o doppio
+        3. Il nome non contiene "unnamed at" (per le strutture anonime)
+        """
+        return bool(name and
+                    not name.startswith("_") and
+                    not is_anonymous and
+                    "unnamed at" not in name)
+    
+    @staticmethod
+    def record_digest(rec):
+        return hash(record_to_tuple(rec))
+    
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.names)
+    
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(TABLE_COLUMNS)
+    
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if role != QtCore.Qt.DisplayRole:
+            return None
+        if orientation == QtCore.Qt.Horizontal:
+            return TABLE_COLUMNS[section]
+        return section + 1
+    
+    def flags(self, index):
+        return QtCore.Qt.ItemIsSelectable | QtCore.Qt.ItemIsEnabled
+    
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if role != QtCore.Qt.DisplayRole or not index.isValid():
+            return None
+        return self.value(index.row(), index.column())
+    
+    def value(self, row, column):
+        """Value of a cell: str, or bool for Named and int for Line and Column."""
+        if column == COL_TYPE:
+            return self.types.values[self.type_ids[row]]
+        if column == COL_NAME:
+            return self.names[row]
+        if column == COL_NAMED:
+            return bool(self.named[row])
+        if column == COL_DIRECTORY:
+            return self.directories.values[self.directory_ids[row]]
+        if column == COL_FILENAME:
+            return self.filenames.values[self.filename_ids[row]]
+        if column == COL_LINE:
+            return self.lines[row]
+        if column == COL_COLUMN:
+            return self.columns[row]
+        if column == COL_DETAILS:
+            return self.details[row]
+        return self.declarations.get(self.declaration_offsets[row], self.declaration_lengths[row])
+    
+    def file_path(self, row):
+        return os.path.join(self.directories.values[self.directory_ids[row]],
+                            self.filenames.values[self.filename_ids[row]])
+    
+    def append_records(self, records):
+        """Append the records as new rows at the end of the table."""
+        if not records:
+            return
+        first = len(self.names)
+        self.beginInsertRows(QtCore.QModelIndex(), first, first + len(records) - 1)
+        for rec in records:
+            name = str(rec.get("Name", ""))
+            full_path = rec.get("File", "")
+            self.type_ids.append(self.types.id(str(rec.get("Type", ""))))
+            self.names.append(sys.intern(name))
+            self.named.append(self.is_named(name, rec.get("IsAnonymous", False)))
+            self.directory_ids.append(self.directories.id(os.path.dirname(full_path)))
+            self.filename_ids.append(self.filenames.id(os.path.basename(full_path)))
+            self.lines.append(rec.get("Line") or 0)
+            self.columns.append(rec.get("Column") or 0)
+            self.details.append(sys.intern(str(rec.get("Details", ""))))
+            self.usrs.append(sys.intern(rec.get("Usr", "")))
+            offset, length = self.declarations.append(str(rec.get("Declaration", "")))
+            self.declaration_offsets.append(offset)
+            self.declaration_lengths.append(length)
+            self.digests.append(self.record_digest(rec))
+        self.endInsertRows()
+    
+    def rows_changed(self, first, last):
+        """Emit dataChanged for rows first..last (a filter proxy checks them again)."""
+        self.dataChanged.emit(self.index(first, 0), self.index(last, len(TABLE_COLUMNS) - 1))
+    
+    def statistics(self):
+        """
+        Return the RecordStatistics of the table: the counts are taken in one
+        pass over the id columns (Counter of (type, directory, filename) ids),
+        the largest declarations from the declaration lengths.
+        """
+        stats = RecordStatistics()
+        types, directories, filenames = self.types.values, self.directories.values, self.filenames.values
+        stats.add_counts({(types[type_id], directories[directory_id], filenames[filename_id]): count
+                          for (type_id, directory_id, filename_id), count
+                          in collections.Counter(zip(self.type_ids, self.directory_ids, self.filename_ids)).items()})
+        for row in heapq.nlargest(stats.top, range(len(self.names)), key=self.declaration_lengths.__getitem__):
+            stats.add_declaration(self.declaration_lengths[row], self.value(row, COL_TYPE), self.names[row],
+                                  self.file_path(row), self.lines[row])
+        return stats
+    
+    def declaration_ranks(self):
+        """
+        Return the position of every row in the order of the declaration texts
+        (array of row count entries), so that sorting the Declaration column does
+        not read the store for every comparison. The texts are read in batches
+        of TEXT_SEARCH_BATCH_ROWS and only their first characters are kept; the
+        rows whose truncated prefixes are equal are ordered by their full texts.
+        """
+        rows = len(self.names)
+        size = DECLARATION_SORT_PREFIX_CHARS + 1
+        prefixes = []
+        for first in range(0, rows, TEXT_SEARCH_BATCH_ROWS):
+            last = first + TEXT_SEARCH_BATCH_ROWS
+            prefixes.extend(text[:size] for text in self.declarations.get_many(self.declaration_offsets[first:last],
+                                                                               self.declaration_lengths[first:last]))
+        order = sorted(range(rows), key=prefixes.__getitem__)
+        first = 0
+        while first < rows:
+            prefix = prefixes[order[first]]
+            last = first + 1
+            while last < rows and prefixes[order[last]] == prefix:
+                last += 1
+            if last - first > 1 and len(prefix) == size:
+                # Prefissi troncati uguali: decide il testo completo
+                group = order[first:last]
+                texts = self.declarations.get_many([self.declaration_offsets[row] for row in group],
+                                                   [self.declaration_lengths[row] for row in group])
+                order[first:last] = [row for text, row in sorted(zip(texts, group))]
+            first = last
+        ranks = array.array('I', bytes(4 * rows))
+        for position, row in enumerate(order):
+            ranks[row] = position
+        return ranks
+    
+    def compact_declarations(self):
+        """
+        Move the declarations of the current rows to a new DeclarationStore when
+        the removed rows take more space than them (the store is append-only).
+        Snapshots keep reading the old store, which is closed once released.
+        """
+        live = sum(self.declaration_lengths)
+        if self.declarations.size - live <= live + (1 << 20):
+            return
+        store = DeclarationStore()
+        offsets = array.array('Q')
+        lengths = array.array('I')
+        for first in range(0, len(self.names), TEXT_SEARCH_BATCH_ROWS):
+            last = first + TEXT_SEARCH_BATCH_ROWS
+            for text in self.declarations.get_many(self.declaration_offsets[first:last],
+                                                   self.declaration_lengths[first:last]):
+                offset, length = store.append(text)
+                offsets.append(offset)
+                lengths.append(length)
+        logging.info(f"Declaration store compacted: {self.declarations.size} -> {store.size} bytes")
+        self.declarations = store
+        self.declaration_offsets = offsets
+        self.declaration_lengths = lengths
+    
+    def remove_rows(self, first, count):
+        """Remove count rows starting at first."""
+        self.beginRemoveRows(QtCore.QModelIndex(), first, first + count - 1)
+        last = first + count
+        for column in (self.type_ids, self.names, self.named, self.directory_ids, self.filename_ids,
+                       self.lines, self.columns, self.details, self.usrs, self.declaration_offsets,
+                       self.declaration_lengths, self.digests):
+            del column[first:last]
+        self.removals += 1
+        self.endRemoveRows()
+
+class RecordSnapshot:
+    """
+    Copy of the columns of a RecordTableModel (O(rows) at C speed), read by the
+    background exporters while the table keeps changing. The string pools and
+    the declaration store are only appended to, so they are shared.
+    """
+    def __init__(self, model):
+        self.types = model.types
+        self.directories = model.directories
+        self.filenames = model.filenames
+        self.type_ids = array.array('I', model.type_ids)
+        self.directory_ids = array.array('I', model.directory_ids)
+        self.filename_ids = array.array('I', model.filename_ids)
+        self.names = list(model.names)
+        self.named = bytes(model.named)
+        self.lines = array.array('I', model.lines)
+        self.columns = array.array('I', model.columns)
+        self.details = list(model.details)
+        self.declarations = model.declarations
+        self.declaration_offsets = array.array('Q', model.declaration_offsets)
+        self.declaration_lengths = array.array('I', model.declaration_lengths)
+    
+    def rowCount(self):
+        return len(self.names)
+    
+    value = RecordTableModel.value
+    file_path = RecordTableModel.file_path
+
+# Caratteri che rendono il testo di ricerca una regular expression (modalità "*")
+REGEX_METACHARACTERS = frozenset(".^$*+?{}[]\\|()")
+# Attesa dopo l'ultimo tasto premuto prima di applicare il filtro sul nome
+SEARCH_DEBOUNCE_MS = 150
+
+def make_name_matcher(text, mode):
+    """
+    Return a function name -> bool for the search text and mode, or None if
+    text is empty: "*" contains (case-insensitive, a regular expression if
+    text has metacharacters), "^" starts with, "$" ends with (case-sensitive).
+    """
+    if not text:
+        return None
+    if mode == "^":
+        return lambda name: name.startswith(text)
+    if mode == "$":
+        return lambda name: name.endswith(text)
+    if REGEX_METACHARACTERS.isdisjoint(text):
+        lower_text = text.lower()
+        return lambda name: lower_text in name.lower()
+    try:
+        search = re.compile(text, re.IGNORECASE).search
+    except re.error:
+        # Come QRegExp: un'espressione non valida non trova nulla
+        return lambda name: False
+    return lambda name: search(name) is not None
+
+def contiguous_ranges(rows):
+    """Return the (first, last) ranges of consecutive values in the sorted rows."""
+    ranges = []
+    for row in rows:
+        if ranges and ranges[-1][1] == row - 1:
+            ranges[-1][1] = row
+        else:
+            ranges.append([row, row])
+    return ranges
+
+def rows_to_bitset(rows, row_count):
+    """Return a bitset (int, bit i = row i) of the given rows."""
+    bits = bytearray((row_count + 7) // 8)
+    for row in rows:
+        bits[row >> 3] |= 1 << (row & 7)
+    return int.from_bytes(bits, 'little')
+
+class FilterIndex:
+    """
+    Indexes of a RecordTableModel used by CustomFilterProxy: the rows of each
+    Type, Directory, Filename and Named value, and a trigram index of the
+    distinct names (plus sorted name lists for the "^" and "$" modes).
+    The indexes follow the appended rows incrementally and are rebuilt after
+    rows are removed. visible() returns the filtered rows as a bitset.
+    """
+    def __init__(self, model):
+        self.model = model
+        self.reset()
+    
+    def reset(self):
+        self.indexed_rows = 0
+        self.removals = self.model.removals
+        self.type_rows = collections.defaultdict(lambda: array.array('I'))
+        self.directory_rows = collections.defaultdict(lambda: array.array('I'))
+        self.filename_rows = collections.defaultdict(lambda: array.array('I'))
+        self.named_rows = (array.array('I'), array.array('I'))
+        # Nomi distinti: id -> nome, righe che lo usano, trigrammi (minuscoli) -> id dei nomi
+        self.name_ids = {}
+        self.names = []
+        self.lower_names = []
+        self.name_rows = []
+        self.trigrams = collections.defaultdict(lambda: array.array('I'))
+        self.sorted_names = None
+        self.sorted_reversed_names = None
+        self.bitsets = {}
+    
+    def sync(self):
+        """Bring the indexes up to date with the model."""
+        model = self.model
+        if self.removals != model.removals:
+            self.reset()
+        row_count = model.rowCount()
+        if self.indexed_rows == row_count:
+            return
+        for row in range(self.indexed_rows, row_count):
+            self.type_rows[model.type_ids[row]].append(row)
+            self.directory_rows[model.directory_ids[row]].append(row)
+            self.filename_rows[model.filename_ids[row]].append(row)
+            self.named_rows[model.named[row]].append(row)
+            name = model.names[row]
+            name_id = self.name_ids.get(name)
+            if name_id is None:
+                name_id = self.name_ids[name] = len(self.names)
+                self.names.append(name)
+                lower_name = name.lower()
+                self.lower_names.append(lower_name)
+                self.name_rows.append(array.array('I'))
+                for trigram in {lower_name[i:i + 3] for i in range(len(lower_name) - 2)}:
+                    self.trigrams[trigram].append(name_id)
+                self.sorted_names = self.sorted_reversed_names = None
+            self.name_rows[name_id].append(row)
+        self.indexed_rows = row_count
+        self.bitsets = {}
+    
+    def _bitset(self, key, rows):
+        bitset = self.bitsets.get(key)
+        if bitset is None:
+            bitset = self.bitsets[key] = rows_to_bitset(rows, self.indexed_rows)
+        return bitset
+    
+    def _matching_name_ids(self, text, mode):
+        """Ids of the distinct names matching text in the given search mode."""
+        if mode == "^" or mode == "$":
+            if mode == "^":
+                if self.sorted_names is None:
+                    self.sorted_names = sorted((name, name_id) for name_id, name in enumerate(self.names))
+                entries, key = self.sorted_names, text
+            else:
+                if self.sorted_reversed_names is None:
+                    self.sorted_reversed_names = sorted((name[::-1], name_id) for name_id, name in enumerate(self.names))
+                entries, key = self.sorted_reversed_names, text[::-1]
+            result = []
+            for position in range(bisect.bisect_left(entries, (key,)), len(entries)):
+                name, name_id = entries[position]
+                if not name.startswith(key):
+                    break
+                result.append(name_id)
+            return result
+        
+        matcher = make_name_matcher(text, mode)
+        lower_text = text.lower()
+        if REGEX_METACHARACTERS.isdisjoint(text) and len(lower_text) >= 3:
+            # Candidati: i nomi che contengono tutti i trigrammi del testo
+            postings = sorted((self.trigrams.get(lower_text[i:i + 3], ()) for i in range(len(lower_text) - 2)),
+                              key=len)
+            candidates = set(postings[0])
+            for posting in postings[1:]:
+                if not candidates:
+                    break
+                candidates.intersection_update(posting)
+            return [name_id for name_id in candidates if lower_text in self.lower_names[name_id]]
+        return [name_id for name_id, name in enumerate(self.names) if matcher(name)]
+    
+    def visible(self, search_type, search_directory, search_file, search_named, text, mode):
+        """
+        Return the bitset of the rows accepted by the filters ("*" = any value),
+        or None if no filter is active.
+        """
+        self.sync()
+        model = self.model
+        selected = []
+        if search_type != "*":
+            value_id = model.types.ids.get(search_type)
+            selected.append(self._bitset(('type', value_id), self.type_rows.get(value_id, ())))
+        if search_directory != "*":
+            value_id = model.directories.ids.get(search_directory)
+            selected.append(self._bitset(('directory', value_id), self.directory_rows.get(value_id, ())))
+        if search_file != "*":
+            value_id = model.filenames.ids.get(search_file)
+            selected.append(self._bitset(('filename', value_id), self.filename_rows.get(value_id, ())))
+        if search_named != "*":
+            named = search_named == "Yes"
+            selected.append(self._bitset(('named', named), self.named_rows[named]))
+        if text:
+            key = ('name', text, mode)
+            bitset = self.bitsets.get(key)
+            if bitset is None:
+                rows = array.array('I')
+                for name_id in self._matching_name_ids(text, mode):
+                    rows.extend(self.name_rows[name_id])
+                bitset = self.bitsets[key] = rows_to_bitset(rows, self.indexed_rows)
+            selected.append(bitset)
+        if not selected:
+            return None
+        result = selected[0]
+        for bitset in selected[1:]:
+            if not result:
+                break
+            result &= bitset
+        return result
+
+# Modalità di ricerca full-text: il testo è una regular expression cercata in Details e Declaration
+FULL_TEXT_MODE = "{}"
+# Parole indicizzate da TextIndex (e frammenti di parola richiesti da una query, vedi required_words)
+TEXT_TOKEN_PATTERN = re.compile(r"\w+")
+# Righe lette dal DeclarationStore per volta dalla costruzione dell'indice e dalla ricerca full-text
+TEXT_SEARCH_BATCH_ROWS = 5000
+# I risultati della ricerca full-text arrivano dopo STREAM_CHUNK_SECONDS, poi a intervalli
+# che raddoppiano fino a TEXT_SEARCH_MAX_INTERVAL secondi: ogni invio costa un aggiornamento della vista
+TEXT_SEARCH_MAX_INTERVAL = 2.0
+# Oltre questo numero di blocchi di righe contigue la vista viene rifiltrata tutta in una volta
+TEXT_SEARCH_MAX_RANGES = 64
+
+def make_text_matcher(text):
+    """
+    Return a function text -> bool for a full-text query (a case-insensitive
+    regular expression), or None if text is empty.
+    """
+    if not text:
+        return None
+    try:
+        search = re.compile(text, re.IGNORECASE).search
+    except re.error:
+        # Come per la ricerca sul nome: un'espressione non valida non trova nulla
+        return lambda value: False
+    return lambda value: search(value) is not None
+
+def required_words(text):
+    """
+    Return the word fragments (lowercase) that every match of the regular
+    expression text contains: the runs of word characters of its literal
+    parts that must always match (not inside alternatives or optional
+    repetitions). Each of them is part of a word of the matching text, which
+    is what TextIndex.candidates looks up.
+    
+    The expression is read with the private parser of the re module: if it is
+    not available, or its format is not the expected one, no words are
+    returned and every row is a candidate (full scan).
+    """
+    if sre_parse is None:
+        return []
+    try:
+        parsed = sre_parse.parse(text)
+    except re.error:
+        return []
+    runs = []
+    
+    def walk(items):
+        run = []
+        for op, av in items:
+            if op == sre_parse.LITERAL:
+                run.append(chr(av))
+                continue
+            runs.append("".join(run))
+            run = []
+            if op == sre_parse.SUBPATTERN:
+                walk(av[-1])
+            elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and av[0] >= 1:
+                walk(av[2])
+        runs.append("".join(run))
+    
+    try:
+        walk(parsed)
+    except (AttributeError, TypeError, ValueError, IndexError) as e:
+        logging.warning(f"Cannot read the regular expression {text!r} ({e}): full scan")
+        return []
+    return sorted({word for run in runs for word in TEXT_TOKEN_PATTERN.findall(run.lower())})
+
+class TextIndex:
+    """
+    Word index of the Details and Declaration columns, used to pre-filter the
+    full-text search: the rows containing each distinct (lowercase) word, and
+    a trigram index of the words, so that a fragment required by the query is
+    looked up among the distinct words instead of the rows. Built in the
+    background from a RecordSnapshot when indexing ends; it covers the first
+    `rows` rows while the model has had `removals` removals.
+    """
+    def __init__(self, rows, removals):
+        self.rows = rows
+        self.removals = removals
+        self.word_ids = {}
+        self.words = []
+        self.word_rows = []
+        self.trigrams = collections.defaultdict(lambda: array.array('I'))
+    
+    @classmethod
+    def build(cls, snapshot, removals, thread=None):
+        """Index the rows of snapshot; return None if thread is interrupted meanwhile."""
+        index = cls(snapshot.rowCount(), removals)
+        word_ids = index.word_ids
+        for first in range(0, index.rows, TEXT_SEARCH_BATCH_ROWS):
+            if thread is not None and thread.isInterruptionRequested():
+                return None
+            last = min(first + TEXT_SEARCH_BATCH_ROWS, index.rows)
+            declarations = snapshot.declarations.get_many(snapshot.declaration_offsets[first:last],
+                                                          snapshot.declaration_lengths[first:last])
+            for row, details, declaration in zip(range(first, last), snapshot.details[first:last], declarations):
+                for word in set(TEXT_TOKEN_PATTERN.findall(f"{details}\n{declaration}".lower())):
+                    word_id = word_ids.get(word)
+                    if word_id is None:
+                        word_id = index.add_word(word)
+                    index.word_rows[word_id].append(row)
+        logging.info(f"Full-text index: {len(index.words)} words in {index.rows} rows")
+        return index
+    
+    def add_word(self, word):
+        word_id = self.word_ids[word] = len(self.words)
+        self.words.append(word)
+        self.word_rows.append(array.array('I'))
+        for trigram in {word[i:i + 3] for i in range(len(word) - 2)}:
+            self.trigrams[trigram].append(word_id)
+        return word_id
+    
+    def matching_words(self, fragment):
+        """Ids of the words containing fragment."""
+        if len(fragment) < 3:
+            return [word_id for word_id, word in enumerate(self.words) if fragment in word]
+        postings = sorted((self.trigrams.get(fragment[i:i + 3], ()) for i in range(len(fragment) - 2)), key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            if not candidates:
+                break
+            candidates.intersection_update(posting)
+        return [word_id for word_id in candidates if fragment in self.words[word_id]]
+    
+    def candidates(self, fragments):
+        """
+        Return the sorted rows containing, for every fragment, a word that
+        contains it; None if there are no fragments (every row is a candidate).
+        """
+        result = None
+        # I frammenti più lunghi sono di solito i più selettivi
+        for fragment in sorted(fragments, key=len, reverse=True):
+            rows = set()
+            for word_id in self.matching_words(fragment):
+                rows.update(self.word_rows[word_id])
+            result = rows if result is None else result & rows
+            if not result:
+                break
+        return None if result is None else sorted(result)
+
+class TextSearchWorker(QtCore.QObject):
+    """
+    Runs a full-text search over the first row_count rows of a RecordSnapshot
+    in a background QThread: the candidate rows are taken from the TextIndex,
+    if given, and checked against the regular expression in batches; the rows
+    found are sent as they come, so the view fills in while the search goes on.
+    """
+    matches = QtCore.pyqtSignal(int, object)  # generazione della ricerca, righe trovate
+    finished = QtCore.pyqtSignal(int, bool)   # generazione della ricerca, False se interrotta
+    
+    def __init__(self, snapshot, row_count, text, text_index=None, generation=0):
+        super(TextSearchWorker, self).__init__()
+        self.snapshot = snapshot
+        self.row_count = row_count
+        self.text = text
+        self.text_index = text_index
+        self.generation = generation
+    
+    def candidate_rows(self):
+        index = self.text_index
+        if index is not None:
+            candidates = index.candidates(required_words(self.text))
+            if candidates is not None:
+                logging.info(f"Full-text search: {len(candidates)} candidate rows of {index.rows}")
+                first_unindexed = min(index.rows, self.row_count)
+                rows = array.array('I', candidates[:bisect.bisect_left(candidates, first_unindexed)])
+                rows.extend(range(first_unindexed, self.row_count))
+                return rows
+        return range(self.row_count)
+    
+    def run(self):
+        thread = QtCore.QThread.currentThread()
+        snapshot = self.snapshot
+        matcher = make_text_matcher(self.text)
+        rows = self.candidate_rows()
+        found = []
+        last_emit = time.monotonic()
+        interval = STREAM_CHUNK_SECONDS
+        completed = True
+        for first in range(0, len(rows), TEXT_SEARCH_BATCH_ROWS):
+            if thread.isInterruptionRequested():
+                completed = False
+                break
+            batch = rows[first:first + TEXT_SEARCH_BATCH_ROWS]
+            declarations = snapshot.declarations.get_many([snapshot.declaration_offsets[row] for row in batch],
+                                                          [snapshot.declaration_lengths[row] for row in batch])
+            found.extend(row for row, declaration in zip(batch, declarations)
+                         if matcher(snapshot.details[row]) or matcher(declaration))
+            if found and time.monotonic() - last_emit >= interval:
+                self.matches.emit(self.generation, found)
+                found = []
+                last_emit = time.monotonic()
+                interval = min(interval * 2, TEXT_SEARCH_MAX_INTERVAL)
+        if found and completed:
+            self.matches.emit(self.generation, found)
+        self.finished.emit(self.generation, completed)
+
+class ReadOnlyCheckBoxDelegate(QtWidgets.QStyledItemDelegate):
+    """
+    Un delegato personalizzato che mostra una casella di controllo per i valori booleani,
+    ma non permette di modificarli (sola lettura).
+    """
+    def __init__(self, parent=None):
+        super(ReadOnlyCheckBoxDelegate, self).__init__(parent)
+        
+    def createEditor(self, parent, option, index):
+        # Non creiamo un editor perché è di sola lettura
+        return None
+        
+    def paint(self, painter, option, index):
+        # Ottieni il valore booleano dalla cella
+        value = index.data(QtCore.Qt.DisplayRole)
+        checked = False
+        
+        if isinstance(value, bool):
+            checked = value
+        elif isinstance(value, str):
+            checked = value.lower() in ('true', 'yes', '1', 'on')
+        elif isinstance(value, int):
+            checked = bool(value)
+            
+        # Configura lo stile
+        opt = QtWidgets.QStyleOptionButton()
+        opt.rect = option.rect
+        opt.state = QtWidgets.QStyle.State_Enabled
+        
+        if checked:
+            opt.state |= QtWidgets.QStyle.State_On
+        else:
+            opt.state |= QtWidgets.QStyle.State_Off
+            
+        # Centra la checkbox
+        checkbox_size = option.widget.style().subElementRect(
+            QtWidgets.QStyle.SE_CheckBoxIndicator, opt, option.widget).size()
+        opt.rect.setLeft(option.rect.center().x() - checkbox_size.width() // 2)
+        
+        # Disegna la checkbox
+        option.widget.style().drawControl(QtWidgets.QStyle.CE_CheckBox, opt, painter, option.widget)
+
+# Per ogni valore di un byte i suoi 8 bit (dal meno significativo) come 8 byte 0/1
+BYTE_BITS = [bytes((value >> bit) & 1 for bit in range(8)) for value in range(256)]
+
+class CustomFilterProxy(QtCore.QSortFilterProxyModel):
+    """
+    A custom filter proxy that filters rows based on:
+      1. The search type, directory, filename and named value (if not "*" then the row must match the selected value).
+      2. The search text applied to the Name column, in the search mode (see make_name_matcher),
+         or in FULL_TEXT_MODE to the Details and Declaration columns (see make_text_matcher).
+    The set of visible rows is computed at once by a FilterIndex when a filter
+    changes; filterAcceptsRow only tests a bit. Rows appended after that (while
+    indexing) are checked one by one.
+    A full-text search runs in the background (TextSearchWorker, started by the
+    window on text_search_requested): its rows start hidden and are shown by
+    add_text_matches as they are found.
+    """
+    text_search_requested = QtCore.pyqtSignal(str)  # testo della ricerca full-text da avviare ("" = nessuna)
+    
+    def __init__(self, parent=None):
+        super(CustomFilterProxy, self).__init__(parent)
+        self.search_type = "*"
+        self.search_directory = "*"
+        self.search_file = "*"
+        self.search_named = "*"  
+        self.search_mode = "*"
+        self.search_text = ""
+        self.filter_index = None
+        self.name_matcher = None
+        self.visible_bits = None   # bitset delle righe visibili (bytes), None = nessun filtro
+        self.visible_rows = 0      # righe del modello coperte da visible_bits
+        # Ricerca full-text: righe trovate finora (bytearray) tra le prime text_rows, e gli altri filtri
+        self.text_matcher = None
+        self.text_search_key = None
+        self.text_matches = None
+        self.text_rows = 0
+        self.filter_bits = None
+        # Ordinamento per Declaration: posizione di ogni riga (vedi RecordTableModel.declaration_ranks),
+        # valida finché non cambiano le righe del modello
+        self.declaration_ranks = None
+        self.declaration_ranks_key = None
+    
+    def setSourceModel(self, model):
+        super(CustomFilterProxy, self).setSourceModel(model)
+        self.filter_index = FilterIndex(model)
+        # Dopo una rimozione gli indici di riga cambiano: le righe aggiunte in seguito
+        # vengono controllate una per una fino al prossimo refilter
+        model.rowsRemoved.connect(self.forget_visible_rows)
+    
+    def setSearchMode(self, search_mode):
+        self.search_mode = search_mode
+        self.refilter()
+
+    def setSearchNamed(self, search_named):  # Nuovo metodo per impostare il filtro Named
+        self.search_named = search_named
+        self.refilter()
+
+    def setSearchType(self, search_type):
+        self.search_type = search_type
+        self.refilter()
+    
+    def setSearchDirectory(self, search_directory):
+        self.search_directory = search_directory
+        self.refilter()
+    
+    def setSearchFile(self, search_file):
+        self.search_file = search_file
+        self.refilter()
+    
+    def setSearchText(self, search_text):
+        self.search_text = search_text
+        self.refilter()
+    
+    def update_visible_rows(self):
+        """Compute the bitset of the visible rows with the FilterIndex (and the full-text matches)."""
+        full_text = self.search_mode == FULL_TEXT_MODE
+        self.name_matcher = None if full_text else make_name_matcher(self.search_text, self.search_mode)
+        self.text_matcher = make_text_matcher(self.search_text) if full_text else None
+        visible = self.filter_index.visible(self.search_type, self.search_directory, self.search_file,
+                                            self.search_named, "" if full_text else self.search_text,
+                                            self.search_mode)
+        self.visible_rows = self.filter_index.indexed_rows
+        size = (self.visible_rows + 7) // 8
+        if self.text_matcher is not None:
+            key = (self.search_text, self.visible_rows, self.sourceModel().removals)
+            if key != self.text_search_key:
+                # Nuova ricerca: le righe compaiono man mano che vengono trovate
+                self.text_search_key = key
+                self.text_matches = bytearray(size)
+                self.text_rows = self.visible_rows
+                self.text_search_requested.emit(self.search_text)
+            self.filter_bits = None if visible is None else visible.to_bytes(size, 'little')
+            text_bits = int.from_bytes(self.text_matches, 'little')
+            visible = text_bits if visible is None else visible & text_bits
+            self.visible_bits = bytearray(visible.to_bytes(size, 'little'))
+            return
+        if self.text_search_key is not None:
+            self.text_search_key = None
+            self.text_matches = None
+            self.filter_bits = None
+            self.text_search_requested.emit("")
+        if visible is None:
+            self.visible_bits = None
+        else:
+            self.visible_bits = visible.to_bytes(size, 'little')
+    
+    def add_text_matches(self, rows):
+        """Show the rows found by the running full-text search (if the other filters accept them)."""
+        if self.text_matches is None:
+            return
+        shown = []
+        for row in rows:
+            if row >= self.text_rows:
+                continue
+            self.text_matches[row >> 3] |= 1 << (row & 7)
+            if row < self.visible_rows and (self.filter_bits is None or self.filter_bits[row >> 3] >> (row & 7) & 1):
+                self.visible_bits[row >> 3] |= 1 << (row & 7)
+                shown.append(row)
+        # Il proxy rivaluta le righe segnalate da dataChanged e inserisce quelle ora accettate,
+        # ma ogni blocco inserito costa O(righe visibili): con molti blocchi conviene rifare il
+        # filtro. Senza ordinamento ricostruire la mappatura è più rapido; ordinata, invece,
+        # invalidateFilter ordina solo le righe nuove invece di riordinarle tutte
+        ranges = contiguous_ranges(shown)
+        if len(ranges) > TEXT_SEARCH_MAX_RANGES:
+            if self.sortColumn() >= 0:
+                self.invalidateFilter()
+            else:
+                self.invalidate()
+            return
+        model = self.sourceModel()
+        for first, last in ranges:
+            model.rows_changed(first, last)
+    
+    def source_rows(self):
+        """
+        Return the model rows shown by the view, in view order. Without sorting
+        they are read from the visible bitset (expanded to one byte per row and
+        passed to itertools.compress), instead of mapping every proxy row.
+        """
+        model = self.sourceModel()
+        if self.sortColumn() >= 0:
+            return [self.mapToSource(self.index(row, 0)).row() for row in range(self.rowCount())]
+        covered = min(self.visible_rows, model.rowCount())
+        if self.visible_bits is None:
+            rows = list(range(covered))
+        else:
+            flags = b"".join(map(BYTE_BITS.__getitem__, self.visible_bits))
+            rows = list(itertools.compress(range(covered), flags[:covered]))
+        rows.extend(row for row in range(covered, model.rowCount()) if self.row_matches(row))
+        return rows
+    
+    def forget_visible_rows(self):
+        self.visible_bits = None
+        self.visible_rows = 0
+        self.text_rows = 0
+    
+    def refilter(self):
+        self.update_visible_rows()
+        self.invalidateFilter()
+        
+    def filterAcceptsRow(self, source_row, source_parent):
+        if source_row < self.visible_rows:
+            if self.visible_bits is None:
+                return True
+            return bool(self.visible_bits[source_row >> 3] >> (source_row & 7) & 1)
+        return self.row_matches(source_row)
+    
+    def row_matches(self, source_row):
+        """Check the filters on a single row (for rows not yet covered by the visible bitset)."""
+        # I valori sono letti direttamente dalle colonne del RecordTableModel
+        model = self.sourceModel()
+        if self.search_type != "*":
+            if model.value(source_row, COL_TYPE) != self.search_type:
+                return False
+        if self.search_named != "*":
+            named_value = model.named[source_row]
+            if self.search_named == "Yes" and not named_value:
+                return False
+            if self.search_named == "No" and named_value:
+                return False
+        if self.search_directory != "*":
+            if model.value(source_row, COL_DIRECTORY) != self.search_directory:
+                return False
+        if self.search_file != "*":
+            if model.value(source_row, COL_FILENAME) != self.search_file:
+                return False
+        if self.name_matcher is not None:
+            return self.name_matcher(model.names[source_row])
+        if self.text_matcher is not None:
+            return self.text_matcher(model.details[source_row]) or \
+                self.text_matcher(model.value(source_row, COL_DECLARATION))
+        return True
+    
+    def lessThan(self, left, right):
+        model = self.sourceModel()
+        column = left.column()
+        if column == COL_DECLARATION:
+            # Le dichiarazioni stanno su disco: si confrontano le posizioni calcolate una volta
+            ranks = self.sort_ranks(model)
+            return ranks[left.row()] < ranks[right.row()]
+        return model.value(left.row(), column) < model.value(right.row(), column)
+    
+    def sort_ranks(self, model):
+        """Return the declaration ranks of model, computed again only when its rows changed."""
+        key = (model, model.removals, model.rowCount())
+        if self.declaration_ranks_key != key:
+            self.declaration_ranks = model.declaration_ranks()
+            self.declaration_ranks_key = key
+        return self.declaration_ranks
+
+class TableView(QtWidgets.QTableView):
+    """Custom QTableView to catch CTRL+C events for copying cell content."""
+    def __init__(self, parent=None):
+        super(TableView, self).__init__(parent)
+        self.setContextMenuPolicy(QtCore.Qt.CustomContextMenu)
+        self.customContextMenuRequested.connect(self.show_context_menu)
+    
+    def eventFilter(self, source, event):
+        if event.type() == QtCore.QEvent.KeyPress:
+            if event.key() == QtCore.Qt.Key_C and event.modifiers() & QtCore.Qt.ControlModifier:
+                indexes = self.selectionModel().selectedIndexes()
+                if indexes:
+                    text = str(indexes[0].data())
+                    QtWidgets.QApplication.clipboard().setText(text)
+                    logging.info(f"Copied to clipboard: {text}")
+                    return True
+        return super(TableView, self).eventFilter(source, event)
+        
+    def show_context_menu(self, position):
+        indexes = self.selectedIndexes()
+        if not indexes:
+            return
+            
+        menu = QtWidgets.QMenu()
+        dump_action = menu.addAction("Dump recursive definitions")
+        goto_action = menu.addAction("Go to definition")
+        usages_action = menu.addAction("Find usages")
+        copy_declaration_action = menu.addAction("Copy declaration")  # Nuova azione
+        
+        action = menu.exec_(self.viewport().mapToGlobal(position))
+        
+        # Get the parent window to access its methods
+        parent_window = self.parent()
+        while parent_window and not isinstance(parent_window, MainWindow):
+            parent_window = parent_window.parent()
+        
+        if not parent_window:
+            return
+            
+        if action == dump_action:
+            parent_window.dump_recursive_definitions(indexes[0])
+        elif action == goto_action:
+            # Use the same functionality as double-clicking on the file columns
+            parent_window.open_file(indexes[0])
+        elif action == usages_action:
+            parent_window.find_usages(indexes[0])
+        elif action == copy_declaration_action:
+            # Nuova funzionalità per copiare la dichiarazione
+            parent_window.copy_declaration(indexes[0])
+
+class MainWindow(QtWidgets.QMainWindow):
+        
+    def __init__(self, file_list, args, cache=None, compile_commands=None):
+        super(MainWindow, self).__init__()
+        self.file_list = file_list
+        self.args = args
+        # Argomenti di clang di ogni translation unit, con -p (anche per il preprocessore del dump delle definizioni)
+        self.compile_commands = compile_commands
+        PREPROCESS_CACHE.compile_commands = compile_commands
+        # La cache (anche solo in memoria) permette a reload_table di ri-analizzare solo i file modificati
+        self.cache = cache if cache is not None else IndexCache()
+        # La tabella viene riempita da start_indexing, in un thread separato
+        self.index_thread = None
+        self.index_profile = None
+        self.reloading = False
+        self.reload_pending = False
+        self.reload_records = []
+        self.filter_values = (set(), set(), set())
+        # Grafo delle dipendenze tra tipi, usato dal dump delle definizioni ricorsive
+        self.type_graph = TypeGraph()
+        self.reload_type_graph = None
+        # Indice dei riferimenti ai simboli ("Find usages"), solo con --references
+        self.reference_index = None
+        self.reload_reference_index = None
+        # Siti di dichiarazione e definizione di ogni simbolo ("Go to definition")
+        self.symbol_index = SymbolIndex()
+        self.reload_symbol_index = None
+        # Thread (e worker) delle operazioni lanciate con run_in_background
+        self.background_tasks = []
+        # Ricerca full-text: indice delle parole (costruito a fine indicizzazione) e ricerca in corso
+        self.text_index = None
+        self.text_index_task = None
+        self.text_search_task = None
+        self.text_search_generation = 0
+        self.setWindowTitle("C Identifier Explorer")
+        self.resize(1200, 600)
+        
+        central_widget = QtWidgets.QWidget()
+        self.setCentralWidget(central_widget)
+        main_layout = QtWidgets.QVBoxLayout(central_widget)
+        
+        # Shortcuts: CTRL+Q to quit, CTRL+R to reload the table.
+        exit_shortcut = QtWidgets.QShortcut(QtGui.QKeySequence("Ctrl+Q"), self)
+        exit_shortcut.activated.connect(QtWidgets.qApp.quit)
+        QtWidgets.qApp.aboutToQuit.connect(self.stop_threads)
+        reload_shortcut = QtWidgets.QShortcut(QtGui.QKeySequence("Ctrl+R"), self)
+        reload_shortcut.activated.connect(self.reload_table)
+        
+        # Create a horizontal layout for search filters.
+        search_layout = QtWidgets.QHBoxLayout()
+        
+      
+        # Add a menu button for actions - using hamburger menu icon (≡) and fixed width
+        self.action_menu_button = QtWidgets.QPushButton("≡")  # Unicode character for "identical to" (hamburger menu)
+        # Set a fixed width to make it square and compact
+        self.action_menu_button.setMaximumWidth(30)
+        self.action_menu_button.setToolTip("Actions Menu")
+        # Optional: Set a stylesheet to make it look better
+        self.action_menu_button.setStyleSheet("""
+            QPushButton {
+                font-size: 16px;
+                padding: 2px;
+                text-align: center;
+            }
+        """)
+        self.action_menu = QtWidgets.QMenu()
+        self.export_all_action = self.action_menu.addAction("Export All")
+        self.export_all_action.triggered.connect(self.export_all_definitions)
+        self.show_stats_action = self.action_menu.addAction("Show Statistics")
+        self.show_stats_action.triggered.connect(self.show_statistics)
+
+        # Nel metodo __init__ della classe MainWindow, dopo la creazione del menu hamburger
+        self.export_csv_action = self.action_menu.addAction("Export to CSV")
+        self.export_csv_action.triggered.connect(self.export_to_csv)
+        
+        # Aggiungi un separatore e l'azione Chiudi
+        self.action_menu.addSeparator()
+        self.exit_action = self.action_menu.addAction("Quit")
+        self.exit_action.triggered.connect(QtWidgets.qApp.quit)
+
+        # Mostra il menu quando il pulsante viene cliccato
+        self.action_menu_button.clicked.connect(lambda: self.action_menu.exec_(self.action_menu_button.mapToGlobal(QtCore.QPoint(0, self.action_menu_button.height()))))        
+
+        # Aggiungi il pulsante al layout
+        search_layout.addWidget(self.action_menu_button)
+        
+        self.search_type_combo = QtWidgets.QComboBox()
+        self.search_type_combo.addItem("*")
+        self.search_type_combo.setCurrentText("*")
+        search_layout.addWidget(self.search_type_combo)
+        
+        self.search_text = QtWidgets.QLineEdit()
+        self.search_text.setPlaceholderText("Search by name...")
+        # Aggiungi il menu a tendina per la modalità di ricerca
+        self.search_mode_combo = QtWidgets.QComboBox()
+        self.search_mode_combo.addItem("*")    # Contains
+        self.search_mode_combo.addItem("^")    # Starts with (solo il simbolo ^ senza *)
+        self.search_mode_combo.addItem("$")    # Ends with (solo il simbolo $ senza *)
+        self.search_mode_combo.addItem(FULL_TEXT_MODE)  # Full-text in Details e Declaration
+        self.search_mode_combo.setToolTip("Search mode: contains (*), starts with (^), ends with ($), "
+                                          f"regular expression in details and declarations ({FULL_TEXT_MODE})")
+        self.search_mode_combo.setMaximumWidth(40)
+        self.search_mode_combo.setMinimumWidth(40)
+
+        # Aggiungi prima il campo di ricerca, poi la modalità
+        search_layout.addWidget(self.search_text)
+        search_layout.addWidget(self.search_mode_combo)
+        
+        self.search_named_combo = QtWidgets.QComboBox()
+        self.search_named_combo.addItem("*")
+        self.search_named_combo.addItem("Yes")  # Per elementi con nome esplicito
+        self.search_named_combo.addItem("No")   # Per elementi senza nome esplicito
+        self.search_named_combo.setCurrentText("*")
+        search_layout.addWidget(self.search_named_combo)
+        
+        self.search_directory_combo = QtWidgets.QComboBox()
+        self.search_directory_combo.addItem("*")
+        self.search_directory_combo.setCurrentText("*")
+        search_layout.addWidget(self.search_directory_combo)
+        
+        self.search_file_combo = QtWidgets.QComboBox()
+        self.search_file_combo.addItem("*")
+        self.search_file_combo.setCurrentText("*")
+        search_layout.addWidget(self.search_file_combo)
+        main_layout.addLayout(search_layout)
+        
+        # Crea la vista tabella
+        self.table_view = TableView(self)
+        self.table_view.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.table_view.setSelectionMode(QtWidgets.QAbstractItemView.SingleSelection)
+        self.table_view.installEventFilter(self.table_view)
+        main_layout.addWidget(self.table_view)
+        
+        # Modello della tabella, riempito durante l'indicizzazione
+        self.model = RecordTableModel(self)
+        
+        self.proxy_model = CustomFilterProxy()
+        self.proxy_model.setSourceModel(self.model)
+        self.proxy_model.text_search_requested.connect(self.start_text_search)
+        self.table_view.setModel(self.proxy_model)
+        
+        # Applica il delegato per la colonna "Named" (indice 2)
+        checkbox_delegate = ReadOnlyCheckBoxDelegate(self.table_view)
+        self.table_view.setItemDelegateForColumn(2, checkbox_delegate)
+        
+        self.table_view.setSortingEnabled(True)
+        self.table_view.resizeColumnsToContents()
+        
+        # Imposta una larghezza fissa per la colonna Declaration (indice 8)
+        # Imposta una larghezza fissa per la colonna Declaration (indice 8)
+        declaration_column_width = 200  # Larghezza in pixel
+        self.table_view.setColumnWidth(8, declaration_column_width)
+
+        # Crea l'etichetta di stato per mostrare il numero di elementi visualizzati
+        status_layout = QtWidgets.QHBoxLayout()
+        self.status_label = QtWidgets.QLabel("0 items displayed")
+        status_layout.addWidget(self.status_label)
+        # Barra di avanzamento dell'indicizzazione, visibile solo mentre è in corso
+        self.progress_bar = QtWidgets.QProgressBar()
+        self.progress_bar.setMaximumWidth(300)
+        self.progress_bar.setFormat("Indexing %v/%m files")
+        self.progress_bar.hide()
+        status_layout.addWidget(self.progress_bar)
+        main_layout.addLayout(status_layout)
+
+        # Collega i filtri all'aggiornamento del conteggio
+        # Il filtro sul nome viene applicato solo dopo una pausa nella digitazione
+        self.search_timer = QtCore.QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(lambda: self.update_text_filter(self.search_text.text()))
+        self.search_text.textChanged.connect(self.search_timer.start)
+        self.search_type_combo.currentTextChanged.connect(self.update_type_filter)
+        self.search_directory_combo.currentTextChanged.connect(self.update_directory_filter)
+        self.search_file_combo.currentTextChanged.connect(self.update_file_filter)
+        self.search_named_combo.currentTextChanged.connect(self.update_named_filter)
+        self.search_mode_combo.currentTextChanged.connect(self.update_search_mode)
+
+        # Aggiorna il conteggio iniziale
+        self.update_item_count()
+
+        self.table_view.clicked.connect(self.handle_table_click)
+        self.table_view.doubleClicked.connect(self.handle_table_double_click)
+        
+        # Con --watch i file modificati vengono ricaricati automaticamente (QFileSystemWatcher usa inotify su Linux)
+        self.watcher = None
+        if args.watch:
+            self.reload_timer = QtCore.QTimer(self)
+            self.reload_timer.setSingleShot(True)
+            self.reload_timer.setInterval(500)  # Raggruppa le modifiche ravvicinate in un solo reload
+            self.reload_timer.timeout.connect(self.reload_table)
+            self.watcher = QtCore.QFileSystemWatcher(self)
+            self.watcher.fileChanged.connect(self.reload_timer.start)
+            self.watcher.directoryChanged.connect(self.reload_timer.start)
+            self.update_watched_paths()
+    
+    @staticmethod
+    def unique_filter_values(records):
+        """Return the sets of types, directories and file names offered by the filter combo boxes."""
+        unique_types = set(rec["Type"] for rec in records)
+        unique_dirs = set(os.path.dirname(rec["File"]) for rec in records if rec.get("File"))
+        unique_files = set(os.path.basename(rec["File"]) for rec in records if rec.get("File"))
+        return unique_types, unique_dirs, unique_files
+    
+    def update_watched_paths(self):
+        """Watch the current input files and directories (files replaced by editors must be watched again)."""
+        if self.watcher is None:
+            return
+        wanted = set(self.file_list)
+        wanted.update(watched_directories(self.args.paths, self.args.recursive, self.args.recursive_dir))
+        if self.compile_commands is not None and os.path.exists(self.compile_commands.path):
+            wanted.add(self.compile_commands.path)
+        watched = set(self.watcher.files()) | set(self.watcher.directories())
+        to_remove = watched - wanted
+        to_add = wanted - watched
+        if to_remove:
+            self.watcher.removePaths(sorted(to_remove))
+        if to_add:
+            self.watcher.addPaths(sorted(to_add))
+
+    def update_text_filter(self, text):
+        """Aggiorna il filtro di testo quando l'utente digita nel campo di ricerca."""
+        self.search_timer.stop()
+        self.proxy_model.setSearchText(text)
+        self.update_item_count()
+        
+    def update_type_filter(self, type_text):
+        """Aggiorna il filtro per tipo."""
+        self.proxy_model.setSearchType(type_text)
+        self.update_item_count()
+        
+    def update_directory_filter(self, directory):
+        """Aggiorna il filtro per directory."""
+        self.proxy_model.setSearchDirectory(directory)
+        self.update_item_count()
+        
+    def update_file_filter(self, file_name):
+        """Aggiorna il filtro per file."""
+        self.proxy_model.setSearchFile(file_name)
+        self.update_item_count()
+        
+    def update_named_filter(self, named_value):
+        """Aggiorna il filtro per elementi con nome."""
+        self.proxy_model.setSearchNamed(named_value)
+        self.update_item_count()
+        
+    def update_search_mode(self, mode):
+        """Aggiorna la modalità di ricerca."""
+        if mode == FULL_TEXT_MODE:
+            self.search_text.setPlaceholderText("Search details and declarations (regular expression)...")
+        else:
+            self.search_text.setPlaceholderText("Search by name...")
+        # Applica anche il testo eventualmente in attesa del timer
+        self.search_timer.stop()
+        self.proxy_model.search_text = self.search_text.text()
+        self.proxy_model.setSearchMode(mode)
+        self.update_item_count()
+
+    def get_export_options(self, title="Export Options", extra_options=()):
+        """
+        Mostra una finestra di dialogo con le opzioni di esportazione e restituisce le scelte dell'utente.
+        
+        Args:
+            title: titolo della finestra
+            extra_options: altre checkbox (testo, valore iniziale), il cui stato
+                viene aggiunto in coda alla tupla restituita
+        """
+        options_dialog = QtWidgets.QDialog(self)
+        options_dialog.setWindowTitle(title)
+        options_dialog.setMinimumWidth(400)
+        
+        dialog_layout = QtWidgets.QVBoxLayout(options_dialog)
+        
+        # Checkbox per applicare il filtro di ricerca corrente
+        apply_search_filter_checkbox = QtWidgets.QCheckBox("Apply current search filter (export only items matching the current search)")
+        apply_search_filter_checkbox.setChecked(False)  # Default: esporta tutto
+        dialog_layout.addWidget(apply_search_filter_checkbox)
+        
+        # Checkbox per escludere oggetti che potrebbero causare duplicazioni
+        exclude_duplicating_objects_checkbox = QtWidgets.QCheckBox("Exclude prone-duplicating information objects (e.g., prefer typedefs over struct definitions)")
+        exclude_duplicating_objects_checkbox.setChecked(True)  # Default: esclude oggetti che potrebbero causare duplicazioni
+        dialog_layout.addWidget(exclude_duplicating_objects_checkbox)
+        
+        exclude_unnamed_checkbox = QtWidgets.QCheckBox("Exclude unnamed elements (only export elements with explicit names)")
+        exclude_unnamed_checkbox.setChecked(True)
+        dialog_layout.addWidget(exclude_unnamed_checkbox)
+        
+        extra_checkboxes = []
+        for text, checked in extra_options:
+            checkbox = QtWidgets.QCheckBox(text)
+            checkbox.setChecked(checked)
+            dialog_layout.addWidget(checkbox)
+            extra_checkboxes.append(checkbox)
+        
+        button_box = QtWidgets.QDialogButtonBox(
+            QtWidgets.QDialogButtonBox.Ok | QtWidgets.QDialogButtonBox.Cancel
+        )
+        button_box.accepted.connect(options_dialog.accept)
+        button_box.rejected.connect(options_dialog.reject)
+        dialog_layout.addWidget(button_box)
+        
+        result = options_dialog.exec_()
+        
+        if result == QtWidgets.QDialog.Accepted:
+            return (True, 
+                    apply_search_filter_checkbox.isChecked(),
+                    exclude_duplicating_objects_checkbox.isChecked(),  # True significa escludere, False significa includere tutto
+                    exclude_unnamed_checkbox.isChecked()) + tuple(checkbox.isChecked() for checkbox in extra_checkboxes)
+        else:
+            # L'utente ha annullato, manteniamo i valori di default
+            return (False, False, True, False) + tuple(checked for text, checked in extra_options)
+            
+    def export_to_csv(self):
+        """
+        Esporta il contenuto della tabella in un file CSV (o Parquet, se pyarrow è installato).
+        Le righe da esportare sono calcolate una volta sola; il file è scritto da
+        un TableExporter in un thread in background.
+        """
+        logging.info("Exporting table to CSV...")
+        
+        # Ottieni le opzioni di esportazione prima di creare il file
+        accepted, export_filtered_only, _, exclude_unnamed = self.get_export_options("CSV Export Options")
+        
+        if not accepted:
+            return  # L'utente ha annullato
+        
+        # Chiedi all'utente dove salvare il file CSV
+        formats = [name for name, export_format in TABLE_EXPORT_FORMATS.items()
+                   if export_format != "parquet" or importlib.util.find_spec("pyarrow") is not None]
+        file_name, selected_filter = QtWidgets.QFileDialog.getSaveFileName(
+            self, 
+            "Save Table as CSV", 
+            "table_export.csv",
+            ";;".join(formats)
+        )
+        
+        if not file_name:
+            return  # L'utente ha annullato
+        export_format = TABLE_EXPORT_FORMATS.get(selected_filter, "csv")
+        if file_name.endswith(".parquet") and "Parquet Files (*.parquet)" in formats:
+            export_format = "parquet"
+        
+        # Righe del modello da esportare (le righe visibili, nell'ordine della vista, o tutte)
+        if export_filtered_only:
+            rows = self.proxy_model.source_rows()
+        else:
+            rows = range(self.model.rowCount())
+        snapshot = RecordSnapshot(self.model)
+        if exclude_unnamed:
+            # Solo le righe con Named = True
+            rows = list(itertools.compress(rows, (snapshot.named[row] for row in rows)))
+        
+        def finished(exported_rows):
+            logging.info(f"Table exported to {export_format.upper()}: {file_name} ({exported_rows} rows)")
+            QtWidgets.QMessageBox.information(
+                self, 
+                "Success", 
+                f"Table successfully exported to {file_name}\n{exported_rows} rows exported."
+            )
+        
+        self.start_export(TableExporter(snapshot, rows, file_name, export_format),
+                          "Exporting to CSV...", len(rows), finished, "Could not export table to CSV")
+    
+    def start_export(self, worker, label, total, callback, error_message):
+        """
+        Run an exporter (DefinitionExporter, TableExporter) in a background QThread
+        with a progress dialog whose Cancel interrupts it; then call callback(written)
+        in the GUI thread, unless the export was cancelled or failed.
+        """
+        thread = QtCore.QThread(self)
+        worker.moveToThread(thread)
+        self.background_tasks.append((thread, worker))
+        
+        # Mostra una finestra di progresso
+        progress = QtWidgets.QProgressDialog(label, "Cancel", 0, max(total, 1), self)
+        progress.setWindowModality(QtCore.Qt.WindowModal)
+        progress.setMinimumDuration(500)
+        progress.setValue(0)
+        
+        def update_progress(done, total):
+            progress.setMaximum(max(total, 1))
+            progress.setValue(done)
+        
+        def finished(written, error):
+            thread.wait()
+            self.background_tasks.remove((thread, worker))
+            thread.deleteLater()
+            worker.deleteLater()
+            progress.canceled.disconnect(thread.requestInterruption)
+            progress.close()
+            if error:
+                logging.error(f"{error_message}: {error}")
+                QtWidgets.QMessageBox.critical(self, "Error", f"{error_message}: {error}")
+            elif written >= 0:
+                callback(written)
+        
+        thread.started.connect(worker.run)
+        worker.progress.connect(update_progress)
+        # quit va collegato per primo: finished attende la fine del thread
+        worker.finished.connect(thread.quit)
+        worker.finished.connect(finished)
+        progress.canceled.connect(thread.requestInterruption)
+        thread.start()
+
+    def handle_table_click(self, index):
+        logging.debug(f"Table clicked at row {index.row()}, column {index.column()}")
+        # For Type, update now only on double-click; here do nothing.
+        if index.column() == 1:
+            source_index = self.proxy_model.mapToSource(index)
+            name_value = self.model.value(source_index.row(), COL_NAME)
+            QtWidgets.QApplication.clipboard().setText(name_value)
+            logging.info(f"Copied Name to clipboard: {name_value}")
+        elif index.column() in [5, 6, 7]:  # Aggiornati gli indici per Line, Column, Details
+            self.open_file(index)
+        # For Directory (3) and Filename (4), single click does nothing.
+    
+    def handle_table_double_click(self, index):
+        logging.debug(f"Table double-clicked at row {index.row()}, column {index.column()}")
+        if index.column() == 0:
+            source_index = self.proxy_model.mapToSource(index)
+            type_value = self.model.value(source_index.row(), COL_TYPE)
+            self.search_type_combo.setCurrentText(type_value)
+            self.proxy_model.setSearchType(type_value)
+            logging.info(f"Updated search type to {type_value}")
+        elif index.column() == 1:
+            source_index = self.proxy_model.mapToSource(index)
+            name_value = self.model.value(source_index.row(), COL_NAME)
+            QtWidgets.QApplication.clipboard().setText(name_value)
+            logging.info(f"Copied Name to clipboard: {name_value}")
+        elif index.column() == 3:  # Directory è ora in posizione 3
+            self.open_directory(index)
+        elif index.column() in [4, 5, 6, 7]:  # Aggiornati gli indici per Filename, Line, Column, Details
+            self.open_file(index)
+    
+    def open_file(self, index):
+        """Open the file of the selected row, at the definition of its symbol if known (see SymbolIndex)."""
+        source_index = self.proxy_model.mapToSource(index)
+        row = source_index.row()
+        file_path = self.model.file_path(row)
+        line_number = str(self.model.value(row, COL_LINE))
+        definition = self.symbol_index.definition(self.model.usrs[row], file_path)
+        if definition is not None:
+            file_path, line_number = definition[0], str(definition[1])
+        logging.info(f"Attempting to open file: {file_path} at line: {line_number}")
+        if file_path and line_number:
+            self.open_location(file_path, line_number)
+    
+    def open_location(self, file_path, line_number):
+        """Open file_path at line_number in the editor."""
+        try:
+            command = ["gedit", f"+{line_number}", file_path]
+            subprocess.Popen(command)
+            logging.info(f"Opened file with command: {' '.join(command)}")
+        except Exception as e:
+            logging.error(f"Error opening file: {e}")
+            QtWidgets.QMessageBox.warning(self, "Error", f"Unable to open file with gedit:\n{e}")
+    
+    def find_usages(self, index):
+        """
+        Show the references to the symbol of the selected row, from the
+        ReferenceIndex (the row is matched to its USR by its File, Line and Column;
+        the File also tells apart the static symbols of same-named files).
+        """
+        source_index = self.proxy_model.mapToSource(index)
+        row = source_index.row()
+        item_name = self.model.value(row, COL_NAME)
+        if self.reference_index is None:
+            QtWidgets.QMessageBox.information(
+                self,
+                "Information",
+                "References are not indexed: restart with --references to use Find usages."
+            )
+            return
+        file_path = self.model.file_path(row)
+        usr = self.model.usrs[row] or self.reference_index.usr_at(file_path, self.model.value(row, COL_LINE),
+                                                                  self.model.value(row, COL_COLUMN))
+        usages = self.reference_index.find_usages(usr, file_path) if usr else []
+        logging.info(f"Found {len(usages)} usages of {item_name} ({usr})")
+        if not usages:
+            QtWidgets.QMessageBox.information(self, "Information", f"No usages of {item_name} found.")
+            return
+        # In testa i punti in cui il simbolo è dichiarato e definito
+        sites = [(site_file, line, column, "DEFINITION" if is_definition else "DECLARATION")
+                 for site_file, line, column, is_definition in self.symbol_index.sites_of(usr, file_path)]
+        self.show_usages_popup(sites + usages, f"{self.model.value(row, COL_TYPE)} {item_name}")
+    
+    def show_usages_popup(self, usages, title):
+        """Display a list of (file, line, column, kind) usages; double-click opens the file."""
+        dialog = QtWidgets.QDialog(self)
+        dialog.setWindowTitle(f"Usages: {title}")
+        dialog.resize(800, 500)
+        
+        layout = QtWidgets.QVBoxLayout(dialog)
+        layout.addWidget(QtWidgets.QLabel(
+            f"{sum(1 for usage in usages if usage[3] not in ('DEFINITION', 'DECLARATION'))} usages"))
+        
+        table = QtWidgets.QTableWidget(len(usages), 4)
+        table.setHorizontalHeaderLabels(["File", "Line", "Column", "Kind"])
+        table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        table.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        for i, values in enumerate(usages):
+            for j, value in enumerate(values):
+                item = QtWidgets.QTableWidgetItem()
+                item.setData(QtCore.Qt.DisplayRole, value)
+                table.setItem(i, j, item)
+        table.resizeColumnsToContents()
+        table.cellDoubleClicked.connect(lambda i, j: self.open_location(usages[i][0], usages[i][1]))
+        layout.addWidget(table)
+        
+        close_button = QtWidgets.QPushButton("Close")
+        close_button.clicked.connect(dialog.accept)
+        layout.addWidget(close_button)
+        
+        dialog.exec_()
+    
+    def open_directory(self, index):
+        source_index = self.proxy_model.mapToSource(index)
+        row = source_index.row()
+        directory = self.model.value(row, COL_DIRECTORY)
+        logging.info(f"Attempting to open directory: {directory}")
+        if directory:
+            try:
+                command = [BROWSER_COMMAND, directory]
+                subprocess.Popen(command)
+                logging.info(f"Opened directory with command: {' '.join(command)}")
+            except Exception as e:
+                logging.error(f"Error opening directory: {e}")
+                QtWidgets.QMessageBox.warning(self, "Error", f"Unable to open directory with {BROWSER_COMMAND}:\n{e}")
+    def copy_declaration(self, index):
+        """Copia la dichiarazione dell'elemento selezionato negli appunti."""
+        source_index = self.proxy_model.mapToSource(index)
+        row = source_index.row()
+        
+        # Ottieni la dichiarazione dalla colonna Declaration (indice 8)
+        declaration = self.model.value(row, COL_DECLARATION)
+        
+        if declaration:
+            QtWidgets.QApplication.clipboard().setText(declaration)
+            logging.info(f"Copied declaration to clipboard: {declaration}")
+            
+            # Mostra un messaggio di conferma temporaneo (tooltip)
+            QtWidgets.QToolTip.showText(
+                QtGui.QCursor.pos(),
+                "Declaration copied to clipboard",
+                self.table_view,
+                QtCore.QRect(),
+                2000  # Mostra per 2 secondi
+            )
+        else:
+            # Se la dichiarazione non è disponibile, mostra un messaggio
+            QtWidgets.QMessageBox.information(
+                self,
+                "Information",
+                "No declaration available for this item."
+            )
+
+    def start_indexing(self, reload=False):
+        """
+        Index self.file_list in a background thread (see IndexWorker). The first
+        time the records are appended to the table as they arrive; for a reload
+        they are collected and applied by apply_reload when indexing ends.
+        """
+        if self.index_thread is not None:
+            # Indicizzazione già in corso: ricarica di nuovo appena termina
+            self.reload_pending = True
+            return
+        self.reloading = reload
+        self.reload_records = []
+        # Il grafo viene sostituito solo a reload completato
+        type_graph = TypeGraph()
+        reference_index = ReferenceIndex() if getattr(self.args, "references", False) else None
+        symbol_index = SymbolIndex()
+        if reload:
+            self.reload_type_graph = type_graph
+            self.reload_reference_index = reference_index
+            self.reload_symbol_index = symbol_index
+        else:
+            self.type_graph = type_graph
+            self.reference_index = reference_index
+            self.symbol_index = symbol_index
+        # Con --profile ogni indicizzazione (anche i reload) viene misurata
+        self.index_profile = IndexProfile() if getattr(self.args, "profile", None) is not None else None
+        self.progress_bar.setRange(0, len(self.file_list))
+        self.progress_bar.setValue(0)
+        self.progress_bar.show()
+        
+        self.index_thread = QtCore.QThread(self)
+        self.index_worker = IndexWorker(self.file_list, self.args, self.cache, type_graph, reference_index,
+                                        symbol_index, self.compile_commands, self.index_profile)
+        self.index_worker.moveToThread(self.index_thread)
+        self.index_thread.started.connect(self.index_worker.run)
+        self.index_worker.records_ready.connect(self.receive_records)
+        self.index_worker.progress.connect(self.progress_bar.setValue)
+        # quit va collegato per primo: indexing_finished attende la fine del thread
+        self.index_worker.finished.connect(self.index_thread.quit)
+        self.index_worker.finished.connect(self.indexing_finished)
+        self.index_thread.start()
+    
+    def receive_records(self, records):
+        """Slot for IndexWorker.records_ready."""
+        if self.reloading:
+            self.reload_records.extend(records)
+        else:
+            self.append_records(records)
+    
+    def append_records(self, records):
+        """Append a chunk of records to the table and add their values to the filter combo boxes."""
+        first_chunk = self.model.rowCount() == 0
+        self.model.append_records(records)
+        for values, new_values in zip(self.filter_values, self.unique_filter_values(records)):
+            values.update(new_values)
+        self.update_filter_combos()
+        if first_chunk:
+            self.table_view.resizeColumnsToContents()
+            self.table_view.setColumnWidth(8, 200)
+        self.update_item_count()
+    
+    def indexing_finished(self, completed):
+        """Slot for IndexWorker.finished."""
+        self.index_thread.wait()
+        self.index_thread.deleteLater()
+        self.index_worker.deleteLater()
+        self.index_thread = None
+        self.progress_bar.hide()
+        if self.reloading and completed:
+            self.apply_reload(self.reload_records)
+            self.type_graph = self.reload_type_graph
+            self.reference_index = self.reload_reference_index
+            self.symbol_index = self.reload_symbol_index
+        self.reload_records = []
+        self.reload_type_graph = None
+        self.reload_reference_index = None
+        self.reload_symbol_index = None
+        logging.info(f"Total records found: {self.model.rowCount()}")
+        if self.index_profile is not None and completed:
+            self.index_profile.finish(self.args.profile, self.args.profile_format)
+        self.index_profile = None
+        if completed:
+            self.start_text_index()
+            if self.proxy_model.text_search_key is not None:
+                # Dopo un reload la ricerca full-text va ripetuta sulle righe nuove
+                self.proxy_model.refilter()
+                self.update_item_count()
+        if self.reload_pending and completed:
+            self.reload_pending = False
+            self.reload_table()
+    
+    def stop_indexing(self):
+        """Stop the indexing thread after the current file and wait for it."""
+        if self.index_thread is not None:
+            self.reload_pending = False
+            self.index_thread.requestInterruption()
+            self.index_thread.wait()
+    
+    def start_text_index(self):
+        """Build the TextIndex of the table in a background thread, replacing the current one when done."""
+        if self.text_index_task is not None:
+            self.text_index_task[0].requestInterruption()
+        snapshot = RecordSnapshot(self.model)
+        removals = self.model.removals
+        thread = QtCore.QThread(self)
+        worker = TaskWorker(lambda: TextIndex.build(snapshot, removals, thread))
+        worker.moveToThread(thread)
+        task = (thread, worker)
+        self.text_index_task = task
+        self.background_tasks.append(task)
+        
+        def finished(text_index):
+            thread.wait()
+            self.background_tasks.remove(task)
+            thread.deleteLater()
+            worker.deleteLater()
+            if self.text_index_task is task:
+                self.text_index_task = None
+                if text_index is not None:
+                    self.text_index = text_index
+        
+        thread.started.connect(worker.run)
+        # quit va collegato per primo: finished attende la fine del thread
+        worker.done.connect(thread.quit)
+        worker.done.connect(finished)
+        thread.start()
+    
+    def start_text_search(self, text):
+        """
+        Slot for CustomFilterProxy.text_search_requested: stop the running
+        full-text search and start one for text (none if empty) over the rows
+        the proxy covers, pre-filtered by the TextIndex if it is up to date.
+        """
+        if self.text_search_task is not None:
+            self.text_search_task[0].requestInterruption()
+            self.text_search_task = None
+        self.text_search_generation += 1
+        if not text:
+            return
+        text_index = self.text_index
+        if text_index is not None and text_index.removals != self.model.removals:
+            text_index = None
+        thread = QtCore.QThread(self)
+        worker = TextSearchWorker(RecordSnapshot(self.model), self.proxy_model.text_rows, text, text_index,
+                                  self.text_search_generation)
+        worker.moveToThread(thread)
+        task = (thread, worker)
+        self.text_search_task = task
+        self.background_tasks.append(task)
+        
+        def finished(generation, completed):
+            thread.wait()
+            self.background_tasks.remove(task)
+            thread.deleteLater()
+            worker.deleteLater()
+            if self.text_search_task is task:
+                self.text_search_task = None
+                self.update_item_count()
+        
+        thread.started.connect(worker.run)
+        worker.matches.connect(self.receive_text_matches)
+        # quit va collegato per primo: finished attende la fine del thread
+        worker.finished.connect(thread.quit)
+        worker.finished.connect(finished)
+        thread.start()
+        self.update_item_count()
+    
+    def receive_text_matches(self, generation, rows):
+        """Slot for TextSearchWorker.matches: show the rows found (if the search is still the current one)."""
+        if generation != self.text_search_generation:
+            return
+        self.proxy_model.add_text_matches(rows)
+        self.update_item_count()
+    
+    def stop_threads(self):
+        """Stop indexing and wait for the background tasks."""
+        self.stop_indexing()
+        for thread, worker in list(self.background_tasks):
+            thread.requestInterruption()
+            thread.wait()
+    
+    def closeEvent(self, event):
+        self.stop_threads()
+        super(MainWindow, self).closeEvent(event)
+    
+    def update_filter_combos(self):
+        """Update the filter combo boxes to self.filter_values, keeping the proxy filters in sync."""
+        unique_types, unique_dirs, unique_files = self.filter_values
+        self.update_combo(self.search_type_combo, unique_types)
+        self.update_combo(self.search_directory_combo, unique_dirs)
+        self.update_combo(self.search_file_combo, unique_files)
+        if self.search_type_combo.currentText() != self.proxy_model.search_type:
+            self.proxy_model.setSearchType(self.search_type_combo.currentText())
+        if self.search_directory_combo.currentText() != self.proxy_model.search_directory:
+            self.proxy_model.setSearchDirectory(self.search_directory_combo.currentText())
+        if self.search_file_combo.currentText() != self.proxy_model.search_file:
+            self.proxy_model.setSearchFile(self.search_file_combo.currentText())
+    
+    def reload_table(self):
+        """
+        Reload the table incrementally: the input paths are scanned again, only
+        changed, added or removed files are parsed again (see IndexCache) and
+        only the rows that differ are removed from or added to the model
+        (see apply_reload). Filters and scroll position are kept.
+        """
+        logging.info("Reloading changed files...")
+        args = self.args
+        if self.index_thread is None:
+            self.file_list = collect_input_files(args.paths, args.recursive, args.recursive_dir)
+            if self.compile_commands is not None:
+                try:
+                    self.compile_commands.refresh()
+                except ValueError as e:
+                    logging.error(f"Error: {e}")
+        self.start_indexing(reload=True)
+    
+    def apply_reload(self, records):
+        """Replace the rows of the table with the given records, by difference."""
+        scroll_position = self.table_view.verticalScrollBar().value()
+        
+        new_digests = [self.model.record_digest(rec) for rec in records]
+        new_set = set(new_digests)
+        old_set = set(self.model.digests)
+        
+        # Rimuovi le righe non più presenti, a blocchi contigui partendo dal fondo
+        removed_rows = [row for row, digest in enumerate(self.model.digests) if digest not in new_set]
+        ranges = []
+        for row in removed_rows:
+            if ranges and ranges[-1][0] + ranges[-1][1] == row:
+                ranges[-1][1] += 1
+            else:
+                ranges.append([row, 1])
+        for first, count in reversed(ranges):
+            self.model.remove_rows(first, count)
+        if removed_rows:
+            self.model.compact_declarations()
+        
+        # Aggiungi le righe nuove
+        added_records = [rec for rec, digest in zip(records, new_digests) if digest not in old_set]
+        self.model.append_records(added_records)
+        added = len(added_records)
+        
+        # Aggiorna i combo box dei filtri aggiungendo/togliendo solo i valori cambiati
+        self.filter_values = self.unique_filter_values(records)
+        self.update_filter_combos()
+        
+        self.table_view.verticalScrollBar().setValue(scroll_position)
+        self.update_watched_paths()
+        
+        # Aggiorna il conteggio degli elementi visualizzati
+        self.update_item_count()
+        
+        logging.info(f"Reload complete: {len(removed_rows)} rows removed, {added} rows added.")
+    
+    @staticmethod
+    def update_combo(combo, values):
+        """Update the items of a filter combo box (after the leading "*") to the sorted values, by difference."""
+        combo.blockSignals(True)
+        current_text = combo.currentText()
+        for i in reversed(range(1, combo.count())):
+            if combo.itemText(i) not in values:
+                combo.removeItem(i)
+        present = [combo.itemText(i) for i in range(1, combo.count())]
+        for value in sorted(values - set(present)):
+            position = bisect.bisect_left(present, value)
+            present.insert(position, value)
+            combo.insertItem(position + 1, value)
+        if combo.findText(current_text) < 0:
+            # Il valore selezionato non esiste più
+            combo.setCurrentIndex(0)
+        combo.blockSignals(False)
+
+    def update_item_count(self):
+        """Aggiorna l'etichetta di stato con il numero di elementi visualizzati."""
+        count = self.proxy_model.rowCount()
+        total = self.model.rowCount()
+        if self.text_search_task is not None:
+            self.status_label.setText(f"{count} of {total} items displayed (searching...)")
+        else:
+            self.status_label.setText(f"{count} of {total} items displayed")    
+
+    def dump_recursive_definitions(self, index):
+        """
+        Extract and display the complete C definition of the selected item and all its dependencies.
+        The definitions come from the type graph built while indexing; types not in
+        the graph are looked up in the preprocessed file, in a background thread
+        (see run_in_background).
+        """
+        source_index = self.proxy_model.mapToSource(index)
+        row = source_index.row()
+        
+        # Get information about the selected item
+        item_type = self.model.value(row, COL_TYPE)
+        item_name = self.model.value(row, COL_NAME)
+        details = self.model.value(row, COL_DETAILS)
+        file_path = self.model.file_path(row)
+        
+        logging.info(f"Dumping recursive definitions for {item_type} {item_name} in {file_path}")
+        
+        # For VAR_DECL, extract the type from the details
+        if item_type == "VAR_DECL":
+            # The details column contains the type information
+            var_type = details.split(" (const)")[0] if " (const)" in details else details
+            logging.info(f"Variable type: {var_type}")
+            
+            # Il tipo (se definito nei file indicizzati) con le sue dipendenze, poi la variabile
+            type_key = self.type_graph.find_type(var_type, file_path)
+            declaration = self.model.value(row, COL_DECLARATION)
+            if type_key is not None or declaration:
+                definitions = [self.type_graph.dump([type_key])] if type_key is not None else []
+                if declaration:
+                    definitions.append(declaration)
+                self.show_definitions_popup("\n\n".join(definitions), f"Variable {item_name} of type {var_type}")
+                return
+            
+            def extract():
+                # Extract the definitions for the variable's type
+                definitions = self.extract_recursive_definitions(file_path, "TYPE", var_type)
+                if not definitions:
+                    # Try to get just the variable declaration
+                    definitions = self.extract_variable_declaration(file_path, item_name)
+                return definitions
+            title = f"Variable {item_name} of type {var_type}"
+            warning = f"Could not extract type definition for variable {item_name} of type {var_type}."
+        
+        # For other types that can have recursive definitions
+        elif item_type not in ["STRUCT_DECL", "TYPEDEF_DECL", "ENUM_DECL", "UNION_DECL"]:
+            QtWidgets.QMessageBox.information(
+                self, 
+                "Information", 
+                f"Recursive definition dump is only available for struct, typedef, enum, union declarations, and variables."
+            )
+            return
+        
+        elif self.type_graph.key(item_type, item_name, file_path) is not None:
+            self.show_definitions_popup(self.type_graph.dump([self.type_graph.key(item_type, item_name, file_path)]),
+                                        f"{item_type} {item_name}")
+            return
+        
+        else:
+            # Extract the definitions
+            def extract():
+                return self.extract_recursive_definitions(file_path, item_type, item_name)
+            title = f"{item_type} {item_name}"
+            warning = f"Could not extract definitions for {item_type} {item_name}."
+        
+        def show(definitions):
+            if not definitions:
+                QtWidgets.QMessageBox.warning(self, "Warning", warning)
+                return
+            # Display the definitions in a popup window
+            self.show_definitions_popup(definitions, title)
+        
+        self.run_in_background(extract, show, f"Extracting definitions of {item_name}...")
+    
+    def run_in_background(self, function, callback, message=None):
+        """
+        Run function() in a background QThread, then call callback(result) in
+        the GUI thread. A wait cursor (and the optional status message) is shown meanwhile.
+        """
+        thread = QtCore.QThread(self)
+        worker = TaskWorker(function)
+        worker.moveToThread(thread)
+        self.background_tasks.append((thread, worker))
+        
+        def finished(result):
+            thread.wait()
+            self.background_tasks.remove((thread, worker))
+            thread.deleteLater()
+            worker.deleteLater()
+            QtWidgets.QApplication.restoreOverrideCursor()
+            self.update_item_count()
+            callback(result)
+        
+        thread.started.connect(worker.run)
+        # quit va collegato per primo: finished attende la fine del thread
+        worker.done.connect(thread.quit)
+        worker.done.connect(finished)
+        QtWidgets.QApplication.setOverrideCursor(QtCore.Qt.WaitCursor)
+        if message:
+            self.status_label.setText(message)
+        thread.start()
+
+    def extract_variable_declaration(self, file_path, var_name):
+        """Extract the declaration of a variable from the file."""
+        try:
+            # Preprocess the file to expand all includes and macros (cached)
+            preprocessed_source = PREPROCESS_CACHE.get(file_path).source
+            
+            # Look for the variable declaration
+            # Pattern to match variable declarations like "int var_name;" or "const char* var_name = ..."
+            var_pattern = f"(const\\s+)?[a-zA-Z0-9_]+\\s+[\\*\\s]*{var_name}\\s*[=;][^;]*;"
+            match = re.search(var_pattern, preprocessed_source)
+            
+            if match:
+                return match.group(0)
+            return None
+        
+        except Exception as e:
+            logging.error(f"Error extracting variable declaration: {e}")
+            return None
+    
+    def extract_recursive_definitions(self, file_path, item_type, item_name):
+            """
+            Extract the complete C definition of the item and all its dependencies.
+            Returns a string containing all the definitions in the correct order.
+            The preprocessed source and its translation unit come from PREPROCESS_CACHE;
+            the translation unit is walked with the lock of the cache held.
+            Only used for the types missing from the TypeGraph (e.g. defined in headers
+            outside the indexed files): the text is found with regular expressions, so
+            it is approximate.
+            """
+            import clang.cindex
+            logging.warning(f"{item_type} {item_name} is not in the type graph: "
+                            f"scanning the preprocessed source of {file_path}")
+            try:
+                # Preprocess the file to expand all includes and macros, and parse it with clang
+                # (libclang non è thread safe: la translation unit si visita tenendo il lock della cache)
+                with PREPROCESS_CACHE.use(file_path) as preprocessed:
+                    tu = preprocessed.tu
+                
+                    # Find the target declaration
+                    target_cursor = None
+                    dependency_cursors = []
+                
+                    # Dopo il preprocessing tutte le dichiarazioni stanno nel file principale della translation unit
+                    def find_declaration(cursor, parent=None):
+                        nonlocal target_cursor
+                    
+                        if (cursor.kind.name == item_type and 
+                            cursor.spelling == item_name and 
+                            cursor.location.file and 
+                            cursor.location.file.name == tu.spelling):
+                            target_cursor = cursor
+                            return True
+                    
+                        for child in cursor.get_children():
+                            if find_declaration(child, cursor):
+                                return True
+                        return False
+                
+                    find_declaration(tu.cursor)
+                
+                    if not target_cursor:
+                        logging.error(f"Could not find declaration for {item_type} {item_name} in {file_path}")
+                        return None
+                
+                    # Collect all dependencies
+                    collected_types = set()
+                    dependency_definitions = []
+                
+                    def collect_dependencies(cursor, collected):
+                        if not cursor:
+                            return
+                        
+                        # For typedefs, get the underlying type
+                        if cursor.kind == clang.cindex.CursorKind.TYPEDEF_DECL:
+                            underlying_type = cursor.underlying_typedef_type
+                            if underlying_type.kind == clang.cindex.TypeKind.ELABORATED:
+                                # Get the declaration for this type
+                                type_decl = underlying_type.get_declaration()
+                                if type_decl and type_decl.spelling not in collected:
+                                    collected.add(type_decl.spelling)
+                                    collect_dependencies(type_decl, collected)
+                    
+                        # For structs and unions, collect field types
+                        elif cursor.kind in [clang.cindex.CursorKind.STRUCT_DECL, clang.cindex.CursorKind.UNION_DECL]:
+                            for field in cursor.get_children():
+                                if field.kind == clang.cindex.CursorKind.FIELD_DECL:
+                                    field_type = field.type
+                                    if field_type.kind == clang.cindex.TypeKind.ELABORATED:
+                                        type_decl = field_type.get_declaration()
+                                        if type_decl and type_decl.spelling not in collected:
+                                            collected.add(type_decl.spelling)
+                                            collect_dependencies(type_decl, collected)
+                
+                    # Start collecting dependencies from the target cursor
+                    collect_dependencies(target_cursor, collected_types)
+                
+                    # Extract the source code for the target and its dependencies
+                    preprocessed_source = preprocessed.source
+                
+                    # Extract the definitions in the correct order
+                    definitions = []
+                
+                    # First, extract all dependency definitions
+                    for type_name in collected_types:
+                        # Find the definition in the preprocessed source
+                        # This is a simplified approach and might need refinement
+                        type_pattern = f"(typedef|struct|union|enum)\\s+{type_name}\\s*\\{{[^}}]*\\}}\\s*;"
+                        match = re.search(type_pattern, preprocessed_source)
+                        if match:
+                            definitions.append(match.group(0))
+                
+                    # Then, extract the target definition
+                    target_pattern = None
+                    if item_type == "STRUCT_DECL":
+                        target_pattern = f"struct\\s+{item_name}\\s*\\{{[^}}]*\\}}\\s*;"
+                    elif item_type == "TYPEDEF_DECL":
+                        target_pattern = f"typedef\\s+.*\\s+{item_name}\\s*;"
+                    elif item_type == "ENUM_DECL":
+                        target_pattern = f"enum\\s+{item_name}\\s*\\{{[^}}]*\\}}\\s*;"
+                    elif item_type == "UNION_DECL":
+                        target_pattern = f"union\\s+{item_name}\\s*\\{{[^}}]*\\}}\\s*;"
+                
+                    if target_pattern:
+                        match = re.search(target_pattern, preprocessed_source)
+                        if match:
+                            definitions.append(match.group(0))
+                
+                    return "\n\n".join(definitions)
+            
+            except Exception as e:
+                logging.error(f"Error extracting definitions: {e}")
+                return None
+
+    def show_definitions_popup(self, definitions, title):
+        """Display the extracted definitions in a popup window."""
+        dialog = QtWidgets.QDialog(self)
+        dialog.setWindowTitle(f"Recursive Definitions: {title}")
+        dialog.resize(800, 600)
+        
+        layout = QtWidgets.QVBoxLayout(dialog)
+        
+        # Text area for displaying the definitions
+        text_edit = QtWidgets.QTextEdit()
+        text_edit.setReadOnly(True)
+        text_edit.setFont(QtGui.QFont("Courier New", 10))
+        text_edit.setText(definitions)
+        layout.addWidget(text_edit)
+        
+        # Buttons for copying and saving
+        button_layout = QtWidgets.QHBoxLayout()
+        
+        copy_button = QtWidgets.QPushButton("Copy to Clipboard")
+        copy_button.clicked.connect(lambda: QtWidgets.QApplication.clipboard().setText(definitions))
+        button_layout.addWidget(copy_button)
+        
+        save_button = QtWidgets.QPushButton("Save to File")
+        save_button.clicked.connect(lambda: self.save_definitions_to_file(definitions, title))
+        button_layout.addWidget(save_button)
+        
+        close_button = QtWidgets.QPushButton("Close")
+        close_button.clicked.connect(dialog.accept)
+        button_layout.addWidget(close_button)
+        
+        layout.addLayout(button_layout)
+        
+        dialog.exec_()
+
+    def save_definitions_to_file(self, definitions, title):
+        """Save the definitions to a file."""
+        file_name, _ = QtWidgets.QFileDialog.getSaveFileName(
+            self, 
+            "Save Definitions", 
+            f"{title.replace(' ', '_')}_definitions.h", 
+            "Header Files (*.h);;Text Files (*.txt);;All Files (*)"
+        )
+        
+        if file_name:
+            try:
+                with open(file_name, 'w') as f:
+                    f.write(definitions)
+                logging.info(f"Definitions saved to {file_name}")
+                QtWidgets.QMessageBox.information(
+                    self, 
+                    "Success", 
+                    f"Definitions successfully saved to {file_name}"
+                )
+            except Exception as e:
+                logging.error(f"Error saving definitions: {e}")
+                QtWidgets.QMessageBox.critical(
+                    self, 
+                    "Error", 
+                    f"Could not save definitions: {e}"
+                )
+    def export_all_definitions(self):
+        """
+        Export all struct, typedef, enum, union, macro, variable and function definitions to a single file.
+        The file is written by a DefinitionExporter in a background thread, from a
+        snapshot of the table; optionally the types are ordered by dependency
+        (from the type graph) so that the header compiles.
+        """
+        logging.info("Exporting all definitions...")
+        
+        file_name, _ = QtWidgets.QFileDialog.getSaveFileName(
+            self, 
+            "Save All Definitions", 
+            "all_definitions.defs",
+            "Header Files (*.defs);;Definition Files (*.defs);;Text Files (*.txt);;All Files (*)"
+        )
+        
+        if not file_name:
+            return  # User cancelled
+        
+        accepted, apply_search_filter, exclude_duplicating_objects, exclude_unnamed, dependency_order = \
+            self.get_export_options("Definitions Export Options",
+                                    [("Order types by dependency and write a header that compiles", True)])
+        
+        if not accepted:
+            return  # L'utente ha annullato
+        
+        # Determina quali righe processare in base alle opzioni
+        if apply_search_filter:
+            rows_to_process = self.proxy_model.source_rows()
+        else:
+            rows_to_process = range(self.model.rowCount())
+        
+        def finished(written):
+            if not written:
+                QtWidgets.QMessageBox.warning(self, "Warning", "No definitions were found to export.")
+                return
+            logging.info(f"All definitions saved to {file_name}")
+            QtWidgets.QMessageBox.information(
+                self, 
+                "Success", 
+                f"Successfully exported {written} definitions to {file_name}"
+            )
+        
+        worker = DefinitionExporter(RecordSnapshot(self.model), rows_to_process, file_name,
+                                    exclude_duplicating_objects, exclude_unnamed,
+                                    self.type_graph, dependency_order)
+        self.start_export(worker, "Exporting definitions...", len(rows_to_process), finished,
+                          "Could not save all definitions")
+
+    def show_statistics(self):
+        """Show statistics about the loaded items in the table (see RecordStatistics)."""
+        logging.info("Generating statistics...")
+        
+        # Collect statistics, in one pass over the columns of the model
+        stats = self.model.statistics()
+        total_items = stats.total
+        percentage = lambda count: f"{count / total_items * 100:.1f}%"
+        type_counts = stats.type_counts()
+        file_ext_counts = stats.extension_counts()
+        dir_counts = stats.directory_counts()
+        file_counts = stats.symbols_per_file()
+        
+        # Create a dialog to display the statistics
+        dialog = QtWidgets.QDialog(self)
+        dialog.setWindowTitle("Statistics")
+        dialog.resize(700, 500)
+        
+        layout = QtWidgets.QVBoxLayout(dialog)
+        
+        # Add a tab widget to organize different statistics
+        tab_widget = QtWidgets.QTabWidget()
+        layout.addWidget(tab_widget)
+        
+        def add_table_tab(title, headers, rows, sorting=True):
+            """Add a tab with a table of rows (lists of values)."""
+            widget = QtWidgets.QWidget()
+            widget_layout = QtWidgets.QVBoxLayout(widget)
+            table = QtWidgets.QTableWidget()
+            table.setColumnCount(len(headers))
+            table.setHorizontalHeaderLabels(headers)
+            table.setRowCount(len(rows))
+            for i, values in enumerate(rows):
+                for j, value in enumerate(values):
+                    item = QtWidgets.QTableWidgetItem()
+                    # I numeri sono ordinati come numeri
+                    item.setData(QtCore.Qt.DisplayRole, value)
+                    table.setItem(i, j, item)
+            table.setSortingEnabled(sorting)
+            table.resizeColumnsToContents()
+            widget_layout.addWidget(table)
+            tab_widget.addTab(widget, title)
+        
+        # Summary tab
+        summary_widget = QtWidgets.QWidget()
+        summary_layout = QtWidgets.QVBoxLayout(summary_widget)
+        
+        summary_text = QtWidgets.QTextEdit()
+        summary_text.setReadOnly(True)
+        summary_text.setFont(QtGui.QFont("Arial", 10))
+        
+        summary_content = [
+            "<h2>Summary Statistics</h2>",
+            f"<p><b>Total items:</b> {total_items}</p>",
+            f"<p><b>Unique types:</b> {len(type_counts)}</p>",
+            f"<p><b>File extensions:</b> {len(file_ext_counts)}</p>",
+            f"<p><b>Directories:</b> {len(dir_counts)}</p>",
+            f"<p><b>Files:</b> {len(file_counts)} "
+            f"({sum(file_counts.values()) / max(len(file_counts), 1):.1f} symbols per file on average)</p>",
+            "<h3>Top Types</h3>",
+            "<ul>"
+        ]
+        
+        # Sort types by count (descending)
+        sorted_types = type_counts.most_common()
+        for type_name, count in sorted_types[:5]:  # Show top 5
+            summary_content.append(f"<li><b>{type_name}:</b> {count} ({percentage(count)})</li>")
+        
+        summary_content.append("</ul>")
+        summary_text.setHtml("".join(summary_content))
+        summary_layout.addWidget(summary_text)
+        
+        tab_widget.addTab(summary_widget, "Summary")
+        
+        add_table_tab("By Type", ["Type", "Count", "Percentage"],
+                      [[type_name, count, percentage(count)] for type_name, count in sorted_types])
+        
+        sorted_exts = file_ext_counts.most_common()
+        add_table_tab("By File Extension", ["Extension", "Count", "Percentage"],
+                      [[ext, count, percentage(count)] for ext, count in sorted_exts])
+        
+        add_table_tab("By Directory", ["Directory", "Count", "Percentage"],
+                      [[dir_name, count, percentage(count)] for dir_name, count in dir_counts.most_common()])
+        
+        add_table_tab("By File", ["File", "Symbols", "Percentage"],
+                      [[file_path, count, percentage(count)] for file_path, count in file_counts.most_common()])
+        
+        add_table_tab("Macro Density", ["Directory", "Macros", "Items", "Density"],
+                      [[directory, macros, records, f"{density * 100:.1f}%"]
+                       for directory, (macros, records, density) in stats.macro_density().items()])
+        
+        add_table_tab("Largest Declarations", ["Size (bytes)", "Type", "Name", "File", "Line"],
+                      [list(entry) for entry in stats.largest_declarations()])
+        
+        # Type distribution by file extension (top 5 types and extensions)
+        top_types = [t[0] for t in sorted_types[:5]]
+        top_exts = [e[0] for e in sorted_exts[:5]]
+        cross_data = stats.type_by_extension()
+        add_table_tab("Type by Extension", ["Type"] + top_exts,
+                      [[type_name] + [cross_data.get((type_name, ext), 0) for ext in top_exts]
+                       for type_name in top_types], sorting=False)
+        
+        # Add a close button
+        button_layout = QtWidgets.QHBoxLayout()
+        close_button = QtWidgets.QPushButton("Close")
+        close_button.clicked.connect(dialog.accept)
+        button_layout.addStretch()
+        button_layout.addWidget(close_button)
+        layout.addLayout(button_layout)
+        
+        dialog.exec_()
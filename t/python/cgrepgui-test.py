@@ -0,0 +1,383 @@
+import io
+import os
+import re
+import sys
+import csv
+import glob
+import json
+import logging
+import shutil
+import tempfile
+import sqlite3
+import subprocess
+import unittest
+import contextlib
+
+pegasoroot = os.getenv('PEGASO_ROOT')
+scriptsdirname = os.path.join(pegasoroot, 'scripts')
+cgrepgui = os.path.join(scriptsdirname, 'cgrepgui.py')
+sys.path.insert(0, scriptsdirname)
+
+from cgrepgui import RECORD_FIELDS
+
+# A small tree: a shared header, twelve programs each defining main(), and two
+# "board" variants of the same external function and of a local struct
+COMMON_H = """#ifndef COMMON_H
+#define COMMON_H
+int helper(int x);
+extern int gvar;
+void never_defined(void);
+struct packet {
+    int id;
+    union {
+        int a;
+        float b;
+    } u;
+};
+typedef struct packet packet_t;
+#endif
+"""
+
+MAIN_C = """#include "../inc/common.h"
+static int local_{0};
+int main(void)
+{{
+    return helper({0}) + gvar + local_{0};
+}}
+"""
+
+BOARD_C = """#include "../inc/common.h"
+int helper(int x)
+{{
+    return x + {0};
+}}
+struct cfg {{
+    packet_t p;
+    int v{0};
+}};
+"""
+
+PROGRAMS = 12
+
+
+def write_tree(root):
+    os.makedirs(os.path.join(root, 'inc'))
+    os.makedirs(os.path.join(root, 'src'))
+    with open(os.path.join(root, 'inc', 'common.h'), 'w') as f:
+        f.write(COMMON_H)
+    for i in range(1, PROGRAMS + 1):
+        with open(os.path.join(root, 'src', f'c{i}.c'), 'w') as f:
+            f.write(MAIN_C.format(i))
+    for i in (1, 2):
+        with open(os.path.join(root, 'src', f'board{i}.c'), 'w') as f:
+            f.write(BOARD_C.format(i))
+    with open(os.path.join(root, 'src', 'board1.c'), 'a') as f:
+        f.write("int gvar = 1;\n")
+
+
+def batch(root, *options, loglevel='ERROR'):
+    """Run cgrepgui.py --batch on the tree, return the CompletedProcess."""
+    return subprocess.run([sys.executable, cgrepgui, '--batch', '-l', loglevel, '-R', '.'] + list(options),
+                          cwd=root, check=True, capture_output=True, text=True)
+
+
+def run_batch(root, *options):
+    """Run cgrepgui.py --batch on the tree and return the records."""
+    return [json.loads(line) for line in batch(root, *options).stdout.splitlines()]
+
+
+def import_cgrepgui():
+    """Import the cgrepgui module, logging only errors."""
+    import cgrepgui as c
+    logging.getLogger().setLevel(logging.ERROR)
+    return c
+
+
+def rows(records, name, item_type='FUNCTION_DECL'):
+    return [r for r in records if r['Name'] == name and r['Type'] == item_type]
+
+
+class SymbolIdentityTest(unittest.TestCase):
+    """Records are keyed by USR (user-017) without losing distinct definitions."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.root = tempfile.mkdtemp()
+        write_tree(cls.root)
+        cls.records = run_batch(cls.root)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.root)
+
+    def test_every_definition_is_kept(self):
+        mains = rows(self.records, 'main')
+        self.assertEqual(len(mains), PROGRAMS)
+        self.assertEqual(len({r['File'] for r in mains}), PROGRAMS)
+        helpers = [r for r in rows(self.records, 'helper') if r['IsDefinition']]
+        self.assertEqual(sorted(os.path.basename(r['File']) for r in helpers), ['board1.c', 'board2.c'])
+
+    def test_declarations_are_kept_with_their_file(self):
+        for name, item_type in (('helper', 'FUNCTION_DECL'), ('gvar', 'VAR_DECL'),
+                                ('never_defined', 'FUNCTION_DECL')):
+            declarations = [r for r in rows(self.records, name, item_type) if not r['IsDefinition']]
+            self.assertEqual([os.path.basename(r['File']) for r in declarations], ['common.h'], name)
+
+    def test_merge_declarations_folds_them_into_the_definitions(self):
+        records = run_batch(self.root, '--merge-declarations')
+        self.assertEqual(len(rows(records, 'main')), PROGRAMS)
+        self.assertEqual([r['IsDefinition'] for r in rows(records, 'helper')], [True, True])
+        self.assertEqual([r['IsDefinition'] for r in rows(records, 'gvar', 'VAR_DECL')], [True])
+        # dichiarato ma mai definito: resta
+        self.assertEqual(len(rows(records, 'never_defined')), 1)
+
+    def test_same_header_through_different_paths(self):
+        # common.h è raggiunto sia come ./inc/common.h sia come ./src/../inc/common.h
+        self.assertEqual(len(rows(self.records, 'packet', 'STRUCT_DECL')), 1)
+        self.assertEqual(len(rows(self.records, 'u', 'FIELD_DECL')), 1)
+
+
+class TreeTestCase(unittest.TestCase):
+    """Tests running on a fresh copy of the tree of write_tree."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.root = tempfile.mkdtemp()
+        write_tree(cls.root)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.root)
+
+
+class BatchOutputTest(TreeTestCase):
+    """--batch writes the same records in every --format (user-007)."""
+
+    def test_formats(self):
+        records = run_batch(self.root)
+        self.assertEqual(len(rows(records, 'main')), PROGRAMS)
+        expected = [[str(r[field]) for field in RECORD_FIELDS] for r in records]
+        output = batch(self.root, '--format', 'csv').stdout
+        table = list(csv.reader(io.StringIO(output)))
+        self.assertEqual(table[0], list(RECORD_FIELDS))
+        self.assertEqual(table[1:], expected)
+        database = os.path.join(self.root, 'records.db')
+        batch(self.root, '--format', 'sqlite', '-o', database)
+        with contextlib.closing(sqlite3.connect(database)) as db:
+            stored = db.execute(f"SELECT {', '.join(RECORD_FIELDS)} FROM records ORDER BY rowid").fetchall()
+        self.assertEqual(stored, [tuple(r[field] for field in RECORD_FIELDS) for r in records])
+
+
+class ParallelParsingTest(TreeTestCase):
+    """Worker processes give the same output as the serial parse (user-001)."""
+
+    def test_same_output_with_jobs(self):
+        for merge in ((), ('--merge-declarations',)):
+            expected = batch(self.root, *merge).stdout
+            self.assertTrue(expected)
+            self.assertEqual(batch(self.root, '-j', '2', *merge).stdout, expected, merge)
+
+
+class SkipSeenHeadersTest(TreeTestCase):
+    """--skip-seen-headers walks common.h once and gives the same output (user-004)."""
+
+    def test_same_output(self):
+        for merge in ((), ('--merge-declarations',)):
+            expected = batch(self.root, *merge).stdout
+            for jobs in ('1', '2'):
+                self.assertEqual(batch(self.root, '--skip-seen-headers', '-j', jobs, *merge).stdout, expected,
+                                 (jobs,) + merge)
+
+
+class IndexCacheTest(TreeTestCase):
+    """The persistent index cache reuses unchanged files and re-parses the others (user-002)."""
+
+    def run_cached(self, *options):
+        result = batch(self.root, '--cache', self.cache, *options, loglevel='INFO')
+        reused, parsed = re.search(r"Index cache: (\d+) files reused, (\d+) files parsed", result.stderr).groups()
+        return result.stdout, int(reused), int(parsed)
+
+    def test_hit_and_invalidation(self):
+        files = PROGRAMS + 3
+        self.cache = os.path.join(tempfile.mkdtemp(dir=self.root), 'index.db')
+        expected = batch(self.root).stdout
+        self.assertEqual(self.run_cached(), (expected, 0, files))
+        self.assertEqual(self.run_cached(), (expected, files, 0))
+        # stesso contenuto con mtime nuovo: riconosciuto dall'hash
+        source = os.path.join(self.root, 'src', 'c1.c')
+        os.utime(source, ns=(0, 0))
+        self.assertEqual(self.run_cached(), (expected, files, 0))
+        # impostazioni diverse: voci distinte
+        self.assertEqual(self.run_cached('--skip-seen-headers')[1:], (0, files))
+        # file modificato: solo lui viene analizzato di nuovo
+        with open(source, 'a') as f:
+            f.write("int c1_extra;\n")
+        output, reused, parsed = self.run_cached()
+        self.assertEqual((reused, parsed), (files - 1, 1))
+        self.assertEqual(output, batch(self.root).stdout)
+        self.assertIn('c1_extra', output)
+        # header modificato: invalida anche i file che lo includono
+        with open(os.path.join(self.root, 'inc', 'common.h'), 'a') as f:
+            f.write("int common_extra;\n")
+        output, reused, parsed = self.run_cached()
+        self.assertEqual((reused, parsed), (0, files))
+        self.assertEqual(output, batch(self.root).stdout)
+
+
+class SourceCacheTest(TreeTestCase):
+    """Declarations and type definitions are sliced from the shared SOURCE_CACHE (user-006)."""
+
+    def test_statistics_of_the_workers(self):
+        for jobs in ('1', '2'):
+            stderr = batch(self.root, '-j', jobs, loglevel='INFO').stderr
+            hits, misses = map(int, re.search(r"Source cache: (\d+) hits, (\d+) misses", stderr).groups())
+            self.assertGreater(hits, 0, jobs)
+            self.assertGreaterEqual(misses, PROGRAMS + 3, jobs)
+
+    def test_definition_text(self):
+        c = import_cgrepgui()
+        graph = c.TypeGraph()
+        c.process_files(sorted(glob.glob(os.path.join(self.root, '*', '*.[ch]'))), type_graph=graph)
+        misses = c.SOURCE_CACHE.misses
+        hits = c.SOURCE_CACHE.hits
+        text = graph.dump([graph.key('TYPEDEF_DECL', 'packet_t')])
+        self.assertIn('typedef struct packet packet_t;', text)
+        self.assertEqual(c.SOURCE_CACHE.misses, misses)
+        self.assertGreater(c.SOURCE_CACHE.hits, hits)
+
+
+class RecordTableModelTest(unittest.TestCase):
+    """Sorting by Declaration reads the DeclarationStore in batches, not per comparison (user-009)."""
+
+    def test_sort_by_declaration(self):
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+        import_cgrepgui()
+        from PyQt5 import QtCore, QtWidgets
+        import cgrepgui_qt as q
+        application = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+        prefix = 'x' * q.DECLARATION_SORT_PREFIX_CHARS
+        declarations = [f"int v{i % 37};" for i in range(300)] + [prefix + "b", prefix + "a", "", prefix]
+        model = q.RecordTableModel()
+        model.append_records([dict(zip(RECORD_FIELDS, ('VAR_DECL', f'v{i}', 'a.c', i + 1, 1, False, 'int',
+                                                       text, '', True)))
+                              for i, text in enumerate(declarations)])
+        proxy = q.CustomFilterProxy()
+        proxy.setSourceModel(model)
+        reads = []
+        pread = os.pread
+        os.pread = lambda *args: reads.append(args) or pread(*args)
+        try:
+            proxy.sort(q.COL_DECLARATION, QtCore.Qt.AscendingOrder)
+        finally:
+            os.pread = pread
+        view = [proxy.mapToSource(proxy.index(row, 0)).row() for row in range(proxy.rowCount())]
+        self.assertEqual([declarations[row] for row in view], sorted(declarations))
+        self.assertLess(len(reads), 10)
+        # righe aggiunte dopo l'ordinamento: le posizioni vengono ricalcolate
+        model.append_records([dict(zip(RECORD_FIELDS, ('VAR_DECL', 'w', 'a.c', 1, 1, False, 'int', 'char w;', '',
+                                                       True)))])
+        view = [proxy.mapToSource(proxy.index(row, 0)).row() for row in range(proxy.rowCount())]
+        self.assertEqual([(declarations + ['char w;'])[row] for row in view], sorted(declarations + ['char w;']))
+        self.assertTrue(application)
+        model.declarations.file.close()
+
+
+class TypeGraphTest(unittest.TestCase):
+    """Type graph nodes are keyed by normalized file and name (user-012)."""
+
+    @classmethod
+    def setUpClass(cls):
+        c = import_cgrepgui()
+        cls.root = tempfile.mkdtemp()
+        write_tree(cls.root)
+        cls.graph = c.TypeGraph()
+        c.process_files(sorted(glob.glob(os.path.join(cls.root, '*', '*.[ch]'))), type_graph=cls.graph)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.root)
+
+    def test_same_name_in_different_files(self):
+        board1 = self.graph.key('STRUCT_DECL', 'cfg', os.path.join(self.root, 'src', 'board1.c'))
+        board2 = self.graph.key('STRUCT_DECL', 'cfg', os.path.join(self.root, 'inc', '..', 'src', 'board2.c'))
+        self.assertNotEqual(board1, board2)
+        self.assertIn('int v1;', self.graph.dump([board1]))
+        self.assertIn('int v2;', self.graph.dump([board2]))
+        # la dipendenza da packet_t segue la struct nel dump
+        self.assertIn('typedef struct packet packet_t;', self.graph.dump([board2]))
+
+    def test_anonymous_member_keyed_once(self):
+        unions = [key for key in self.graph.nodes if key[0] == 'UNION_DECL']
+        self.assertEqual(len(unions), 1)
+        self.assertNotIn('..', unions[0][1])
+
+
+class ReferenceIndexTest(unittest.TestCase):
+    """Usages of static symbols are not merged across same-named files (user-016)."""
+
+    @classmethod
+    def setUpClass(cls):
+        c = import_cgrepgui()
+        cls.root = tempfile.mkdtemp()
+        cls.files = []
+        for board in ('a', 'b'):
+            os.makedirs(os.path.join(cls.root, board))
+            name = os.path.join(cls.root, board, 'util.c')
+            with open(name, 'w') as f:
+                f.write("static int foo(void)\n{\n    return 1;\n}\nint %s(void)\n{\n    return foo();\n}\n" % board)
+            cls.files.append(name)
+        cls.index = c.ReferenceIndex()
+        c.process_files(cls.files, reference_index=cls.index)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.root)
+
+    def test_static_symbols_by_file(self):
+        for name in self.files:
+            usr = self.index.usr_at(name, 1, 12)
+            self.assertTrue(usr)
+            usages = self.index.find_usages(usr, name)
+            self.assertTrue(usages)
+            self.assertEqual({usage[0] for usage in usages}, {name})
+        # stesso USR per i due foo: è il file a distinguerli
+        self.assertEqual(self.index.usr_at(self.files[0], 1, 12), self.index.usr_at(self.files[1], 1, 12))
+
+
+class PreprocessedFileCacheTest(unittest.TestCase):
+    """The -I/-D flags of compile_commands.json reach the preprocessor and the fingerprint (user-011)."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        for name, text in (('inc/b.h', "#ifdef BOARD\nstruct b { int x; };\n#endif\n"),
+                           ('src/a.c', '#include "b.h"\nstruct b v;\n')):
+            os.makedirs(os.path.join(self.root, os.path.dirname(name)), exist_ok=True)
+            with open(os.path.join(self.root, name), 'w') as f:
+                f.write(text)
+        build = os.path.join(self.root, 'build')
+        os.makedirs(build)
+        with open(os.path.join(build, 'compile_commands.json'), 'w') as f:
+            json.dump([{'directory': build, 'file': '../src/a.c',
+                        'command': 'cc -I../inc -DBOARD=1 -c ../src/a.c -o a.o'}], f)
+        self.source = os.path.join(self.root, 'src', 'a.c')
+        self.build = build
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_compile_commands_flags(self):
+        c = import_cgrepgui()
+        cache = c.PreprocessedFileCache()
+        # senza -I il file non si preprocessa
+        self.assertRaises(subprocess.CalledProcessError, cache.get, self.source)
+        cache.compile_commands = c.CompileCommands(self.build)
+        self.assertIn('-DBOARD=1', cache.flags(self.source))
+        with cache.use(self.source) as preprocessed:
+            self.assertIn('struct b { int x; };', preprocessed.source)
+            self.assertEqual([cursor.spelling for cursor in preprocessed.tu.cursor.get_children()][-2:], ['b', 'v'])
+        cache.get(self.source)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,194 @@
+import os
+import sys
+import csv
+import json
+import shutil
+import logging
+import tempfile
+import unittest
+
+pegasoroot = os.getenv('PEGASO_ROOT')
+libdirname = os.path.join(pegasoroot, 'lib/python')
+sys.path.append(libdirname)
+
+from keyvaluediff import KVSet, KVRelation, KVMatrix, KVDiff, Errors, ErrorCode
+
+rTEST = r'HWTEST_\d\d\d'
+rREQ = r'HW_S?REQ_\d\d\d\d'
+
+# Three small sets (key;values): HWTEST_001 repeats HW_REQ_0001 in A
+SETS = {
+    'A': "HWTEST_001;HW_REQ_0001,HW_REQ_0002,HW_REQ_0001\nHWTEST_002;HW_REQ_0003\nHWTEST_003;HW_REQ_0004\n",
+    'B': "HWTEST_001;HW_REQ_0001,HW_REQ_0002\nHWTEST_002;HW_REQ_0003,HW_REQ_0005\n",
+    'C': "HWTEST_001;HW_REQ_0002\nHWTEST_002;HW_REQ_0003\nHWTEST_004;HW_REQ_0006\n",
+}
+
+
+class KVSetTestCase(unittest.TestCase):
+    """Write SETS as CSV files and load them as KVSets."""
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+        logging.disable(logging.NOTSET)
+
+    def kvset(self, name, text, csr=False):
+        filename = os.path.join(self.dir, name + '.CSV')
+        with open(filename, 'w') as f:
+            f.write("HW Test ID;HW requirements ID\n" + text)
+        s = KVSet(name, filename, ',', rTEST, rREQ, csr=csr)
+        s.load()
+        s.process()
+        return s
+
+
+class KVRelationTest(KVSetTestCase):
+
+    def test_from_dict(self):
+        r = KVRelation.from_dict({'b': ['y', 'x', 'y'], 'a': ['z'], 'c': []})
+        self.assertEqual(list(r), ['a', 'b', 'c'])
+        self.assertEqual(r['b'], ['x', 'y'])
+        self.assertEqual(r['c'], [])
+        self.assertEqual(r.edges(), 3)
+        self.assertNotIn('d', r)
+        with self.assertRaises(TypeError):
+            r['d'] = ['x']
+
+    def test_transpose(self):
+        r = KVRelation.from_dict({'a': ['x', 'y'], 'b': ['y'], 'c': ['z']})
+        t = r.transpose()
+        self.assertEqual(dict(t.items()), {'x': ['a'], 'y': ['a', 'b'], 'z': ['c']})
+        self.assertEqual(dict(t.transpose().items()), dict(r.items()))
+        # removed keys are renumbered away, values left without keys are dropped
+        del r['c']
+        del r['a']
+        self.assertEqual(len(r), 1)
+        self.assertRaises(KeyError, r.__getitem__, 'a')
+        self.assertEqual(dict(r.transpose().items()), {'y': ['b']})
+
+    def test_csr_kvset(self):
+        for name, text in SETS.items():
+            plain = self.kvset(name, text)
+            csr = self.kvset(name, text, csr=True)
+            self.assertIsInstance(csr.data_uniq, KVRelation)
+            self.assertEqual(dict(csr.data_uniq.items()), plain.data_uniq)
+            self.assertEqual(len(csr.keys_with_errors), len(plain.keys_with_errors))
+            inverse = plain.invert()
+            inverse.process()
+            csr_inverse = csr.invert()
+            csr_inverse.process()
+            self.assertIs(csr_inverse.data_uniq, csr_inverse.csr)
+            self.assertEqual(dict(csr_inverse.data_uniq.items()), inverse.data_uniq)
+            other = self.kvset('B', SETS['B'])
+            self.assertEqual(list(csr.diff(other).differences()), list(plain.diff(other).differences()))
+            self.assertEqual(list(csr_inverse.diff(inverse).differences()), [])
+
+
+class KVMatrixTest(KVSetTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.sets = [self.kvset(name, text) for name, text in SETS.items()]
+        self.matrix = KVMatrix(self.sets)
+
+    def test_presence(self):
+        m = self.matrix
+        self.assertEqual(m.names(m.presence('HWTEST_001')), ['A', 'B', 'C'])
+        self.assertEqual(m.names(m.presence('HWTEST_001', 'HW_REQ_0001')), ['A', 'B'])
+        self.assertEqual(m.presence('HWTEST_004', 'HW_REQ_0001'), 0)
+        self.assertEqual(m.presence('HWTEST_999'), 0)
+
+    def test_queries(self):
+        m = self.matrix
+        self.assertEqual(list(m.query(present=['A', 'B'], absent=['C'])), [('HWTEST_001', 'HW_REQ_0001')])
+        self.assertEqual(list(m.query(present=[self.sets[1]], absent=[0, 2])), [('HWTEST_002', 'HW_REQ_0005')])
+        self.assertEqual(list(m.key_query(absent=['B'])), ['HWTEST_003', 'HWTEST_004'])
+        self.assertEqual(m.count(present=['A']), 4)
+        self.assertEqual(m.count(), len(m.edge_codes))
+        # a value repeated under the same key is a single edge
+        self.assertEqual(sum(m.patterns().values()), 6)
+        missing = {(k, v): m.names(mask) for k, v, mask in m.missing_from_any()}
+        self.assertNotIn(('HWTEST_001', 'HW_REQ_0002'), missing)
+        self.assertEqual(missing[('HWTEST_004', 'HW_REQ_0006')], ['C'])
+        self.assertEqual(len(list(m.missing_from_any(['A', 'C']))), 4)
+        self.assertRaises(KeyError, m.index, 'D')
+
+    def test_diff_matches_kvset_diff(self):
+        for left in self.sets:
+            for right in self.sets:
+                for keys_only in (False, True):
+                    expected = left.diff(right, keys_only)
+                    result = self.matrix.diff(left.name, right.name, keys_only)
+                    self.assertEqual(list(result.differences()), list(expected.differences()))
+                    self.assertEqual(result.counts(), expected.counts())
+        # the repeated HW_REQ_0001 of A is still a difference, as in KVSet.diff
+        self.assertIn(('HWTEST_001', 'HW_REQ_0001', KVDiff.LEFT), list(self.matrix.diff('A', 'B').differences()))
+
+
+class ErrorsTest(KVSetTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.left = self.kvset('A', SETS['A'] + "BAD_KEY;HW_REQ_0001\n")
+        self.right = self.kvset('B', SETS['B'])
+        self.left.compare(self.right)
+
+    def test_messages(self):
+        errors = self.left.keys_with_errors
+        self.assertEqual(errors.messages('BAD_KEY')[0], "A: key 'BAD_KEY' regex error at line '5'")
+        # a key that already has errors is only reported by the comparison, not traced again
+        self.assertEqual(errors.messages('HWTEST_001'), ["A: key 'HWTEST_001' has duplicated value 'HW_REQ_0001'"])
+        self.assertEqual(errors.messages('HWTEST_003'), ["key HWTEST_003 present in 'A' , missed in 'B'"])
+        self.assertEqual(errors.messages('HWTEST_999'), [])
+        self.assertEqual(errors.counters()[ErrorCode.KEY_LEFT_ONLY], 1)
+
+    def test_err_is_read_only(self):
+        err = self.left.keys_with_errors.err
+        self.assertEqual(err['BAD_KEY'], ("A: key 'BAD_KEY' regex error at line '5'",))
+        with self.assertRaises(TypeError):
+            err['NEW'] = ['lost']
+        with self.assertRaises(AttributeError):
+            err['BAD_KEY'].append('lost')
+        self.assertIs(self.left.keys_with_errors.err, err)
+        self.assertRaises(KeyError, err.__getitem__, 'HWTEST_999')
+        self.assertEqual(set(err), {'BAD_KEY', 'HWTEST_001', 'HWTEST_002', 'HWTEST_003'})
+        self.assertEqual(len(err), 4)
+        # the findings traced later are seen by the same view
+        self.left.keys_with_errors.trace(ErrorCode.KEY_REGEX, 'LATE', 'LATE', line=9)
+        self.assertIn('LATE', err)
+        self.assertEqual(err['LATE'], ("A: key 'LATE' regex error at line '9'",))
+
+    def test_extend_keeps_codes_and_owner(self):
+        errors = Errors('ALL')
+        errors.add('note', 'free text')
+        errors.extend(self.left.keys_with_errors)
+        self.assertEqual(len(errors), 1 + len(self.left.keys_with_errors))
+        self.assertEqual(errors.counters(), {ErrorCode.MESSAGE: 1, **self.left.keys_with_errors.counters()})
+        self.assertEqual(errors.messages('BAD_KEY'), self.left.keys_with_errors.messages('BAD_KEY'))
+        self.assertEqual(errors.messages('note'), ['free text'])
+
+    def test_export(self):
+        errors = self.left.return_all_errors()
+        json_name = os.path.join(self.dir, 'errors.json')
+        csv_name = os.path.join(self.dir, 'errors.csv')
+        errors.export_json(json_name)
+        errors.export_csv(csv_name)
+        with open(json_name) as f:
+            exported = json.load(f)
+        self.assertEqual(exported['name'], 'A')
+        self.assertEqual(sum(exported['counters'].values()), len(errors))
+        self.assertIn({'code': 'KEY_REGEX', 'group': 'BAD_KEY', 'key': 'BAD_KEY', 'value': None, 'line': 5,
+                       'other': None, 'message': "A: key 'BAD_KEY' regex error at line '5'"}, exported['errors'])
+        with open(csv_name, newline='') as f:
+            rows = list(csv.DictReader(f, delimiter=';'))
+        self.assertEqual([r['message'] for r in rows], [e['message'] for e in exported['errors']])
+        self.assertIn({'code': 'VALUE_RIGHT_ONLY', 'group': 'HWTEST_002', 'key': 'HWTEST_002', 'value': 'HW_REQ_0005',
+                       'line': '', 'other': 'B',
+                       'message': "key HWTEST_002 : HW_REQ_0005 missed in 'A' , present in 'B'"}, rows)
+
+
+if __name__ == '__main__':
+    unittest.main()